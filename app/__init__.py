@@ -12,8 +12,14 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    if app.config.get('PROXY_FIX_X_FOR'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     db.init_app(app)
-    migrate.init_app(app, db)
+    # The full-text search tables live outside the models (see app/search.py)
+    from app.search import include_name
+    migrate.init_app(app, db, include_name=include_name)
     jwt.init_app(app)
 
     # Import and register blueprints
@@ -21,11 +27,15 @@ def create_app(config_class=Config):
     from app.routes.events import events_bp
     from app.routes.bookings import bookings_bp
     from app.routes.admin import admin_bp
+    from app.routes.gate import gate_bp
+    from app.routes.queue import queue_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(events_bp, url_prefix='/api/events')
     app.register_blueprint(bookings_bp, url_prefix='/api/bookings')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(gate_bp, url_prefix='/api/gate')
+    app.register_blueprint(queue_bp, url_prefix='/api/queue')
 
     # Register main views (frontend)
     from app.routes.main import main_bp
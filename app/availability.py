@@ -0,0 +1,343 @@
+"""In-memory seat availability index, one per event.
+
+The index is built once from the database and then kept current by the
+booking routes (lock, confirm, cancel) instead of re-running the
+Seat/SeatHold queries on every seat map poll. Seat state is a bytearray
+indexed by seat ordinal (the seat's position in the venue's compiled
+layout, see app/seat_layout.py), and hold expiry is tracked with a heap so
+expired holds are released lazily on the next read.
+
+Every state change bumps the index version and is kept in a bounded
+change log, so pollers can ask for just the seats that changed since the
+version they last saw (changes_since). Versions are "<epoch>.<n>" tokens;
+the epoch is new whenever the index is replaced (first build, venue layout
+change), so a version from an older index or another worker gets a full
+snapshot instead of a wrong delta.
+
+pick_best() finds the best free block of adjacent seats for best-available
+booking, using a per-row free-run index (app/seat_runs.py) that is built
+on first use and kept current by the same state changes.
+
+Each process keeps its own index. Writes from other workers are picked up
+when the index reaches SEAT_INDEX_MAX_AGE and is refreshed: the database
+state is read again and only the seats that differ are changed, as
+ordinary versioned changes, so pollers keep getting deltas across
+refreshes. Seat claims stay correct regardless because they are decided
+by the hold table.
+"""
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app
+from app.models import db, Event, SeatHold
+from app.seat_layout import get_compiled_layout
+from app.seat_runs import FreeRunIndex
+from app import pubsub
+
+FREE = 0
+HELD = 1
+SOLD = 2
+
+# Seat states as the characters '0', '1', '2' for the availability payload
+_STATE_CHARS = bytes.maketrans(bytes([FREE, HELD, SOLD]), b'012')
+
+
+class SeatAvailabilityIndex:
+    def __init__(self, event_id, base_price, layout, change_log_size=10000):
+        self.event_id = event_id
+        self.base_price = base_price
+        self.built_at = time.monotonic()
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self._changes = deque(maxlen=change_log_size)  # (version, ordinal, state)
+
+        # Static seat data comes from the venue's compiled layout
+        self.layout = layout
+        self.seat_ids = layout.seat_ids
+        self.ordinals = layout.ordinals
+
+        self.state = bytearray(len(self.seat_ids))
+        self._expiry = {}  # ordinal -> expires_at of the current hold
+        self._heap = []    # (expires_at, ordinal), may contain stale entries
+        self.runs = None   # FreeRunIndex, built by the first pick_best()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    def _ordinals(self, seat_ids):
+        return [self.ordinals[s_id] for s_id in seat_ids if s_id in self.ordinals]
+
+    def _set(self, i, state):
+        # Callers hold self._lock
+        if self.state[i] != state:
+            self.state[i] = state
+            self.version += 1
+            self._changes.append((self.version, i, state))
+            if self.runs is not None:
+                self.runs.mark(i)
+
+    def _expire(self, now):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, i = heapq.heappop(heap)
+            if self.state[i] == HELD and self._expiry.get(i) == expires_at:
+                self._set(i, FREE)
+                del self._expiry[i]
+
+    def hold(self, seat_ids, expires_at):
+        with self._lock:
+            for i in self._ordinals(seat_ids):
+                self._set(i, HELD)
+                self._expiry[i] = expires_at
+                heapq.heappush(self._heap, (expires_at, i))
+
+    def sell(self, seat_ids):
+        with self._lock:
+            for i in self._ordinals(seat_ids):
+                self._set(i, SOLD)
+                self._expiry.pop(i, None)
+
+    def release(self, seat_ids):
+        with self._lock:
+            for i in self._ordinals(seat_ids):
+                self._set(i, FREE)
+                self._expiry.pop(i, None)
+
+    def pick_best(self, n, hold_until, eligible=None, now=None):
+        """Pick the best n adjacent free seats and mark them held until hold_until.
+
+        The seats are held in the index straight away so concurrent pickers
+        get different seats; the caller claims them in the database and
+        releases them if that fails. Returns the seat IDs, or None if no
+        eligible row has n adjacent free seats. eligible(row_ordinals) can
+        rule rows out.
+        """
+        with self._lock:
+            self._expire(now or datetime.utcnow())
+            if self.runs is None:
+                self.runs = FreeRunIndex(self.layout)
+            ordinals = self.runs.find(n, self.state, eligible)
+            if ordinals is None:
+                return None
+            for i in ordinals:
+                self._set(i, HELD)
+                self._expiry[i] = hold_until
+                heapq.heappush(self._heap, (hold_until, i))
+            return [self.seat_ids[i] for i in ordinals]
+
+    def reconcile(self, fresh, since_version, now=None):
+        """Bring this index in line with fresh, a newer build from the database.
+
+        Differing seats are changed like any other update, so the epoch is
+        kept and pollers see them in their next delta. Seats changed here
+        after since_version (the version when fresh's holds were read) are
+        newer than fresh and left alone. Returns the seat IDs that differed.
+        """
+        now = now or datetime.utcnow()
+        fresh_state = fresh.snapshot(now)
+        with self._lock:
+            self._expire(now)
+            recent = {i for version, i, _ in self._changes if version > since_version}
+            mismatched = []
+            if bytes(self.state) != fresh_state:
+                for i, state in enumerate(fresh_state):
+                    if self.state[i] != state and i not in recent:
+                        self._set(i, state)
+                        if state != HELD:
+                            self._expiry.pop(i, None)
+                        mismatched.append(self.seat_ids[i])
+            # Holds extended or re-taken elsewhere keep the database's expiry
+            for i, expires_at in fresh._expiry.items():
+                if i not in recent and self.state[i] == HELD and self._expiry.get(i) != expires_at:
+                    self._expiry[i] = expires_at
+                    heapq.heappush(self._heap, (expires_at, i))
+            self.built_at = time.monotonic()
+            return mismatched
+
+    def version_token(self, version=None):
+        return f"{self.epoch}.{self.version if version is None else version}"
+
+    def changes_since(self, since, now=None):
+        """Return (version_token, changes) for a poller that last saw version since.
+
+        changes is a list of (ordinal, state) for seats whose state changed,
+        or None when since is unknown or older than the change log, in which
+        case the caller should send a full snapshot.
+        """
+        epoch, _, n = (since or '').partition('.')
+        with self._lock:
+            self._expire(now or datetime.utcnow())
+            token = self.version_token()
+            if epoch != self.epoch or not n.isdigit() or int(n) > self.version:
+                return token, None
+            since_version = int(n)
+            if since_version < self.version and (not self._changes or self._changes[0][0] > since_version + 1):
+                return token, None
+
+            changed = {}
+            for version, i, state in reversed(self._changes):
+                if version <= since_version:
+                    break
+                changed.setdefault(i, state)
+            return token, sorted(changed.items())
+
+    def encoded_state(self, now=None):
+        """Return (version_token, state) with one '0'/'1'/'2' character per seat ordinal."""
+        with self._lock:
+            self._expire(now or datetime.utcnow())
+            return self.version_token(), bytes(self.state).translate(_STATE_CHARS).decode('ascii')
+
+    def snapshot(self, now=None):
+        """Return a copy of the seat state array with expired holds released."""
+        with self._lock:
+            self._expire(now or datetime.utcnow())
+            return bytes(self.state)
+
+    def seat_list(self, now=None):
+        state = self.snapshot(now)
+        layout = self.layout
+        base_price = self.base_price
+        return [{
+            "id": layout.seat_ids[i],
+            "row": layout.row_label(i),
+            "number": layout.seat_numbers[i],
+            "type": layout.seat_type(i),
+            "price": base_price * layout.multiplier(i),
+            "status": "available" if state[i] == FREE else "booked"
+        } for i in range(len(state))]
+
+
+def build_index(event_id):
+    event = Event.query.get(event_id)
+    if event is None:
+        return None
+    index = SeatAvailabilityIndex(
+        event.id, event.base_price, get_compiled_layout(event.venue_id),
+        change_log_size=current_app.config.get('SEAT_CHANGE_LOG_SIZE', 10000)
+    )
+
+    now = datetime.utcnow()
+    holds = db.session.query(SeatHold.seat_id, SeatHold.expires_at).filter(
+        SeatHold.event_id == event_id,
+        db.or_(SeatHold.expires_at.is_(None), SeatHold.expires_at > now)
+    ).all()
+    for seat_id, expires_at in holds:
+        if expires_at is None:
+            index.sell([seat_id])
+        else:
+            index.hold([seat_id], expires_at)
+    # Pollers start from a full snapshot of the built index, not from these changes
+    index._changes.clear()
+    return index
+
+
+_indexes = {}
+_registry_lock = threading.Lock()  # Guards the dicts only, never held during a build
+_build_locks = {}  # event_id -> lock serializing that event's builds
+
+
+def _build_lock(event_id):
+    with _registry_lock:
+        return _build_locks.setdefault(event_id, threading.Lock())
+
+
+def _refresh(event_id, current):
+    """Read the event's seats from the database into current (or a new index).
+
+    Returns (index, seat IDs whose cached state differed). Callers hold the event's build lock.
+    """
+    since_version = current.version if current is not None else 0
+    fresh = build_index(event_id)
+    if fresh is None:
+        invalidate(event_id)
+        return None, []
+    if current is not None and current.layout.digest == fresh.layout.digest:
+        return current, current.reconcile(fresh, since_version)
+
+    mismatched = list(fresh.seat_ids) if current is not None else []
+    with _registry_lock:
+        _indexes[event_id] = fresh
+    return fresh, mismatched
+
+
+def get_index(event_id):
+    """Return the event's index, building it from the database if missing or refreshing it if too old."""
+    max_age = current_app.config.get('SEAT_INDEX_MAX_AGE', 30)
+    index = _indexes.get(event_id)
+    if index is not None and time.monotonic() - index.built_at < max_age:
+        return index
+
+    lock = _build_lock(event_id)
+    if index is not None:
+        # One request refreshes a stale index; the others keep reading it meanwhile
+        if not lock.acquire(blocking=False):
+            return index
+    else:
+        lock.acquire()
+    try:
+        index = _indexes.get(event_id)
+        if index is None or time.monotonic() - index.built_at >= max_age:
+            index, _ = _refresh(event_id, index)
+        return index
+    finally:
+        lock.release()
+
+
+def invalidate(event_id=None):
+    with _registry_lock:
+        if event_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(event_id, None)
+
+
+def verify_index(event_id):
+    """Compare the cached index with the tables and correct it on mismatch.
+
+    Returns the seat IDs whose cached state differed from the database.
+    """
+    with _build_lock(event_id):
+        _, mismatched = _refresh(event_id, _indexes.get(event_id))
+    return mismatched
+
+
+# --- Incremental updates, called after the booking transaction commits ---
+
+def channel(event_id):
+    return f"seats:{event_id}"
+
+
+def _publish(event_id, seat_ids, state):
+    # Pushed to live seat map streams (see bookings.stream_seats)
+    if seat_ids:
+        pubsub.publish(channel(event_id), {"seat_ids": list(seat_ids), "state": state})
+
+
+def seats_held(event_id, seat_ids, expires_at):
+    index = _indexes.get(event_id)
+    if index is not None:
+        index.hold(seat_ids, expires_at)
+    _publish(event_id, seat_ids, HELD)
+
+
+def seats_sold(event_id, seat_ids):
+    index = _indexes.get(event_id)
+    if index is not None:
+        index.sell(seat_ids)
+    _publish(event_id, seat_ids, SOLD)
+
+
+def seats_released(pairs):
+    """Free seats given as (event_id, seat_id) pairs, e.g. from release_holds()."""
+    by_event = {}
+    for event_id, seat_id in pairs:
+        by_event.setdefault(event_id, []).append(seat_id)
+    for event_id, seat_ids in by_event.items():
+        index = _indexes.get(event_id)
+        if index is not None:
+            index.release(seat_ids)
+        _publish(event_id, seat_ids, FREE)
@@ -0,0 +1,69 @@
+"""Best-available booking: the server picks and claims the seats.
+
+Instead of sending seat IDs, the customer asks for N seats (optionally in
+one section or under a price cap). The event's availability index picks
+the best block of N adjacent free seats - highest section preference,
+then front rows, then closest to the middle of the row - and holds them in
+memory so concurrent requests are steered to different blocks. The block
+is then claimed with claim_seats() like a hand-picked lock.
+
+The index can lag behind the database (holds made by other workers). When
+the claim hits a taken seat, that seat is marked held in the index and
+another block is picked, up to BEST_AVAILABLE_RETRIES times.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from app import availability
+from app.seat_holds import claim_seats, hold_duration, SeatConflict
+
+# How long picked seats stay reserved in the index while the claim runs
+PICK_HOLD = timedelta(seconds=30)
+
+
+class NoSeatsAvailable(Exception):
+    """No eligible row has enough adjacent free seats."""
+
+
+def row_filter(index, section=None, max_price=None):
+    """eligible() for pick_best: rows in the named section whose seats all cost at most max_price."""
+    if section is None and max_price is None:
+        return None
+    layout = index.layout
+    section_id = layout.sections.index(section) if section in layout.sections else -1
+
+    def eligible(row):
+        if section is not None and layout.seat_sections[row[0]] != section_id:
+            return False
+        if max_price is not None:
+            return all(index.base_price * layout.multiplier(i) <= max_price for i in row)
+        return True
+    return eligible
+
+
+def claim_best(event, user_id, quantity, section=None, max_price=None):
+    """Pick and claim the best quantity adjacent seats. Returns (booking, seats).
+
+    Raises NoSeatsAvailable, or SeatConflict if every attempt lost a race.
+    """
+    index = availability.get_index(event.id)
+    eligible = row_filter(index, section, max_price)
+    attempts = current_app.config.get('BEST_AVAILABLE_RETRIES', 3) + 1
+
+    conflict = None
+    for _ in range(attempts):
+        now = datetime.utcnow()
+        seat_ids = index.pick_best(quantity, now + PICK_HOLD, eligible, now)
+        if seat_ids is None:
+            raise NoSeatsAvailable()
+        try:
+            return claim_seats(event, user_id, seat_ids)
+        except SeatConflict as e:
+            conflict = e
+            # Taken elsewhere: keep those out of the next pick, free the rest
+            taken = set(e.seat_ids)
+            index.hold(taken, now + hold_duration(event))
+            index.release([s_id for s_id in seat_ids if s_id not in taken])
+        except Exception:
+            index.release(seat_ids)
+            raise
+    raise conflict
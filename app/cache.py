@@ -0,0 +1,289 @@
+"""Response caching for read-heavy API routes, with tag-based invalidation.
+
+    @events_bp.route('/<int:event_id>')
+    @cached(tags=lambda event_id: [f"event:{event_id}"])
+    def get_event_details(event_id): ...
+
+    cache.invalidate(f"event:{event_id}")   # from the write path
+
+A cached view's 200 responses are stored under its endpoint, URL arguments
+and query string (and the caller's identity with vary_user=True, for
+per-user views). Each entry records the version of every tag it was made
+with; invalidate() bumps the versions, so entries of a changed event are
+dropped on their next read without having to find them. Views can add
+tags known only while they run (a venue ID, the current user) with
+add_tags().
+
+Storage is pluggable like app/pubsub.py: CACHE_BACKEND names a factory
+registered with register_backend(). 'local' is a per-process LRU
+(CACHE_MAX_ENTRIES, entries expire after their TTL); with several workers
+an invalidation only reaches the worker that handled the write, others
+catch up within the TTL. 'shared' keeps entries and tag versions in a
+key-value store (get/set with expiry/incr, e.g. a Redis client) so every
+worker sees invalidations at once; until one is registered it runs on
+LocalStore, an in-process stand-in with the same interface.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity
+from app.pagination import NEXT_CURSOR_HEADER
+
+# Response headers kept with a cached body
+CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+
+
+class CacheBackend:
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def tag_versions(self, tags):
+        """Current version of each tag (0 if never invalidated)."""
+        raise NotImplementedError
+
+    def bump(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LocalBackend(CacheBackend):
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        # Tag versions are never evicted; losing one would revive stale entries
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def tag_versions(self, tags):
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            # Keep versions moving forward rather than resetting them
+            for tag in self._versions:
+                self._versions[tag] += 1
+
+    def stats(self):
+        return {"entries": len(self._entries), "max_entries": self.max_entries,
+                "tags": len(self._versions), "evictions": self.evictions}
+
+
+class LocalStore:
+    """In-process stand-in for a shared key-value store (the subset of the
+    Redis client API that KeyValueBackend uses)."""
+
+    def __init__(self):
+        self._data = {}  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None or (item[0] is not None and item[0] <= time.monotonic()):
+            return None
+        return item[1]
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+
+    def incr(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            value = int(item[1]) + 1 if item else 1
+            self._data[key] = (None, str(value).encode())
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+
+class KeyValueBackend(CacheBackend):
+    """Entries as JSON under cache:<key>, tag versions as counters under cache-tag:<tag>."""
+
+    def __init__(self, client=None):
+        self.client = client or LocalStore()
+
+    def get(self, key):
+        raw = self.client.get("cache:" + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set("cache:" + key, json.dumps(value).encode(), ex=max(1, int(ttl)))
+
+    def tag_versions(self, tags):
+        if not tags:
+            return []
+        return [int(v) if v is not None else 0 for v in self.client.mget(["cache-tag:" + t for t in tags])]
+
+    def bump(self, tags):
+        for tag in tags:
+            self.client.incr("cache-tag:" + tag)
+
+    def clear(self):
+        self.client.flushdb()
+
+
+_backends = {
+    'local': lambda config: LocalBackend(config.get('CACHE_MAX_ENTRIES', 2048)),
+    'shared': lambda config: KeyValueBackend(),
+}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    """factory(app_config) -> CacheBackend"""
+    _backends[name] = factory
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = current_app.config
+                _backend = _backends[config.get('CACHE_BACKEND', 'local')](config)
+    return _backend
+
+
+# --- Metrics (per process) ---
+
+_metrics = {}  # endpoint -> {"hits", "misses", "stale"}
+_metrics_lock = threading.Lock()
+_invalidations = 0
+
+
+def _count(endpoint, field):
+    with _metrics_lock:
+        counters = _metrics.get(endpoint)
+        if counters is None:
+            counters = _metrics[endpoint] = {"hits": 0, "misses": 0, "stale": 0}
+        counters[field] += 1
+
+
+def metrics():
+    with _metrics_lock:
+        routes = {}
+        for endpoint, counters in _metrics.items():
+            lookups = counters["hits"] + counters["misses"]
+            routes[endpoint] = dict(counters, hit_rate=round(counters["hits"] / lookups, 3) if lookups else None)
+    return {
+        "backend": current_app.config.get('CACHE_BACKEND', 'local'),
+        "routes": routes,
+        "invalidations": _invalidations,
+        "store": get_backend().stats()
+    }
+
+
+# --- Decorator ---
+
+def add_tags(*tags):
+    """Tag the response of the cached view that is running."""
+    g.setdefault('cache_tags', []).extend(tags)
+
+
+def invalidate(*tags):
+    """Drop every cached response carrying any of these tags."""
+    global _invalidations
+    if not tags:
+        return
+    get_backend().bump(tags)
+    with _metrics_lock:
+        _invalidations += len(tags)
+
+
+def _key(vary_user):
+    parts = [request.endpoint]
+    parts += [f"{k}={v}" for k, v in sorted(request.view_args.items())]
+    parts += [f"{k}={v}" for k, v in sorted(request.args.items(multi=True))]
+    if vary_user:
+        parts.append(f"user={get_jwt_identity()}")
+    return "|".join(parts)
+
+
+def cached(ttl=None, tags=None, vary_user=False):
+    """Cache a view's 200 responses. tags is a list or a function of the
+    view's URL arguments; ttl defaults to CACHE_DEFAULT_TTL. ttl may be the
+    name of a config key. Put it below any auth decorator."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config.get('CACHE_ENABLED', True):
+                return fn(*args, **kwargs)
+            backend = get_backend()
+            endpoint = request.endpoint
+            key = _key(vary_user)
+
+            entry = backend.get(key)
+            if entry is not None:
+                if backend.tag_versions(list(entry["tags"])) == list(entry["tags"].values()):
+                    _count(endpoint, "hits")
+                    return current_app.response_class(entry["body"], status=200, mimetype=entry["mimetype"],
+                                                      headers=entry.get("headers"))
+                _count(endpoint, "stale")
+            _count(endpoint, "misses")
+
+            g.cache_tags = list(tags(**kwargs) if callable(tags) else tags or [])
+            # Versions of the known tags are read before the view runs, so a
+            # write landing meanwhile leaves this entry stale rather than stuck
+            entry_tags = dict.fromkeys(g.cache_tags)
+            versions = backend.tag_versions(list(entry_tags))
+            response = current_app.make_response(fn(*args, **kwargs))
+            for tag in g.cache_tags:
+                if tag not in entry_tags:
+                    entry_tags[tag] = None
+                    versions += backend.tag_versions([tag])
+
+            if response.status_code == 200 and not response.is_streamed and response.mimetype == 'application/json':
+                lifetime = config.get(ttl) if isinstance(ttl, str) else ttl
+                backend.set(key, {
+                    "body": response.get_data(as_text=True),
+                    "mimetype": response.mimetype,
+                    "headers": {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+                    "tags": dict(zip(entry_tags, versions))
+                }, lifetime or config.get('CACHE_DEFAULT_TTL', 60))
+            return response
+        return wrapper
+    return decorator
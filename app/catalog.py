@@ -0,0 +1,100 @@
+"""Public event catalog: filtered, keyset-paginated pages of Active events.
+
+Pages are ordered by (date_time, id) and continue from the X-Next-Cursor
+of the previous page (app/pagination.py), so page 500 costs the same index
+range scan as page 1 instead of an OFFSET over everything before it.
+Upcoming and unfiltered listings run oldest first, past events newest first.
+
+Pages are cached by the route (app/cache.py) under the "catalog" tag for
+CATALOG_CACHE_TTL seconds; invalidate() drops them when an event is
+created or changes status.
+"""
+from datetime import datetime
+from app.models import db, Event, Venue
+from app.pagination import decode_cursor, keyset_filter, page_limit
+from app import cache
+
+WHEN = ('all', 'upcoming', 'past')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+CACHE_TAG = 'catalog'
+
+
+class CatalogQueryError(ValueError):
+    """Bad filter or cursor in a catalog request."""
+
+
+def parse_params(args):
+    """Validate request args into a (when, venue_id, min_price, max_price, q, after, limit) tuple."""
+    when = args.get('when', 'all')
+    if when not in WHEN:
+        raise CatalogQueryError(f"when must be one of {', '.join(WHEN)}")
+    try:
+        venue_id = int(args['venue_id']) if args.get('venue_id') else None
+        min_price = float(args['min_price']) if args.get('min_price') else None
+        max_price = float(args['max_price']) if args.get('max_price') else None
+    except ValueError:
+        raise CatalogQueryError("venue_id, min_price and max_price must be numbers")
+    q = (args.get('q') or '').strip().lower() or None
+
+    after = None
+    if args.get('cursor'):
+        try:
+            date_time, event_id = decode_cursor(args['cursor'])
+            after = (datetime.fromisoformat(date_time), int(event_id))
+        except (ValueError, TypeError):
+            raise CatalogQueryError("Invalid cursor")
+    return (when, venue_id, min_price, max_price, q, after, page_limit(DEFAULT_LIMIT, MAX_LIMIT))
+
+
+def fetch_page(params, now=None):
+    """Run the catalog query. Returns up to limit + 1 rows (see pagination.paginated)."""
+    when, venue_id, min_price, max_price, q, after, limit = params
+    now = now or datetime.utcnow()
+
+    query = db.session.query(
+        Event.id, Event.title, Event.description, Event.date_time, Event.base_price,
+        Event.venue_id, Venue.name.label('venue')
+    ).join(Venue, Venue.id == Event.venue_id).filter(Event.status == 'Active')
+
+    if when == 'upcoming':
+        query = query.filter(Event.date_time >= now)
+    elif when == 'past':
+        query = query.filter(Event.date_time < now)
+    if venue_id is not None:
+        query = query.filter(Event.venue_id == venue_id)
+    if min_price is not None:
+        query = query.filter(Event.base_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Event.base_price <= max_price)
+    if q:
+        query = query.filter(db.func.lower(Event.title).contains(q, autoescape=True))
+
+    descending = when == 'past'
+    if after:
+        query = query.filter(keyset_filter([Event.date_time, Event.id], list(after), descending=descending))
+    if descending:
+        query = query.order_by(Event.date_time.desc(), Event.id.desc())
+    else:
+        query = query.order_by(Event.date_time, Event.id)
+    return query.limit(limit + 1).all()
+
+
+def serialize(row):
+    return {
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "date_time": row.date_time.isoformat(),
+        "venue_id": row.venue_id,
+        "venue": row.venue,
+        "base_price": row.base_price
+    }
+
+
+def invalidate(event=None):
+    """Drop cached catalog pages and search results, and the event's own cached views."""
+    tags = [CACHE_TAG]
+    if event is not None:
+        tags += [f"event:{event.id}", f"events:organizer:{event.organizer_id}"]
+    cache.invalidate(*tags)
@@ -0,0 +1,30 @@
+"""Collision-free codes for tickets and payments.
+
+Codes are ULIDs: a 48-bit millisecond timestamp followed by 80 random
+bits, written as 26 Crockford base32 characters. They sort by creation
+time (handy in indexes and logs) and two codes made in the same
+millisecond still differ in 80 random bits, so concurrent requests can't
+collide the way timestamp-based codes did.
+"""
+import os
+import time
+
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def ulid(now=None):
+    millis = int((now if now is not None else time.time()) * 1000)
+    value = (millis << 80) | int.from_bytes(os.urandom(10), 'big')
+    chars = []
+    for _ in range(26):
+        value, rem = divmod(value, 32)
+        chars.append(_ALPHABET[rem])
+    return ''.join(reversed(chars))
+
+
+def ticket_code():
+    return f"TKT-{ulid()}"
+
+
+def payment_reference():
+    return f"TXN-{ulid()}"
@@ -0,0 +1,138 @@
+"""Background expiry of stale Pending bookings.
+
+Bookings are scheduled on a heap ordered by expires_at when they are
+locked, and before every sweep the heap is topped up with the Pending
+bookings expiring within EXPIRY_LOOKAHEAD seconds, so bookings locked by
+other workers or processes are picked up too, whatever order their IDs
+were committed in. Each sweep pops the due entries and
+cancels them with batched UPDATEs, then deletes their seat holds so the
+hold table only contains live claims. Expired idempotency keys are purged
+on the same schedule.
+
+Run it as a thread next to the web app (EXPIRY_SWEEPER=thread, started
+from run.py) or as a dedicated process with expiry_worker.py.
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from app.models import db, Booking
+from app.seat_holds import cancel_bookings
+from app import availability, idempotency
+
+
+class ExpiryScheduler:
+    def __init__(self, batch_size=500, lookahead=timedelta(seconds=60)):
+        self.batch_size = batch_size
+        self.lookahead = lookahead  # how far ahead load_pending() reads expiries
+        self._heap = []           # (expires_at, booking_id)
+        self._scheduled = set()   # booking IDs currently on the heap
+        self._lock = threading.Lock()
+
+        self.sweeps = 0
+        self.expired_total = 0
+        self.last_sweep_at = None
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def schedule(self, booking_id, expires_at):
+        with self._lock:
+            if booking_id not in self._scheduled:
+                self._scheduled.add(booking_id)
+                heapq.heappush(self._heap, (expires_at, booking_id))
+
+    def load_pending(self, now=None):
+        """Schedule Pending bookings expiring within the lookahead (e.g. locked by other workers)."""
+        now = now or datetime.utcnow()
+        # Served by the (status, expires_at) index; already scheduled ones are skipped
+        rows = db.session.query(Booking.id, Booking.expires_at).filter(
+            Booking.status == 'Pending',
+            Booking.expires_at <= now + self.lookahead
+        ).all()
+        for booking_id, expires_at in rows:
+            self.schedule(booking_id, expires_at)
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                expires_at, booking_id = heapq.heappop(self._heap)
+                self._scheduled.discard(booking_id)
+                due.append((expires_at, booking_id))
+        return due
+
+    def sweep(self, now=None):
+        """Cancel every due booking. Returns the number of bookings expired."""
+        now = now or datetime.utcnow()
+        expired = 0
+        lag = 0.0
+
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                break
+            ids = [booking_id for _, booking_id in due]
+            lag = max(lag, (now - due[0][0]).total_seconds())
+
+            cancelled, released = cancel_bookings(ids, expired_before=now)
+
+            # Bookings whose expiry was pushed back are put back on the heap
+            for booking_id, expires_at in db.session.query(Booking.id, Booking.expires_at).filter(
+                Booking.id.in_(ids),
+                Booking.status == 'Pending',
+                Booking.expires_at > now
+            ).all():
+                self.schedule(booking_id, expires_at)
+
+            db.session.commit()
+            availability.seats_released(released)
+            expired += len(cancelled)
+
+        with self._lock:
+            self.sweeps += 1
+            self.expired_total += expired
+            self.last_sweep_at = now
+            self.last_lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        return expired
+
+    def metrics(self, now=None):
+        now = now or datetime.utcnow()
+        with self._lock:
+            backlog = sum(1 for expires_at, _ in self._heap if expires_at <= now)
+            return {
+                "scheduled": len(self._heap),
+                "backlog": backlog,
+                "sweeps": self.sweeps,
+                "expired_total": self.expired_total,
+                "last_sweep_at": self.last_sweep_at.isoformat() if self.last_sweep_at else None,
+                "last_lag_seconds": round(self.last_lag_seconds, 3),
+                "max_lag_seconds": round(self.max_lag_seconds, 3)
+            }
+
+
+scheduler = ExpiryScheduler()
+
+
+def run_sweeper(app, interval=None, stop_event=None):
+    interval = interval or app.config.get('EXPIRY_SWEEP_INTERVAL', 5)
+    scheduler.batch_size = app.config.get('EXPIRY_SWEEP_BATCH', 500)
+    scheduler.lookahead = timedelta(seconds=app.config.get('EXPIRY_LOOKAHEAD', 60))
+    while not (stop_event and stop_event.is_set()):
+        with app.app_context():
+            try:
+                scheduler.load_pending()
+                scheduler.sweep()
+                idempotency.purge_expired()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Expiry sweep failed")
+            finally:
+                db.session.remove()
+        time.sleep(interval)
+
+
+def start_sweeper_thread(app):
+    thread = threading.Thread(target=run_sweeper, args=(app,), name='expiry-sweeper', daemon=True)
+    thread.start()
+    return thread
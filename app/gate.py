@@ -0,0 +1,242 @@
+"""Gate scanning (check-in) backed by an in-memory code index per event.
+
+Before doors open the event's ticket codes are preloaded into a dict, so
+a scan is a dictionary lookup under a lock, and the "Used" status is
+written to the database behind the scan by a background flusher in
+batched UPDATEs.
+
+Scan results:
+- admitted:      the ticket was valid and is now used
+- already_used:  the ticket was used by an earlier scan (a retried scan
+                 with the same scan_id gets its original "admitted" back)
+- invalid:       unknown code, or a cancelled ticket
+
+A code missing from the index is looked up in the database before it is
+rejected, so tickets sold after the preload still scan.
+
+The lock makes admission race-free within one process. Route all gates of
+an event to the same process; the flusher only updates tickets that are
+still Valid, and counts any that another process got to first as
+late_conflicts.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from app.models import db, Booking, Ticket, Seat, Event
+
+ADMITTED = 'admitted'
+ALREADY_USED = 'already_used'
+INVALID = 'invalid'
+
+
+class GateIndex:
+    def __init__(self, event_id, organizer_id):
+        self.event_id = event_id
+        self.organizer_id = organizer_id
+        self.loaded_at = datetime.utcnow()
+        # code -> [ticket_id, seat_label, used_at, scan_id]
+        self.codes = {}
+        self.by_ticket = {}  # ticket_id -> the same entry lists
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def add(self, code, ticket_id, seat_label, used_at=None):
+        self.codes[code] = self.by_ticket[ticket_id] = [ticket_id, seat_label, used_at, None]
+        if used_at is not None:
+            self.used += 1
+
+    def mark_used(self, ticket_ids, now=None):
+        """Record check-ins that were already written elsewhere (e.g. offline scanner logs)."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            for ticket_id in ticket_ids:
+                entry = self.by_ticket.get(ticket_id)
+                if entry is not None and entry[2] is None:
+                    entry[2] = now
+                    self.used += 1
+
+    def scan(self, code, scan_id=None, now=None):
+        """Check one code. Returns (result, entry) and queues the write for admitted tickets."""
+        if code not in self.codes and not self.load_code(code):
+            return INVALID, None
+        with self._lock:
+            entry = self.codes.get(code)
+            if entry is None:
+                return INVALID, None
+            if entry[2] is not None:
+                if scan_id is not None and entry[3] == scan_id:
+                    return ADMITTED, entry
+                return ALREADY_USED, entry
+            entry[2] = now or datetime.utcnow()
+            entry[3] = scan_id
+            self.used += 1
+        writer.enqueue(entry[0])
+        return ADMITTED, entry
+
+    def load_code(self, code):
+        """Add a ticket that became Valid after the preload. Returns False if the code is not admissible."""
+        row = _tickets(self.event_id).filter(Ticket.unique_code == code).first()
+        if row is None:
+            return False
+        ticket_id, code, status, row_label, seat_number = row
+        with self._lock:
+            if code not in self.codes:
+                self.add(code, ticket_id, f"{row_label}{seat_number}",
+                         used_at=datetime.utcnow() if status == 'Used' else None)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "event_id": self.event_id,
+                "tickets": len(self.codes),
+                "used": self.used,
+                "loaded_at": self.loaded_at.isoformat()
+            }
+
+
+def _tickets(event_id):
+    # Admissible tickets only; cancelled and unpaid tickets are left out so
+    # they scan as invalid
+    return db.session.query(
+        Ticket.id, Ticket.unique_code, Ticket.status, Seat.row_label, Seat.seat_number
+    ).join(Booking, Booking.id == Ticket.booking_id).join(Seat, Seat.id == Ticket.seat_id).filter(
+        Booking.event_id == event_id,
+        Booking.status == 'Confirmed',
+        Ticket.status.in_(['Valid', 'Used'])
+    )
+
+
+def build_index(event_id):
+    event = Event.query.get(event_id)
+    if event is None:
+        return None
+    index = GateIndex(event.id, event.organizer_id)
+
+    # One pass over the event's tickets
+    for ticket_id, code, status, row_label, seat_number in _tickets(event_id).yield_per(5000):
+        index.add(code, ticket_id, f"{row_label}{seat_number}",
+                  used_at=index.loaded_at if status == 'Used' else None)
+    return index
+
+
+_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def preload(event_id):
+    """(Re)build the event's code index, e.g. before doors open. Pending writes are flushed first."""
+    writer.flush()
+    index = build_index(event_id)
+    with _registry_lock:
+        if index is None:
+            _indexes.pop(event_id, None)
+        else:
+            _indexes[event_id] = index
+    return index
+
+
+def get_index(event_id):
+    index = _indexes.get(event_id)
+    if index is None:
+        index = preload(event_id)
+    return index
+
+
+def unload(event_id):
+    writer.flush()
+    with _registry_lock:
+        _indexes.pop(event_id, None)
+
+
+# --- Write-behind ---
+
+class UsedTicketWriter:
+    """Collects admitted ticket IDs and marks them Used in batched UPDATEs."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self._pending = deque()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.written = 0
+        self.batches = 0
+        self.late_conflicts = 0
+        self.last_flush_at = None
+
+    def enqueue(self, ticket_id):
+        self._pending.append(ticket_id)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write every queued ticket. Runs in the caller's app context; returns the number written."""
+        written = 0
+        with self._flush_lock:
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popleft())
+                try:
+                    updated = Ticket.query.filter(
+                        Ticket.id.in_(batch),
+                        Ticket.status == 'Valid'
+                    ).update({"status": 'Used'}, synchronize_session=False)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    # Put the batch back so the next flush retries it
+                    self._pending.extendleft(reversed(batch))
+                    raise
+                self.batches += 1
+                self.late_conflicts += len(batch) - updated
+                written += updated
+            self.written += written
+            self.last_flush_at = datetime.utcnow()
+        return written
+
+    def run(self, app, interval, stop_event=None):
+        while not (stop_event and stop_event.is_set()):
+            self._wake.wait(interval)
+            self._wake.clear()
+            if not self._pending:
+                continue
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    app.logger.exception("Gate write-behind flush failed")
+                    time.sleep(interval)
+                finally:
+                    db.session.remove()
+
+    def start(self, app):
+        """Start the background flusher once per process."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._flush_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.batch_size = app.config.get('GATE_FLUSH_BATCH', 1000)
+                self._thread = threading.Thread(
+                    target=self.run, args=(app, app.config.get('GATE_FLUSH_INTERVAL', 0.5)),
+                    name='gate-writer', daemon=True
+                )
+                self._thread.start()
+
+    def metrics(self):
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "batches": self.batches,
+            "late_conflicts": self.late_conflicts,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None
+        }
+
+
+writer = UsedTicketWriter()
@@ -0,0 +1,93 @@
+"""Password hashing on a small bounded thread pool.
+
+scrypt/PBKDF2 are deliberately slow (100ms+ per hash). Running them on a
+fixed pool (PASSWORD_HASH_WORKERS) caps how much CPU logins can take, and
+the queue limit (PASSWORD_HASH_QUEUE) makes a login burst fail fast with
+HashingBusy instead of piling up request threads behind it. hashlib
+releases the GIL while hashing, so a thread pool is enough.
+
+PASSWORD_HASH_METHOD is any werkzeug method string ("scrypt",
+"pbkdf2:sha256:600000", ...). Hashes made with other parameters still
+verify, and needs_rehash() tells login to upgrade them.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a job waited past PASSWORD_HASH_TIMEOUT."""
+
+
+class HashingPool:
+    def __init__(self, workers=2, queue_limit=16):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Running plus waiting jobs
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.rejected = 0
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_method_prefixes = {}
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = current_app.config
+                _pool = HashingPool(config.get('PASSWORD_HASH_WORKERS', 2), config.get('PASSWORD_HASH_QUEUE', 16))
+    return _pool
+
+
+def _method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def _timeout():
+    return current_app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+
+
+def _run(fn, *args):
+    future = get_pool().submit(fn, *args)
+    try:
+        return future.result(_timeout())
+    except FutureTimeout:
+        # The job keeps its slot until it finishes, so the pool stays bounded
+        raise HashingBusy()
+
+
+def hash_password(password):
+    """Hash on the pool and wait for it. Raises HashingBusy if the queue is full or the wait times out."""
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(password_hash, password):
+    """Check on the pool and wait for it. Raises HashingBusy if the queue is full or the wait times out."""
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if the hash was made with different parameters than PASSWORD_HASH_METHOD."""
+    method = _method()
+    prefix = _method_prefixes.get(method)
+    if prefix is None:
+        # werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"),
+        # so take the canonical prefix from a real hash
+        prefix = _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != prefix
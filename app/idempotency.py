@@ -0,0 +1,142 @@
+"""Idempotency keys for retry-safe POST endpoints.
+
+    @bookings_bp.route('/confirm', methods=['POST'])
+    @jwt_required()
+    @idempotent
+    def confirm_booking(): ...
+
+A client sends a unique Idempotency-Key header (e.g. a UUID) with a
+request and reuses it when retrying that request. The first request claims
+the key (a row in event_idempotency_keys, unique per user), runs, and
+stores its response; a retry with the same key gets that response back
+(marked Idempotent-Replayed) instead of running the view again. Requests
+without the header run as before.
+
+    same key, request still running      409
+    same key, different endpoint/body    422
+    view failed with a 5xx               key released, a retry runs again
+
+If a worker dies between the view's commit and storing the response, the
+key stays claimed; after IDEMPOTENCY_LOCK_TIMEOUT seconds a retry takes it
+over and runs the view again, which is why idempotent views must still
+refuse to redo finished work (confirm does: the booking is no longer
+Pending). Keys are kept for IDEMPOTENCY_KEY_TTL seconds and purged by
+purge_expired().
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from app.models import db, IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 100
+
+
+def _fingerprint():
+    digest = hashlib.sha256(request.endpoint.encode('utf-8') + b'\0')
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(record):
+    response = current_app.response_class(record.response_body, status=record.status_code,
+                                          mimetype='application/json')
+    response.headers[REPLAY_HEADER] = 'true'
+    return response
+
+
+def _claim(user_id, key, fingerprint, now):
+    """Claim the key for this request. Returns (record, None) or (None, response to send)."""
+    config = current_app.config
+    ttl = timedelta(seconds=config.get('IDEMPOTENCY_KEY_TTL', 86400))
+    lock_timeout = timedelta(seconds=config.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+    record = IdempotencyKey(user_id=user_id, key=key, endpoint=request.endpoint,
+                            request_hash=fingerprint, created_at=now)
+    db.session.add(record)
+    try:
+        db.session.commit()
+        return record, None
+    except IntegrityError:
+        db.session.rollback()
+
+    existing = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    if existing is None:
+        # Released by a failed request in the meantime
+        return None, (jsonify({"msg": "A request with this Idempotency-Key is in progress, retry"}), 409)
+    if existing.created_at <= now - ttl:
+        # An old key is free for reuse
+        existing.endpoint, existing.request_hash = request.endpoint, fingerprint
+        existing.status_code = existing.response_body = None
+        existing.created_at = now
+        db.session.commit()
+        return existing, None
+    if existing.request_hash != fingerprint or existing.endpoint != request.endpoint:
+        return None, (jsonify({"msg": "Idempotency-Key was already used for a different request"}), 422)
+    if existing.status_code is not None:
+        return None, _replay(existing)
+    if existing.created_at <= now - lock_timeout:
+        # The first attempt died before storing its response: take over
+        claimed = IdempotencyKey.query.filter_by(id=existing.id, created_at=existing.created_at).update(
+            {"created_at": now}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return IdempotencyKey.query.get(existing.id), None
+    return None, (jsonify({"msg": "A request with this Idempotency-Key is in progress"}), 409)
+
+
+def idempotent(fn):
+    """Replay the stored response for a repeated Idempotency-Key. Put it below jwt_required()."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return fn(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"msg": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        user_id = int(get_jwt_identity())
+        record, response = _claim(user_id, key, _fingerprint(), datetime.utcnow())
+        if response is not None:
+            return response
+        record_id = record.id
+
+        try:
+            response = current_app.make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+            db.session.commit()
+            raise
+
+        if response.status_code >= 500 or response.mimetype != 'application/json':
+            # Not a final answer: let the client retry with the same key
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+        else:
+            IdempotencyKey.query.filter_by(id=record_id).update({
+                "status_code": response.status_code,
+                "response_body": response.get_data(as_text=True)
+            }, synchronize_session=False)
+        db.session.commit()
+        return response
+    return wrapper
+
+
+def purge_expired(now=None, batch_size=1000):
+    """Delete keys older than IDEMPOTENCY_KEY_TTL. Returns the number deleted."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400))
+    deleted = 0
+    while True:
+        ids = [row[0] for row in db.session.query(IdempotencyKey.id).filter(
+            IdempotencyKey.created_at <= cutoff).limit(batch_size).all()]
+        if not ids:
+            return deleted
+        IdempotencyKey.query.filter(IdempotencyKey.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
@@ -0,0 +1,219 @@
+"""Signed offline ticket manifests for handheld gate scanners.
+
+A manifest lists every valid ticket of an event so a scanner can check
+codes without a connection. It is built while it is streamed: tickets are
+read with a server-side cursor (yield_per) and written out record by
+record, so memory stays flat however many tickets the event has (the
+Bloom filter, a few bits per ticket, is the only thing that grows).
+
+Binary layout, all integers little-endian:
+
+    header   b"EVTM", version u8, flags u8, event_id u32,
+             since u64, watermark u64         (unix ms; since 0 = full manifest)
+    records  ticket_id u32, code_hash 8 bytes, seat label length u8, seat label
+             ... terminated by a ticket_id of 0
+    trailer  record_count u32
+    bloom    (if flags & FLAG_BLOOM) bits u32, hashes u8, bit array (bits / 8 bytes)
+    mac      HMAC-SHA256 over everything above, 32 bytes
+
+code_hash is the first 8 bytes of blake2b(code), so the manifest does not
+carry the codes themselves; a scanner hashes what it scans and looks it
+up. The Bloom filter over the same hashes (positions h1 + i * h2 mod bits,
+with h1/h2 the low/high 32 bits of code_hash) answers "definitely not a
+ticket" without touching the full table.
+
+Deltas: pass the previous manifest's watermark as since, and only tickets
+of bookings confirmed after since - DELTA_OVERLAP are sent. The overlap
+covers transactions that committed late; scanners merge records by
+ticket_id, so seeing a ticket twice is harmless.
+"""
+import hashlib
+import hmac
+import math
+import struct
+from datetime import datetime, timedelta
+from app.models import db, Booking, Ticket, Seat
+
+MAGIC = b"EVTM"
+FORMAT_VERSION = 1
+FLAG_BLOOM = 1
+DELTA_OVERLAP = timedelta(minutes=2)
+
+_HEADER = struct.Struct('<4sBBIQQ')
+_RECORD = struct.Struct('<I8sB')
+_END = struct.Struct('<I')
+_TRAILER = struct.Struct('<I')
+_BLOOM = struct.Struct('<IB')
+
+
+def code_hash(code):
+    return hashlib.blake2b(code.encode('utf-8'), digest_size=8).digest()
+
+
+def to_millis(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def from_millis(ms):
+    return datetime(1970, 1, 1) + timedelta(milliseconds=ms)
+
+
+class BloomFilter:
+    def __init__(self, expected, error_rate=0.01):
+        expected = max(expected, 1)
+        bits = int(-expected * math.log(error_rate) / (math.log(2) ** 2))
+        self.bits = max(64, (bits + 7) // 8 * 8)
+        self.hashes = max(1, round(self.bits / expected * math.log(2)))
+        self.array = bytearray(self.bits // 8)
+
+    def _positions(self, digest):
+        h1, h2 = struct.unpack('<II', digest)
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+def ticket_rows(event_id, since=None, batch_size=2000):
+    """Valid tickets of the event's confirmed bookings, streamed in ticket ID order."""
+    query = db.session.query(
+        Ticket.id, Ticket.unique_code, Seat.row_label, Seat.seat_number
+    ).join(Booking, Booking.id == Ticket.booking_id).join(Seat, Seat.id == Ticket.seat_id).filter(
+        Booking.event_id == event_id,
+        Booking.status == 'Confirmed',
+        Ticket.status == 'Valid'
+    )
+    if since is not None:
+        query = query.filter(Booking.confirmed_at > since - DELTA_OVERLAP)
+    return query.order_by(Ticket.id).yield_per(batch_size)
+
+
+def count_tickets(event_id, since=None):
+    query = db.session.query(db.func.count(Ticket.id)).join(Booking, Booking.id == Ticket.booking_id).filter(
+        Booking.event_id == event_id,
+        Booking.status == 'Confirmed',
+        Ticket.status == 'Valid'
+    )
+    if since is not None:
+        query = query.filter(Booking.confirmed_at > since - DELTA_OVERLAP)
+    return query.scalar()
+
+
+def generate(event_id, key, since=None, bloom=True, watermark=None):
+    """Yield the manifest as byte chunks. key is the HMAC signing key (bytes)."""
+    watermark = watermark or datetime.utcnow()
+    mac = hmac.new(key, digestmod=hashlib.sha256)
+    # Sized from a count up front; a few late sales more only nudge the error rate
+    bloom_filter = BloomFilter(count_tickets(event_id, since) * 11 // 10) if bloom else None
+
+    def emit(chunk):
+        mac.update(chunk)
+        return chunk
+
+    yield emit(_HEADER.pack(
+        MAGIC, FORMAT_VERSION, FLAG_BLOOM if bloom else 0, event_id,
+        to_millis(since) if since else 0, to_millis(watermark)
+    ))
+
+    count = 0
+    buf = bytearray()
+    for ticket_id, code, row_label, seat_number in ticket_rows(event_id, since):
+        digest = code_hash(code)
+        label = f"{row_label}{seat_number}".encode('utf-8')[:255]
+        buf += _RECORD.pack(ticket_id, digest, len(label))
+        buf += label
+        if bloom_filter is not None:
+            bloom_filter.add(digest)
+        count += 1
+        if len(buf) >= 64 * 1024:
+            yield emit(bytes(buf))
+            buf.clear()
+
+    buf += _END.pack(0)
+    buf += _TRAILER.pack(count)
+    if bloom_filter is not None:
+        buf += _BLOOM.pack(bloom_filter.bits, bloom_filter.hashes)
+        buf += bloom_filter.array
+    yield emit(bytes(buf))
+    yield mac.digest()
+
+
+def parse(data, key):
+    """Verify and decode a manifest (the scanner side, also used by the tools).
+
+    Returns a dict with header fields, tickets {code_hash: (ticket_id, seat)}
+    and the Bloom filter, or raises ValueError if the signature or layout is wrong.
+    """
+    body, signature = data[:-32], data[-32:]
+    if not hmac.compare_digest(hmac.new(key, body, hashlib.sha256).digest(), signature):
+        raise ValueError("Manifest signature mismatch")
+
+    magic, version, flags, event_id, since, watermark = _HEADER.unpack_from(body, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a version %d ticket manifest" % FORMAT_VERSION)
+
+    offset = _HEADER.size
+    tickets = {}
+    while True:
+        (ticket_id,) = _END.unpack_from(body, offset)
+        if ticket_id == 0:
+            offset += _END.size
+            break
+        ticket_id, digest, label_len = _RECORD.unpack_from(body, offset)
+        offset += _RECORD.size
+        tickets[digest] = (ticket_id, body[offset:offset + label_len].decode('utf-8'))
+        offset += label_len
+
+    (count,) = _TRAILER.unpack_from(body, offset)
+    offset += _TRAILER.size
+    if count != len(tickets):
+        raise ValueError("Manifest record count mismatch")
+
+    bloom_filter = None
+    if flags & FLAG_BLOOM:
+        bits, hashes = _BLOOM.unpack_from(body, offset)
+        offset += _BLOOM.size
+        bloom_filter = BloomFilter.__new__(BloomFilter)
+        bloom_filter.bits, bloom_filter.hashes = bits, hashes
+        bloom_filter.array = bytearray(body[offset:offset + bits // 8])
+
+    return {
+        "event_id": event_id,
+        "since": from_millis(since) if since else None,
+        "watermark": from_millis(watermark),
+        "tickets": tickets,
+        "bloom": bloom_filter
+    }
+
+
+def ingest_checkins(event_id, entries):
+    """Apply offline check-in logs: entries are dicts with ticket_id (and optional scanned_at, device).
+
+    Returns (applied, already_used, unknown) lists of ticket IDs. Tickets are
+    marked Used in one UPDATE per chunk; already_used means the ticket was
+    used before this upload (another gate or an earlier upload), which on
+    a first upload can flag a double entry.
+    """
+    ticket_ids = sorted({int(e['ticket_id']) for e in entries})
+    applied, already_used, unknown = [], [], []
+    for start in range(0, len(ticket_ids), 1000):
+        chunk = ticket_ids[start:start + 1000]
+        rows = db.session.query(Ticket.id, Ticket.status).join(Booking, Booking.id == Ticket.booking_id).filter(
+            Ticket.id.in_(chunk),
+            Booking.event_id == event_id,
+            Booking.status == 'Confirmed'
+        ).with_for_update().all()
+        status = dict(rows)
+
+        valid = [t_id for t_id in chunk if status.get(t_id) == 'Valid']
+        if valid:
+            Ticket.query.filter(Ticket.id.in_(valid), Ticket.status == 'Valid').update(
+                {"status": 'Used'}, synchronize_session=False)
+        applied += valid
+        already_used += [t_id for t_id in chunk if status.get(t_id) == 'Used']
+        unknown += [t_id for t_id in chunk if status.get(t_id) not in ('Valid', 'Used')]
+    return applied, already_used, unknown
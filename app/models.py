@@ -1,4 +1,5 @@
 from datetime import datetime
+from flask import current_app
 from . import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -9,12 +10,13 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False) # 'customer', 'organizer', 'admin'
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Bumped to retire issued access tokens
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     bookings = db.relationship('Booking', backref='user', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -25,7 +27,8 @@ class Venue(db.Model):
     name = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(200), nullable=False)
     capacity = db.Column(db.Integer, nullable=False)
-    owner_id = db.Column(db.Integer, db.ForeignKey('event_users.id'), nullable=True) # Organizer
+    owner_id = db.Column(db.Integer, db.ForeignKey('event_users.id'), nullable=True, index=True) # Organizer
+    layout = db.Column(db.JSON, nullable=True) # Layout document, see app/seat_layout.py
     
     events = db.relationship('Event', backref='venue', lazy=True)
     seats = db.relationship('Seat', backref='venue', lazy=True, cascade="all, delete-orphan")
@@ -48,12 +51,22 @@ class Event(db.Model):
     description = db.Column(db.Text, nullable=True)
     date_time = db.Column(db.DateTime, nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('event_venues.id'), nullable=False)
-    organizer_id = db.Column(db.Integer, db.ForeignKey('event_users.id'), nullable=False)
+    organizer_id = db.Column(db.Integer, db.ForeignKey('event_users.id'), nullable=False, index=True)
     base_price = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='Active') # Active, Cancelled
+    status = db.Column(db.String(20), default='Active', index=True) # Active, Cancelled
+    hold_minutes = db.Column(db.Integer, nullable=True) # How long a lock keeps seats; NULL = HOLD_MINUTES
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    bookings = db.relationship('Booking', backref='event', lazy=True)
+    __table_args__ = (
+        # Public catalog: Active events paged by (date_time, id)
+        db.Index('ix_event_events_status_date', 'status', 'date_time', 'id'),
+        # Admin event list sorted by date or title, paged by (column, id)
+        db.Index('ix_event_events_date_id', 'date_time', 'id'),
+        db.Index('ix_event_events_title_id', 'title', 'id'),
+    )
+
+    # A booking is almost always shown with its event, so load it in the same query
+    bookings = db.relationship('Booking', backref=db.backref('event', lazy='joined'), lazy=True)
 
 class Booking(db.Model):
     __tablename__ = 'event_bookings'
@@ -63,24 +76,111 @@ class Booking(db.Model):
     status = db.Column(db.String(20), default='Pending') # Pending, Confirmed, Cancelled, Failed
     total_amount = db.Column(db.Float, nullable=False)
     expires_at = db.Column(db.DateTime, nullable=True) # For locking mechanism
+    hold_extensions = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Times the hold was extended
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    confirmed_at = db.Column(db.DateTime, nullable=True) # Delta point for offline gate manifests
     
     tickets = db.relationship('Ticket', backref='booking', lazy=True, cascade="all, delete-orphan")
     payments = db.relationship('Payment', backref='booking', lazy=True)
+    holds = db.relationship('SeatHold', backref='booking', lazy=True, cascade="all, delete-orphan")
+
+    def seat_labels(self):
+        # Tickets only exist once the booking is confirmed; until then its
+        # seats are the ones it holds
+        seats = [t.seat for t in self.tickets] or [h.seat for h in self.holds]
+        return [f"{seat.row_label}{seat.seat_number}" for seat in seats]
+
+    __table_args__ = (
+        # Per-event seat/analytics lookups
+        db.Index('ix_event_bookings_event_status_expires', 'event_id', 'status', 'expires_at'),
+        # "My bookings", newest first
+        db.Index('ix_event_bookings_user_created', 'user_id', 'created_at'),
+        # Expiry sweeper: Pending bookings past expires_at
+        db.Index('ix_event_bookings_status_expires', 'status', 'expires_at'),
+        # Gate manifest deltas: bookings confirmed since the last export
+        db.Index('ix_event_bookings_event_confirmed', 'event_id', 'confirmed_at'),
+    )
+
+class SeatHold(db.Model):
+    # One row per claimed seat of an event. The unique constraint is what makes
+    # seat locking atomic: a seat can only be held (or sold) by one booking.
+    __tablename__ = 'event_seat_holds'
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event_events.id'), nullable=False)
+    seat_id = db.Column(db.Integer, db.ForeignKey('event_seats.id'), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('event_bookings.id'), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=True) # NULL once the booking is confirmed (seat sold)
+
+    __table_args__ = (db.UniqueConstraint('event_id', 'seat_id', name='event_unique_hold_per_seat'),)
+
+    seat = db.relationship('Seat', lazy='joined')
 
 class Ticket(db.Model):
     __tablename__ = 'event_tickets'
     id = db.Column(db.Integer, primary_key=True)
-    booking_id = db.Column(db.Integer, db.ForeignKey('event_bookings.id'), nullable=False)
-    seat_id = db.Column(db.Integer, db.ForeignKey('event_seats.id'), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('event_bookings.id'), nullable=False, index=True)
+    seat_id = db.Column(db.Integer, db.ForeignKey('event_seats.id'), nullable=False, index=True)
     unique_code = db.Column(db.String(50), unique=True, nullable=False)
     status = db.Column(db.String(20), default='Valid') # Valid, Cancelled, Used
 
+    # Tickets are rendered with their seat label, so load the seat in the same query
+    seat = db.relationship('Seat', lazy='joined')
+
+class EventSalesSummary(db.Model):
+    # Running sales counters per event, updated in the same transaction as the
+    # booking change so the analytics endpoints never have to aggregate
+    __tablename__ = 'event_sales_summaries'
+    event_id = db.Column(db.Integer, db.ForeignKey('event_events.id'), primary_key=True)
+    sold_tickets = db.Column(db.Integer, nullable=False, default=0)
+    reserved_tickets = db.Column(db.Integer, nullable=False, default=0) # Seats held by Pending bookings
+    revenue = db.Column(db.Float, nullable=False, default=0.0) # Confirmed bookings only
+    confirmed_bookings = db.Column(db.Integer, nullable=False, default=0)
+    pending_bookings = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Admin event list sorted by revenue, paged by (revenue, event_id)
+        db.Index('ix_event_sales_summaries_revenue', 'revenue', 'event_id'),
+    )
+
 class Payment(db.Model):
     __tablename__ = 'event_payments'
     id = db.Column(db.Integer, primary_key=True)
-    booking_id = db.Column(db.Integer, db.ForeignKey('event_bookings.id'), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('event_bookings.id'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='Pending') # Pending, Paid, Failed
     transaction_id = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    outbox = db.relationship('PaymentOutbox', backref='payment', uselist=False, lazy=True)
+
+class PaymentOutbox(db.Model):
+    # Payments waiting for the gateway. Written in the confirm transaction and
+    # drained by the payment worker (see app/payments.py)
+    __tablename__ = 'event_payment_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    payment_id = db.Column(db.Integer, db.ForeignKey('event_payments.id'), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='Pending') # Pending, Done, Failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Also the lease of a running attempt
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # The worker's poll: Pending rows that are due
+        db.Index('ix_event_payment_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+class IdempotencyKey(db.Model):
+    # Response of a request made with an Idempotency-Key header, replayed when
+    # the client retries with the same key (see app/idempotency.py)
+    __tablename__ = 'event_idempotency_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('event_users.id'), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True) # NULL while the first request is running
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='event_unique_idempotency_key_per_user'),)
@@ -0,0 +1,65 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints.
+
+A cursor is the sort key of the last row of a page, e.g. (created_at, id),
+packed into an opaque URL-safe token. The next page is everything strictly
+after that key, so pages stay cheap no matter how deep the client goes.
+List endpoints keep returning a plain JSON list and put the token for the
+following page in the X-Next-Cursor response header.
+"""
+import base64
+import json
+from datetime import datetime
+from flask import request
+from app.models import db
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def encode_cursor(*values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the list of values packed in token. Raises ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def page_limit(default=50, maximum=200):
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def keyset_filter(columns, values, descending=False):
+    """Filter for rows strictly after values in an ORDER BY over columns.
+
+    Expanded to (a > x) OR (a = x AND b > y) ... rather than a row-value
+    comparison so every backend can serve it from a composite index.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        step = column < value if descending else column > value
+        equal = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(db.and_(*equal, step))
+    return db.or_(*clauses)
+
+
+def paginated(response, rows, limit, key):
+    """Attach X-Next-Cursor to response when a full page was returned.
+
+    rows should be fetched with limit + 1 so a short page means there is no next one.
+    """
+    if len(rows) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[limit - 1]))
+    return response
@@ -0,0 +1,272 @@
+"""Payment outbox and the worker that drains it.
+
+POST /api/bookings/confirm never waits for the payment gateway. It sells
+the booking's seats and, in the same transaction, writes a Pending Payment
+and an outbox row (enqueue()). The worker leases due outbox rows, calls
+the gateway with no transaction open, then records the outcome in one
+short transaction:
+
+    paid      payment Paid, tickets Valid, booking.confirmed_at set (the
+              offline gate manifest's delta point)
+    declined  payment and booking Failed, tickets Cancelled, seats
+              released back into inventory
+    error     retried with exponential backoff; after PAYMENT_MAX_ATTEMPTS
+              it counts as declined
+
+The payment's reference (Payment.transaction_id) is the gateway's
+idempotency key, so a charge retried after a timeout is not taken twice.
+Leasing pushes next_attempt_at PAYMENT_LEASE_SECONDS ahead with a
+conditional UPDATE, so two workers never process the same row and a
+worker that dies mid-call leaves its rows to be retried when the lease
+runs out.
+
+Run the worker as a thread in the web process (PAYMENT_WORKER=thread,
+started from run.py) or on its own with payment_worker.py. Gateways are
+pluggable like app/pubsub.py; 'stub' simulates one locally.
+"""
+import random
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models import db, Booking, Payment, PaymentOutbox, Ticket
+from app.seat_holds import release_holds
+from app import availability, codes, sales
+
+
+class PaymentDeclined(Exception):
+    """The gateway refused the charge; retrying won't help."""
+
+
+class GatewayError(Exception):
+    """Temporary gateway failure (timeout, 5xx); the charge may be retried."""
+
+
+class StubGateway:
+    """Local stand-in for a card gateway: sleeps for latency seconds, then
+    declines or fails a configurable share of charges."""
+
+    def __init__(self, latency=0.5, decline_rate=0.0, error_rate=0.0):
+        self.latency = latency
+        self.decline_rate = decline_rate
+        self.error_rate = error_rate
+        self._charges = {}  # reference -> charge ID, for idempotent retries
+        self._lock = threading.Lock()
+
+    def charge(self, reference, amount):
+        """Charge amount; returns the gateway's charge ID."""
+        time.sleep(self.latency)
+        with self._lock:
+            if reference in self._charges:
+                return self._charges[reference]
+        roll = random.random()
+        if roll < self.error_rate:
+            raise GatewayError("Gateway timed out")
+        if roll < self.error_rate + self.decline_rate:
+            raise PaymentDeclined("Card declined")
+        with self._lock:
+            return self._charges.setdefault(reference, "ch_" + secrets.token_hex(12))
+
+
+_gateways = {
+    'stub': lambda config: StubGateway(
+        config.get('PAYMENT_STUB_LATENCY', 0.5),
+        config.get('PAYMENT_STUB_DECLINE_RATE', 0.0),
+        config.get('PAYMENT_STUB_ERROR_RATE', 0.0)
+    ),
+}
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def register_gateway(name, factory):
+    """factory(app_config) -> object with charge(reference, amount)"""
+    _gateways[name] = factory
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                config = current_app.config
+                _gateway = _gateways[config.get('PAYMENT_GATEWAY', 'stub')](config)
+    return _gateway
+
+
+# --- Outbox ---
+
+_wakeup = threading.Event()
+
+
+def enqueue(booking):
+    """Add a Pending payment for the booking and its outbox row to the current transaction."""
+    payment = Payment(
+        booking_id=booking.id,
+        amount=booking.total_amount,
+        status='Pending',
+        transaction_id=codes.payment_reference()
+    )
+    db.session.add(payment)
+    db.session.flush()
+    db.session.add(PaymentOutbox(payment_id=payment.id, next_attempt_at=datetime.utcnow()))
+    return payment
+
+
+def notify():
+    """Wake an in-process worker after committing new outbox rows."""
+    _wakeup.set()
+
+
+def lease_due(batch_size, lease, now=None):
+    """Lease up to batch_size due rows. Returns their outbox IDs."""
+    now = now or datetime.utcnow()
+    due = db.session.query(PaymentOutbox.id, PaymentOutbox.next_attempt_at).filter(
+        PaymentOutbox.status == 'Pending',
+        PaymentOutbox.next_attempt_at <= now
+    ).order_by(PaymentOutbox.next_attempt_at).limit(batch_size).all()
+
+    leased = []
+    for outbox_id, due_at in due:
+        # Only succeeds if no other worker moved the row since we read it
+        updated = PaymentOutbox.query.filter(
+            PaymentOutbox.id == outbox_id,
+            PaymentOutbox.status == 'Pending',
+            PaymentOutbox.next_attempt_at == due_at
+        ).update({
+            PaymentOutbox.next_attempt_at: now + lease,
+            PaymentOutbox.attempts: PaymentOutbox.attempts + 1
+        }, synchronize_session=False)
+        if updated:
+            leased.append(outbox_id)
+    db.session.commit()
+    return leased
+
+
+def _record_paid(outbox_id, payment_id, booking_id, now):
+    Payment.query.filter(Payment.id == payment_id).update({"status": 'Paid'}, synchronize_session=False)
+    PaymentOutbox.query.filter(PaymentOutbox.id == outbox_id).update(
+        {"status": 'Done', "last_error": None}, synchronize_session=False)
+    Ticket.query.filter(Ticket.booking_id == booking_id, Ticket.status == 'Reserved').update(
+        {"status": 'Valid'}, synchronize_session=False)
+    Booking.query.filter(Booking.id == booking_id).update({"confirmed_at": now}, synchronize_session=False)
+    db.session.commit()
+
+
+def _record_failed(outbox_id, payment_id, booking_id, error):
+    Payment.query.filter(Payment.id == payment_id).update({"status": 'Failed'}, synchronize_session=False)
+    PaymentOutbox.query.filter(PaymentOutbox.id == outbox_id).update(
+        {"status": 'Failed', "last_error": error[:255]}, synchronize_session=False)
+
+    booking = db.session.query(Booking.event_id, Booking.total_amount).filter(
+        Booking.id == booking_id, Booking.status == 'Confirmed'
+    ).with_for_update().first()
+    released = []
+    if booking is not None:
+        Booking.query.filter(Booking.id == booking_id).update({"status": 'Failed'}, synchronize_session=False)
+        Ticket.query.filter(Ticket.booking_id == booking_id).update({"status": 'Cancelled'}, synchronize_session=False)
+        released = release_holds([booking_id])
+        sales.adjust(booking.event_id, revenue=-booking.total_amount, confirmed_bookings=-1)
+    db.session.commit()
+    availability.seats_released(released)
+
+
+def _record_retry(outbox_id, attempts, error, now):
+    delay = current_app.config.get('PAYMENT_RETRY_DELAY', 5) * 2 ** (attempts - 1)
+    PaymentOutbox.query.filter(PaymentOutbox.id == outbox_id).update({
+        "next_attempt_at": now + timedelta(seconds=min(delay, 600)),
+        "last_error": error[:255]
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def process(outbox_id):
+    """Send one leased payment to the gateway and record the outcome. Returns the new status."""
+    row = db.session.query(
+        PaymentOutbox.attempts, Payment.id, Payment.transaction_id, Payment.amount, Payment.booking_id
+    ).join(Payment, Payment.id == PaymentOutbox.payment_id).filter(PaymentOutbox.id == outbox_id).one()
+    attempts, payment_id, reference, amount, booking_id = row
+    # Nothing is held open while the gateway call runs
+    db.session.commit()
+
+    try:
+        get_gateway().charge(reference, amount)
+    except PaymentDeclined as e:
+        _record_failed(outbox_id, payment_id, booking_id, str(e))
+        return 'Failed'
+    except Exception as e:
+        if attempts >= current_app.config.get('PAYMENT_MAX_ATTEMPTS', 5):
+            _record_failed(outbox_id, payment_id, booking_id, f"Gave up after {attempts} attempts: {e}")
+            return 'Failed'
+        _record_retry(outbox_id, attempts, str(e), datetime.utcnow())
+        return 'Pending'
+    _record_paid(outbox_id, payment_id, booking_id, datetime.utcnow())
+    return 'Done'
+
+
+def drain(app, executor=None):
+    """Process every due outbox row. Returns {status: count}."""
+    config = app.config
+    lease = timedelta(seconds=config.get('PAYMENT_LEASE_SECONDS', 60))
+    counts = {}
+
+    def run(outbox_id):
+        with app.app_context():
+            try:
+                return process(outbox_id)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Payment processing failed (outbox %s)", outbox_id)
+                return 'Error'
+            finally:
+                db.session.remove()
+
+    while True:
+        with app.app_context():
+            try:
+                leased = lease_due(config.get('PAYMENT_BATCH_SIZE', 50), lease)
+            finally:
+                db.session.remove()
+        if not leased:
+            return counts
+        # Gateway calls are slow I/O, so a batch runs concurrently
+        results = executor.map(run, leased) if executor else map(run, leased)
+        for status in results:
+            counts[status] = counts.get(status, 0) + 1
+
+
+def stats():
+    rows = db.session.query(PaymentOutbox.status, db.func.count(PaymentOutbox.id)).group_by(
+        PaymentOutbox.status).all()
+    counts = {status: count for status, count in rows}
+    oldest = db.session.query(db.func.min(PaymentOutbox.created_at)).filter(
+        PaymentOutbox.status == 'Pending').scalar()
+    return {
+        "pending": counts.get('Pending', 0),
+        "done": counts.get('Done', 0),
+        "failed": counts.get('Failed', 0),
+        "oldest_pending_at": oldest.isoformat() if oldest else None,
+        "gateway": current_app.config.get('PAYMENT_GATEWAY', 'stub')
+    }
+
+
+def run_worker(app, interval=None, stop_event=None):
+    interval = interval or app.config.get('PAYMENT_POLL_INTERVAL', 2)
+    with ThreadPoolExecutor(max_workers=app.config.get('PAYMENT_CONCURRENCY', 8),
+                            thread_name_prefix='payment') as executor:
+        while not (stop_event and stop_event.is_set()):
+            try:
+                drain(app, executor)
+            except Exception:
+                app.logger.exception("Payment outbox drain failed")
+            # Confirmations in this process wake the worker straight away
+            _wakeup.wait(interval)
+            _wakeup.clear()
+
+
+def start_worker_thread(app):
+    thread = threading.Thread(target=run_worker, args=(app,), name='payment-worker', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,178 @@
+"""In-process publish/subscribe for live updates (seat availability streams).
+
+Publishers never block: every subscriber has a bounded queue, and a
+subscriber that falls behind has its queue dropped and is told to resync
+(refetch full state) instead of slowing the publisher down or growing
+memory without limit.
+
+The broker is pluggable. PUBSUB_BACKEND picks a factory registered with
+register_backend(); the default 'memory' backend only fans out within one
+process, so with several workers each worker only sees its own events.
+A shared backend (e.g. Redis pub/sub) can be registered under another name
+and implement the same publish/subscribe interface.
+"""
+import threading
+from collections import deque
+from flask import current_app, has_app_context
+
+RESYNC = object()  # Returned by Subscription.get() after messages were dropped
+
+
+class TooManySubscribers(Exception):
+    """subscribe() was called with max_subscribers and the broker is at that limit."""
+
+
+class Subscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.maxsize = maxsize
+        # A plain deque plus an Event is much cheaper per publish than
+        # queue.Queue, which matters when one publish fans out to thousands
+        self._messages = deque()
+        self._ready = threading.Event()
+        self._overflowed = False
+        self.dropped = 0
+
+    def put(self, message):
+        # Called by the publisher; never blocks
+        if self._overflowed or len(self._messages) >= self.maxsize:
+            self._overflowed = True
+            self.dropped += 1
+        else:
+            self._messages.append(message)
+        if not self._ready.is_set():
+            self._ready.set()
+
+    def get(self, timeout=None):
+        """Return the next (id, message), RESYNC, or None on timeout."""
+        if self._overflowed:
+            # Whatever is still queued is stale once anything was dropped
+            self._overflowed = False
+            self._messages.clear()
+            return RESYNC
+        try:
+            return self._messages.popleft()
+        except IndexError:
+            pass
+        if timeout == 0:
+            return None
+        self._ready.clear()
+        if not self._messages and not self._overflowed:
+            self._ready.wait(timeout)
+        if self._overflowed:
+            return self.get()
+        try:
+            return self._messages.popleft()
+        except IndexError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, maxsize=100, last_id=None, max_subscribers=None):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class InMemoryBroker(Broker):
+    def __init__(self, history=256):
+        self._channels = {}   # channel -> set of subscriptions
+        self._history = {}    # channel -> deque of (id, message) for reconnects
+        self._history_size = history
+        self._last_ids = {}   # channel -> id of the last message published
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, channel, message):
+        with self._lock:
+            message_id = self._last_ids[channel] = self._last_ids.get(channel, 0) + 1
+            self._history.setdefault(channel, deque(maxlen=self._history_size)).append((message_id, message))
+            subscribers = list(self._channels.get(channel, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription.put((message_id, message))
+        return message_id
+
+    def subscribe(self, channel, maxsize=100, last_id=None, max_subscribers=None):
+        """Subscribe to a channel. With last_id, messages published after it are replayed
+        if they are still in the channel history; otherwise the first get() is RESYNC.
+
+        Raises TooManySubscribers if max_subscribers are already subscribed (all channels).
+        """
+        subscription = Subscription(self, channel, maxsize)
+        with self._lock:
+            if max_subscribers is not None and self._count() >= max_subscribers:
+                raise TooManySubscribers()
+            self._channels.setdefault(channel, set()).add(subscription)
+            if last_id is not None:
+                # Message ids count up per channel, so a gap before the oldest
+                # kept message (or an id we never issued) means lost messages
+                history = self._history.get(channel, ())
+                if last_id > self._last_ids.get(channel, 0) or (history and history[0][0] > last_id + 1):
+                    subscription._overflowed = True
+                else:
+                    for item in history:
+                        if item[0] > last_id:
+                            subscription.put(item)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def _count(self):
+        # Callers hold self._lock
+        return sum(len(s) for s in self._channels.values())
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return self._count()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "channels": len(self._channels),
+                "subscribers": self._count(),
+                "published": self.published
+            }
+
+
+_backends = {'memory': InMemoryBroker}
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    _backends[name] = factory
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                name = current_app.config.get('PUBSUB_BACKEND', 'memory') if has_app_context() else 'memory'
+                _broker = _backends[name]()
+    return _broker
+
+
+def publish(channel, message):
+    return get_broker().publish(channel, message)
@@ -0,0 +1,147 @@
+"""Pre-rendered ticket QR codes.
+
+Rendering a QR image with qrcode/PIL is the expensive part of the ticket
+page, and tickets are reopened constantly on event day. Images are cached
+in two layers:
+
+- an in-process LRU keyed by (booking_id, QR_CODE_VERSION, format)
+- a content-addressed store on disk (QR_CACHE_DIR, default instance/qr):
+  the file name is the sha256 of the QR payload and render settings, so
+  workers share it and it never needs invalidating
+
+Bump QR_CODE_VERSION when the payload or the rendering changes; old files
+are then simply never read again.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from flask import current_app
+import qrcode
+import qrcode.image.svg
+
+QR_CODE_VERSION = 1
+
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+
+def qr_payload(booking_id):
+    # Data format: "EVENTRA:BOOKING:<ID>"
+    return f"EVENTRA:BOOKING:{booking_id}"
+
+
+def render(payload, fmt='png'):
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    if fmt == 'svg':
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+
+    buf = io.BytesIO()
+    img.save(buf)
+    return buf.getvalue()
+
+
+class QRCache:
+    def __init__(self, directory=None, max_entries=1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    def _digest(self, payload, fmt):
+        return hashlib.sha256(f"{QR_CODE_VERSION}:{fmt}:{payload}".encode('utf-8')).hexdigest()
+
+    def _path(self, digest, fmt):
+        return os.path.join(self.directory, digest[:2], f"{digest}.{fmt}")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _store(self, path, data):
+        # Write then rename, so other workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Still served from memory; the disk copy is only an optimization
+            current_app.logger.warning("QR cache write failed: %s", e)
+
+    def get(self, booking_id, fmt='png'):
+        """Return (image_bytes, digest) for a booking's QR code, rendering it at most once."""
+        key = (booking_id, QR_CODE_VERSION, fmt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        payload = qr_payload(booking_id)
+        digest = self._digest(payload, fmt)
+        path = self._path(digest, fmt) if self.directory else None
+
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.disk_hits += 1
+        else:
+            data = render(payload, fmt)
+            self.renders += 1
+            if path:
+                self._store(path, data)
+
+        entry = (data, digest)
+        self._remember(key, entry)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = current_app.config
+                directory = config.get('QR_CACHE_DIR') or os.path.join(current_app.instance_path, 'qr')
+                _cache = QRCache(directory, config.get('QR_CACHE_SIZE', 1024))
+    return _cache
+
+
+def get_qr(booking_id, fmt='png'):
+    return get_cache().get(booking_id, fmt)
+
+
+def pregenerate(booking_id, formats=('png',)):
+    """Render a booking's QR code ahead of the first ticket view (e.g. at confirmation)."""
+    for fmt in formats:
+        get_qr(booking_id, fmt)
@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify
-from app.models import User, Event, Booking, db
+from app.models import User, Event, Booking, EventSalesSummary, db
+from datetime import datetime
 from app.routes.auth import role_required
+from app import availability, expiry, payments, user_cache, catalog, search, cache, waiting_room
+from app.users import import_users, IMPORT_ROLES
+from app.pagination import page_limit, decode_cursor, keyset_filter, paginated
+import io
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -11,9 +16,8 @@ def get_stats():
         user_count = User.query.count()
         event_count = Event.query.count()
         
-        # Calculate total revenue from non-cancelled bookings
-        # We use func.sum for efficiency
-        revenue = db.session.query(db.func.sum(Booking.total_amount)).filter(Booking.status != 'Cancelled').scalar() or 0
+        # Total revenue from the per-event sales counters
+        revenue = db.session.query(db.func.sum(EventSalesSummary.revenue)).scalar() or 0
         
         return jsonify({
             "users": user_count,
@@ -50,40 +54,119 @@ def update_user_role(user_id):
         
     user = User.query.get_or_404(user_id)
     user.role = new_role
+    # Retire the user's access tokens so the new role applies on their next refresh
+    user.token_version = (user.token_version or 0) + 1
     
     try:
         db.session.commit()
+        user_cache.invalidate(user_id)
         return jsonify({"msg": f"User role updated to {new_role}"}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": str(e)}), 500
 
+@admin_bp.route('/users/import', methods=['POST'])
+@role_required('admin')
+def import_users_csv():
+    """Bulk-create users from a CSV upload (file field) or a text/csv body.
+
+    Columns: username, email, and optionally password, password_hash, role.
+    ?role= sets the role for rows without one (customer or organizer).
+    """
+    from flask import request
+    default_role = request.args.get('role', 'customer')
+    if default_role not in IMPORT_ROLES:
+        return jsonify({"msg": "Invalid role"}), 400
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    # Read line by line, straight off the request
+    lines = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    report = import_users(lines, default_role=default_role)
+    return jsonify(report.to_dict()), 200 if report.created or not report.errors else 400
+
 # --- Event Oversight ---
 
+# Sortable columns for the admin event list, with the result row attribute
+# holding each one. Pages are keyed by (column, id)
+EVENT_SORT_KEYS = {
+    'id': (Event.id, 'id'),
+    'title': (Event.title, 'title'),
+    'date': (Event.date_time, 'date_time'),
+    'status': (Event.status, 'status'),
+    'organizer': (User.username, 'username'),
+    'revenue': (EventSalesSummary.revenue, 'revenue'),
+}
+
 @admin_bp.route('/events', methods=['GET'])
 @role_required('admin')
 def get_all_events():
-    events = Event.query.all()
-    result = []
-    
-    for e in events:
-        organizer = User.query.get(e.organizer_id)
-        # Calculate revenue for this event
-        revenue = db.session.query(db.func.sum(Booking.total_amount)).filter(
-            Booking.event_id == e.id,
-            Booking.status != 'Cancelled'
-        ).scalar() or 0.0
-        
-        result.append({
-            "id": e.id,
-            "title": e.title,
-            "organizer": organizer.username if organizer else "Unknown",
-            "date": e.date_time.isoformat(),
-            "status": e.status,
-            "revenue": revenue
-        })
-        
-    return jsonify(result), 200
+    # ?sort, order=asc|desc, status, organizer_id, limit, cursor (from X-Next-Cursor).
+    # ?count=1 adds X-Total-Count, which costs a COUNT(*) over the filter
+    from flask import request
+    limit = page_limit()
+
+    sort = request.args.get('sort', 'id')
+    if sort not in EVENT_SORT_KEYS:
+        return jsonify({"msg": "Invalid sort key"}), 400
+    descending = request.args.get('order', 'asc') == 'desc'
+
+    filters = []
+    if request.args.get('status'):
+        filters.append(Event.status == request.args['status'])
+    if request.args.get('organizer_id'):
+        try:
+            filters.append(Event.organizer_id == int(request.args['organizer_id']))
+        except ValueError:
+            return jsonify({"msg": "Invalid organizer_id"}), 400
+
+    sort_column, attribute = EVENT_SORT_KEYS[sort]
+    id_column = EventSalesSummary.event_id if sort == 'revenue' else Event.id
+    columns = [id_column] if sort == 'id' else [sort_column, id_column]
+
+    # One query for the whole page: organizer and revenue counters via joins.
+    # Each sort walks an index in order (organizer: the unique username, then
+    # the organizer's events). Revenue sorts join the summary table directly
+    # to walk its (revenue, event_id) index; events without a summary row
+    # have no sales yet
+    query = db.session.query(
+        Event.id, Event.title, Event.date_time, Event.status, User.username, EventSalesSummary.revenue
+    ).join(User, User.id == Event.organizer_id)
+    if sort == 'revenue':
+        query = query.join(EventSalesSummary, EventSalesSummary.event_id == Event.id)
+    else:
+        query = query.outerjoin(EventSalesSummary, EventSalesSummary.event_id == Event.id)
+    query = query.filter(*filters)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            if len(values) != len(columns):
+                raise ValueError("Invalid cursor")
+            if sort == 'date':
+                values[0] = datetime.fromisoformat(values[0])
+        except (ValueError, TypeError):
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(columns, values, descending=descending))
+
+    rows = query.order_by(*[c.desc() if descending else c.asc() for c in columns]).limit(limit + 1).all()
+
+    result = [{
+        "id": r.id,
+        "title": r.title,
+        "organizer": r.username or "Unknown",
+        "date": r.date_time.isoformat(),
+        "status": r.status,
+        "revenue": r.revenue or 0.0
+    } for r in rows[:limit]]
+
+    response = jsonify(result)
+    if request.args.get('count') == '1':
+        response.headers['X-Total-Count'] = str(Event.query.filter(*filters).count())
+    key = (lambda r: (r.id,)) if sort == 'id' else (lambda r: (getattr(r, attribute), r.id))
+    return paginated(response, rows, limit, key), 200
 
 @admin_bp.route('/events/<int:event_id>/status', methods=['PATCH'])
 @role_required('admin')
@@ -99,8 +182,76 @@ def update_event_status_admin(event_id):
     event.status = new_status
     
     try:
+        search.index_event(event.id)
         db.session.commit()
+        catalog.invalidate(event)
         return jsonify({"msg": f"Event status updated to {new_status}"}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": str(e)}), 500
+
+@admin_bp.route('/events/<int:event_id>/seat-index/verify', methods=['POST'])
+@role_required('admin')
+def verify_seat_index(event_id):
+    Event.query.get_or_404(event_id)
+    mismatched = availability.verify_index(event_id)
+    return jsonify({
+        "msg": "Seat index corrected" if mismatched else "Seat index consistent",
+        "mismatched_seat_ids": mismatched
+    }), 200
+
+@admin_bp.route('/expiry/metrics', methods=['GET'])
+@role_required('admin')
+def get_expiry_metrics():
+    metrics = expiry.scheduler.metrics()
+    # Ground truth from the DB, including bookings this worker has not scheduled
+    metrics["db_backlog"] = Booking.query.filter(
+        Booking.status == 'Pending',
+        Booking.expires_at <= datetime.utcnow()
+    ).count()
+    return jsonify(metrics), 200
+
+@admin_bp.route('/payments/outbox', methods=['GET'])
+@role_required('admin')
+def get_payment_outbox():
+    # Payments waiting for (or done with) the gateway worker
+    return jsonify(payments.stats()), 200
+
+@admin_bp.route('/cache/metrics', methods=['GET'])
+@role_required('admin')
+def get_cache_metrics():
+    # Hit/miss counters per cached route, for this worker
+    return jsonify(cache.metrics()), 200
+
+# --- Waiting Rooms ---
+
+@admin_bp.route('/waiting-rooms', methods=['GET'])
+@role_required('admin')
+def get_waiting_rooms():
+    return jsonify([room.stats() for room in waiting_room.rooms()]), 200
+
+@admin_bp.route('/events/<int:event_id>/waiting-room', methods=['PUT'])
+@role_required('admin')
+def open_waiting_room(event_id):
+    # Opens the event's waiting room, or changes the admission rate of the open one
+    from flask import request
+    Event.query.get_or_404(event_id)
+    data = request.get_json() or {}
+    try:
+        rate = float(data['rate']) if data.get('rate') is not None else None
+        burst = int(data['burst']) if data.get('burst') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"msg": "rate and burst must be numbers"}), 400
+    if (rate is not None and rate < 0) or (burst is not None and burst < 0):
+        return jsonify({"msg": "rate and burst cannot be negative"}), 400
+
+    room = waiting_room.open_room(event_id, rate, burst)
+    return jsonify(room.stats()), 200
+
+@admin_bp.route('/events/<int:event_id>/waiting-room', methods=['DELETE'])
+@role_required('admin')
+def close_waiting_room(event_id):
+    # Booking opens to everyone again
+    if waiting_room.close_room(event_id) is None:
+        return jsonify({"msg": "No waiting room for this event"}), 404
+    return jsonify({"msg": "Waiting room closed"}), 200
@@ -1,16 +1,34 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app.models import User, db
+from app import user_cache, hashing, ratelimit, users
+from app.hashing import HashingBusy
+from sqlalchemy.exc import IntegrityError
+import math
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, verify_jwt_in_request, get_jwt
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+def access_token_for(profile):
+    # Role and token version travel in the token, so role checks need no DB lookup
+    return create_access_token(
+        identity=str(profile["id"]),
+        additional_claims={"role": profile["role"], "ver": profile["token_version"]}
+    )
+
 def role_required(required_role):
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
             verify_jwt_in_request()
             claims = get_jwt()
+
+            # Tokens issued before a role change carry an old version; the
+            # client gets a 401 and refreshes into a token with the new role
+            profile = user_cache.get_profile(int(get_jwt_identity()))
+            if profile is None or claims.get("ver", 0) != profile["token_version"]:
+                return jsonify({"msg": "Token is stale, please refresh"}), 401
+
             user_role = claims.get("role")
             
             # Admin has access to everything
@@ -24,6 +42,33 @@ def role_required(required_role):
         return decorator
     return wrapper
 
+def _hashing_busy():
+    response = jsonify({"msg": "Server busy, please try again"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def _too_many_logins(username):
+    # Token buckets per client IP and per username, checked before any
+    # DB or hashing work so credential stuffing stays cheap to turn away
+    config = current_app.config
+    checks = [('login-ip', request.remote_addr or 'unknown', config['LOGIN_IP_PER_MINUTE'], config['LOGIN_IP_BURST'])]
+    if username:
+        checks.append(('login-user', username.lower(), config['LOGIN_USER_PER_MINUTE'], config['LOGIN_USER_BURST']))
+
+    for name, key, per_minute, burst in checks:
+        allowed, retry_after = ratelimit.get_limiter(name, per_minute / 60.0, burst).hit(key)
+        if not allowed:
+            response = jsonify({"msg": "Too many login attempts, try again later"})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+    return None
+
+def _user_exists(fields):
+    return jsonify({
+        "msg": "User already exists",
+        "errors": {field: f"{field.capitalize()} is already taken" for field in sorted(fields)}
+    })
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -35,14 +80,27 @@ def register():
     if not username or not email or not password:
         return jsonify({"msg": "Missing fields"}), 400
 
-    if User.query.filter_by(username=username).first() or User.query.filter_by(email=email).first():
-        return jsonify({"msg": "User already exists"}), 400
+    # One query for both fields, before spending time on the hash
+    taken = users.taken_fields(username, email)
+    if taken:
+        return _user_exists(taken), 400
 
     new_user = User(username=username, email=email, role=role)
-    new_user.set_password(password)
-    
+    try:
+        new_user.password_hash = hashing.hash_password(password)
+    except HashingBusy:
+        return _hashing_busy()
+
+    # The unique constraints settle sign-ups racing for the same name
     db.session.add(new_user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        field = users.duplicate_field(e)
+        if field is None:
+            raise
+        return _user_exists({field}), 400
 
     return jsonify({"msg": "User created successfully"}), 201
 
@@ -52,10 +110,26 @@ def login():
     username = data.get('username')
     password = data.get('password')
 
+    limited = _too_many_logins(username)
+    if limited:
+        return limited
+
     user = User.query.filter_by(username=username).first()
 
-    if user and user.check_password(password):
-        access_token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    try:
+        valid = user is not None and hashing.verify_password(user.password_hash, password or '')
+    except HashingBusy:
+        return _hashing_busy()
+
+    if valid:
+        # Upgrade hashes made with older parameters while we have the password
+        if hashing.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hashing.hash_password(password)
+                db.session.commit()
+            except HashingBusy:
+                pass # Next login will try again
+        access_token = access_token_for({"id": user.id, "role": user.role, "token_version": user.token_version or 0})
         refresh_token = create_refresh_token(identity=str(user.id))
         return jsonify(access_token=access_token, refresh_token=refresh_token, role=user.role), 200
 
@@ -64,18 +138,22 @@ def login():
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def me():
-    current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
+    profile = user_cache.get_profile(int(get_jwt_identity()))
+    if profile is None:
+        return jsonify({"msg": "User not found"}), 404
     return jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "role": user.role
+        "id": profile["id"],
+        "username": profile["username"],
+        "email": profile["email"],
+        "role": profile["role"]
     }), 200
 
 @auth_bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
-    identity = get_jwt_identity()
-    access_token = create_access_token(identity=str(identity))
-    return jsonify(access_token=access_token), 200
+    # Re-embed the current role and token version
+    profile = user_cache.get_profile(int(get_jwt_identity()))
+    if profile is None:
+        return jsonify({"msg": "User not found"}), 401
+    access_token = access_token_for(profile)
+    return jsonify(access_token=access_token, role=profile["role"]), 200
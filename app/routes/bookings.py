@@ -1,46 +1,112 @@
-from flask import Blueprint, jsonify, request
-from app.models import db, Booking, Ticket, Seat, Event, Payment, Venue
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-import qrcode
-import io
+from flask import Blueprint, jsonify, request, current_app, Response
+from app.models import db, Booking, Ticket, Event
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from app import availability, best_available, expiry, payments, pubsub, qr_cache, waiting_room
+from app.best_available import NoSeatsAvailable
+from app.codes import ticket_code
+from app.idempotency import idempotent
+from app.waiting_room import QueueTokenError
+from app.pagination import page_limit, decode_cursor, keyset_filter, paginated
+from sqlalchemy.orm import selectinload
+from app.seat_holds import (claim_seats, sell_holds, cancel_bookings, extend_holds, release_token,
+                            read_release_token, SeatConflict, InvalidSeats)
+from datetime import datetime, timedelta
 import base64
+import json
+import time
 from flask import render_template
 
 bookings_bp = Blueprint('bookings', __name__)
 
 @bookings_bp.route('/<int:event_id>/seats', methods=['GET'])
 def get_seats(event_id):
-    event = Event.query.get_or_404(event_id)
-    seats = Seat.query.filter_by(venue_id=event.venue_id).all()
-    
-    # Get booked or locked seat IDs for this event
-    # Status: Confirmed OR (Pending AND Not Expired)
-    now = datetime.utcnow()
-    
-    booked_query = db.session.query(Ticket.seat_id).join(Booking).filter(
-        Booking.event_id == event_id,
-        Booking.status != 'Cancelled',
-        db.or_(
-            Booking.status == 'Confirmed',
-            db.and_(Booking.status == 'Pending', Booking.expires_at > now)
+    # Served from the in-memory availability index; the DB is only read
+    # when the index is (re)built
+    index = availability.get_index(event_id)
+    if index is None:
+        return jsonify({"msg": "Event not found"}), 404
+    return jsonify(index.seat_list()), 200
+
+@bookings_bp.route('/<int:event_id>/seats/layout', methods=['GET'])
+def get_seat_layout(event_id):
+    # The static part of the seat map (ids, labels, tiers). The JSON is
+    # serialized once per venue and revalidated by ETag, so browsers and
+    # proxies can keep it
+    index = availability.get_index(event_id)
+    if index is None:
+        return jsonify({"msg": "Event not found"}), 404
+    response = current_app.response_class(index.layout.serialized(), mimetype='application/json')
+    response.set_etag(index.layout.digest)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('SEAT_LAYOUT_MAX_AGE', 86400)
+    return response.make_conditional(request)
+
+@bookings_bp.route('/<int:event_id>/seats/availability', methods=['GET'])
+def get_seat_availability(event_id):
+    # Seat states by layout ordinal: a full state string, or with
+    # ?since=<version> only the seats that changed after that version
+    index = availability.get_index(event_id)
+    if index is None:
+        return jsonify({"msg": "Event not found"}), 404
+
+    since = request.args.get('since')
+    if since:
+        version, changes = index.changes_since(since)
+        if changes is not None:
+            response = jsonify({"version": version, "layout": index.layout.digest, "changes": changes})
+            response.cache_control.no_store = True
+            return response, 200
+
+    version, state = index.encoded_state()
+    response = jsonify({"version": version, "layout": index.layout.digest, "state": state})
+    response.cache_control.no_store = True
+    return response, 200
+
+@bookings_bp.route('/<int:event_id>/seats/stream', methods=['GET'])
+def stream_seats(event_id):
+    # Server-Sent Events: one "seats" event per seat state change. A client
+    # whose queue overflows (or who reconnects after too long) gets a
+    # "resync" event and should refetch /seats/availability
+    if Event.query.get(event_id) is None:
+        return jsonify({"msg": "Event not found"}), 404
+
+    # Each open stream holds a worker thread, so streams are capped well below
+    # the thread pool (SEAT_STREAM_MAX_SUBSCRIBERS) to leave threads for booking
+    config = current_app.config
+    last_id = request.headers.get('Last-Event-ID', '')
+    try:
+        subscription = pubsub.get_broker().subscribe(
+            availability.channel(event_id),
+            maxsize=config['SEAT_STREAM_QUEUE_SIZE'],
+            last_id=int(last_id) if last_id.isdigit() else None,
+            max_subscribers=config['SEAT_STREAM_MAX_SUBSCRIBERS']
         )
-    )
-    
-    booked_seat_ids = {s[0] for s in booked_query.all()}
-
-    seat_data = []
-    for seat in seats:
-        seat_data.append({
-            "id": seat.id,
-            "row": seat.row_label,
-            "number": seat.seat_number,
-            "type": seat.seat_type,
-            "price": event.base_price * seat.price_multiplier,
-            "status": "booked" if seat.id in booked_seat_ids else "available"
-        })
-    return jsonify(seat_data), 200
+    except pubsub.TooManySubscribers:
+        return jsonify({"msg": "Too many live viewers, fall back to polling"}), 503
+    timeout = config['SEAT_STREAM_TIMEOUT']
+    keepalive = config['SEAT_STREAM_KEEPALIVE']
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            # Streams are time-bounded so workers are recycled; EventSource reconnects
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                item = subscription.get(timeout=keepalive)
+                if item is None:
+                    yield ": keepalive\n\n"
+                elif item is pubsub.RESYNC:
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    message_id, message = item
+                    yield f"id: {message_id}\nevent: seats\ndata: {json.dumps(message)}\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @bookings_bp.route('/lock', methods=['POST'])
 @jwt_required()
@@ -55,65 +121,159 @@ def lock_tickets():
 
     try:
         seat_ids = [int(sid) for sid in seat_ids]
+        event_id = int(event_id)
     except ValueError:
         return jsonify({"msg": "Invalid seat IDs"}), 400
 
-    # 1. Double Booking Check (Strict)
-    # Check if any seat is Confirmed OR (Pending and Active)
-    now = datetime.utcnow()
-    existing_tickets = Ticket.query.join(Booking).filter(
-        Booking.event_id == event_id,
-        Booking.status != 'Cancelled',
-        Ticket.seat_id.in_(seat_ids),
-        db.or_(
-            Booking.status == 'Confirmed',
-            db.and_(Booking.status == 'Pending', Booking.expires_at > now)
-        )
-    ).first()
-    
-    if existing_tickets:
-        return jsonify({"msg": "One or more seats are already booked"}), 409
+    # During a queued on-sale only visitors let in by the waiting room may book
+    try:
+        waiting_room.check_admission(event_id, request.headers.get('X-Queue-Token'), user_id)
+    except QueueTokenError as e:
+        return jsonify({"msg": str(e), "queue": True}), 403
 
+    event = Event.query.get(event_id)
+    if not event or event.status != 'Active':
+        return jsonify({"msg": "Event not available"}), 404
+
+    # Claim every seat in one statement; the hold table's unique constraint
+    # guarantees that concurrent requests for the same seat cannot both win
     try:
-        event = Event.query.get(event_id)
-        total_amount = 0
-        for s_id in seat_ids:
-            seat = Seat.query.get(s_id)
-            total_amount += event.base_price * seat.price_multiplier
-
-        # 2. Create Locked Booking (Pending)
-        from datetime import timedelta
-        expires_at = datetime.utcnow() + timedelta(minutes=5)
-        
-        booking = Booking(
-            user_id=user_id,
-            event_id=event_id,
-            status='Pending',
-            total_amount=total_amount,
-            expires_at=expires_at
-        )
-        db.session.add(booking)
-        db.session.flush()
-
-        # 3. Create Reserved Tickets
-        for s_id in seat_ids:
-            ticket = Ticket(
-                booking_id=booking.id,
-                seat_id=s_id,
-                unique_code=f"LOCK-{event_id}-{s_id}",
-                status='Reserved'
-            )
-            db.session.add(ticket)
-        
-        db.session.commit()
+        booking, seats = claim_seats(event, user_id, seat_ids)
+        locked = _reserve(event, booking, seats)
+    except InvalidSeats as e:
+        return jsonify({"msg": "Invalid seat IDs", "invalid_seat_ids": e.seat_ids}), 400
+    except SeatConflict as e:
+        return jsonify({"msg": "One or more seats are already booked", "conflicting_seat_ids": e.seat_ids}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Locking failed: " + str(e)}), 500
     
-    return jsonify({"msg": "Seats locked", "booking_id": booking.id, "expires_at": expires_at.isoformat()}), 201
+    return jsonify(locked), 201
+
+def _reserve(event, booking, held, **extra):
+    # The holds are the whole reservation (tickets are only written on
+    # confirm): commit, then tell the availability index and the expiry scheduler.
+    # The response is built before the commit, which expires every loaded
+    # object: reading them afterwards would reload each one (a query per seat)
+    locked = {
+        "msg": "Seats locked",
+        "booking_id": booking.id,
+        "expires_at": booking.expires_at.isoformat(),
+        "release_token": release_token(booking),
+        **extra
+    }
+    event_id, expires_at = event.id, booking.expires_at
+    seat_ids = [seat.id for seat in held]
+    db.session.commit()
+    availability.seats_held(event_id, seat_ids, expires_at)
+    expiry.scheduler.schedule(locked["booking_id"], expires_at)
+    return locked
+
+@bookings_bp.route('/best-available', methods=['POST'])
+@jwt_required()
+def lock_best_available():
+    # Like /lock, but the server picks the best block of adjacent seats
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    max_quantity = current_app.config.get('BEST_AVAILABLE_MAX', 10)
+
+    try:
+        event_id = int(data.get('event_id'))
+        quantity = int(data.get('quantity', 0))
+        max_price = float(data['max_price']) if data.get('max_price') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"msg": "Invalid event_id, quantity or max_price"}), 400
+    if not 1 <= quantity <= max_quantity:
+        return jsonify({"msg": f"quantity must be between 1 and {max_quantity}"}), 400
+    section = data.get('section') or None
+
+    try:
+        waiting_room.check_admission(event_id, request.headers.get('X-Queue-Token'), user_id)
+    except QueueTokenError as e:
+        return jsonify({"msg": str(e), "queue": True}), 403
+
+    event = Event.query.get(event_id)
+    if not event or event.status != 'Active':
+        return jsonify({"msg": "Event not available"}), 404
+
+    try:
+        booking, seats = best_available.claim_best(event, user_id, quantity, section, max_price)
+        locked = _reserve(event, booking, seats, total_amount=booking.total_amount, seats=[
+            {"id": seat.id, "row": seat.row_label, "number": seat.seat_number, "type": seat.seat_type}
+            for seat in sorted(seats, key=lambda seat: seat.seat_number)
+        ])
+    except NoSeatsAvailable:
+        return jsonify({"msg": f"No {quantity} seats together are available"}), 409
+    except SeatConflict:
+        return jsonify({"msg": "Seats are selling fast, please try again"}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Locking failed: " + str(e)}), 500
+
+    return jsonify(locked), 201
+
+@bookings_bp.route('/<int:booking_id>/release', methods=['POST'])
+def release_booking(booking_id):
+    # Give a Pending booking's seats back now instead of at expiry. Takes the
+    # usual JWT, or the release_token from /lock in the body, since
+    # navigator.sendBeacon (used on page unload) can't send headers
+    data = request.get_json(silent=True, force=True) or {}
+    token = data.get('token') or request.form.get('token')
+    if token:
+        user_id = read_release_token(booking_id, token)
+        if user_id is None:
+            return jsonify({"msg": "Invalid release token"}), 403
+    else:
+        verify_jwt_in_request()
+        user_id = int(get_jwt_identity())
+
+    booking = Booking.query.get_or_404(booking_id)
+    if booking.user_id != user_id:
+        return jsonify({"msg": "Unauthorized"}), 403
+    if booking.status != 'Pending':
+        return jsonify({"msg": "Booking already processed or cancelled"}), 409
+
+    _, released = cancel_bookings([booking.id])
+    db.session.commit()
+    availability.seats_released(released)
+    return jsonify({"msg": "Seats released", "released_seat_ids": [seat_id for _, seat_id in released]}), 200
+
+@bookings_bp.route('/<int:booking_id>/extend', methods=['POST'])
+@jwt_required()
+def extend_booking(booking_id):
+    # More time to pay: pushes the hold back HOLD_EXTENSION_MINUTES, at most
+    # HOLD_MAX_EXTENSIONS times per booking
+    user_id = int(get_jwt_identity())
+    config = current_app.config
+    booking = Booking.query.get_or_404(booking_id)
+    if booking.user_id != user_id:
+        return jsonify({"msg": "Unauthorized"}), 403
+    if booking.status != 'Pending':
+        return jsonify({"msg": "Booking already processed or cancelled"}), 400
+    max_extensions = config.get('HOLD_MAX_EXTENSIONS', 1)
+    if booking.hold_extensions >= max_extensions:
+        return jsonify({"msg": "This hold can't be extended any further"}), 400
+
+    expires_at = booking.expires_at + timedelta(minutes=config.get('HOLD_EXTENSION_MINUTES', 5))
+    seat_ids = extend_holds(booking, expires_at, max_extensions)
+    if not seat_ids:
+        db.session.rollback()
+        return jsonify({"msg": "Booking expired or can't be extended any further"}), 400
+    extensions = db.session.query(Booking.hold_extensions).filter(Booking.id == booking.id).scalar()
+    db.session.commit()
+    # The expiry sweeper reschedules the booking when its old expiry comes up
+    availability.seats_held(booking.event_id, seat_ids, expires_at)
+
+    return jsonify({
+        "msg": "Hold extended",
+        "booking_id": booking.id,
+        "expires_at": expires_at.isoformat(),
+        "extensions_left": max(max_extensions - extensions, 0)
+    }), 200
 
 @bookings_bp.route('/confirm', methods=['POST'])
 @jwt_required()
+@idempotent
 def confirm_booking():
     user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -128,93 +288,111 @@ def confirm_booking():
         return jsonify({"msg": "Booking already processed or cancelled"}), 400
         
     if booking.expires_at < datetime.utcnow():
-        booking.status = 'Cancelled'
+        _, released = cancel_bookings([booking.id])
         db.session.commit()
+        availability.seats_released(released)
         return jsonify({"msg": "Booking expired"}), 400
         
     try:
-        # Simulate Payment
-        payment = Payment(
-            booking_id=booking.id,
-            amount=booking.total_amount,
-            status='Paid',
-            transaction_id=f"TXN-{int(datetime.utcnow().timestamp())}"
-        )
-        db.session.add(payment)
-        
-        # Update Booking
+        # Seats must still be held by this booking
+        seat_ids = sell_holds(booking)
+        if not seat_ids:
+            db.session.rollback()
+            return jsonify({"msg": "Booking expired"}), 400
+
         booking.status = 'Confirmed'
         booking.expires_at = None # Clear expiration
-        
-        # Update Tickets
-        tickets = Ticket.query.filter_by(booking_id=booking.id).all()
-        for t in tickets:
-            t.status = 'Valid'
-            t.unique_code = f"EVT-{booking.event_id}-ST-{t.seat_id}-{int(datetime.utcnow().timestamp())}"
-            
+
+        # Tickets are created here, from the holds, in one multi-row INSERT;
+        # they become Valid once the payment worker has taken the payment
+        db.session.execute(Ticket.__table__.insert(), [
+            {"booking_id": booking.id, "seat_id": seat_id, "unique_code": ticket_code(), "status": 'Reserved'}
+            for seat_id in seat_ids
+        ])
+
+        # The gateway is called by the payment worker, not in this request
+        payment = payments.enqueue(booking)
         db.session.commit()
+        availability.seats_sold(booking.event_id, seat_ids)
+        payments.notify()
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Confirmation failed"}), 500
 
-    return jsonify({"msg": "Booking confirmed!", "booking_id": booking.id}), 200
+    # Render the ticket QR now so the first ticket view is served from cache
+    try:
+        qr_cache.pregenerate(booking.id)
+    except Exception as e:
+        current_app.logger.warning("QR pre-render failed: %s", e)
+
+    return jsonify({
+        "msg": "Booking confirmed!",
+        "booking_id": booking.id,
+        "payment": {"reference": payment.transaction_id, "status": payment.status}
+    }), 200
 
 @bookings_bp.route('/my', methods=['GET'])
 @jwt_required()
 def my_bookings():
     user_id = int(get_jwt_identity())
-    bookings = Booking.query.filter_by(user_id=user_id).order_by(Booking.created_at.desc()).all()
-    
+    limit = page_limit()
+
+    # Events and seats are loaded with the bookings (3 queries per page, not per booking)
+    query = Booking.query.filter_by(user_id=user_id).options(
+        selectinload(Booking.tickets),
+        selectinload(Booking.holds)
+    ).order_by(Booking.created_at.desc(), Booking.id.desc())
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+            created_at = datetime.fromisoformat(created_at)
+        except (ValueError, TypeError):
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(
+            [Booking.created_at, Booking.id], [created_at, last_id], descending=True
+        ))
+
+    bookings = query.limit(limit + 1).all()
+
     result = []
-    for b in bookings:
-        event = Event.query.get(b.event_id)
-        tickets = Ticket.query.filter_by(booking_id=b.id).all()
-        seat_labels = []
-        for t in tickets:
-            seat = Seat.query.get(t.seat_id)
-            seat_labels.append(f"{seat.row_label}{seat.seat_number}")
-            
+    for b in bookings[:limit]:
+        event = b.event
+
         result.append({
             "id": b.id,
             "event_title": event.title,
             "date": event.date_time.isoformat(),
             "status": b.status,
-            "seats": ", ".join(seat_labels),
+            "seats": ", ".join(b.seat_labels()),
             "total_amount": b.total_amount
         })
-        
-    return jsonify(result), 200
+
+    return paginated(jsonify(result), bookings, limit, lambda b: (b.created_at, b.id)), 200
 
 @bookings_bp.route('/ticket/<int:booking_id>', methods=['GET'])
 def view_ticket(booking_id):
     # No JWT required for public ticket validation (simulated access control via ID)
     # In production, use a signed token or random UUID
+    fmt = request.args.get('format', 'png')
+    if fmt not in qr_cache.FORMATS:
+        return jsonify({"msg": "format must be png or svg"}), 400
+
     booking = Booking.query.get_or_404(booking_id)
-    event = Event.query.get(booking.event_id)
-    venue = Venue.query.get(event.venue_id)
+    event = booking.event
+    venue = event.venue
+    # Ticket.seat is joined, so this is one query for all seats
     tickets = Ticket.query.filter_by(booking_id=booking.id).all()
-    
+
     # Enrich ticket data with seat labels
-    ticket_data = []
     for t in tickets:
-        seat = Seat.query.get(t.seat_id)
-        t.seat_label = f"{seat.row_label}{seat.seat_number}"
-    
-    # Generate QR Code
-    # Data format: "EVENTRA:BOOKING:<ID>"
-    qr_data = f"EVENTRA:BOOKING:{booking.id}"
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Save to buffer
-    buf = io.BytesIO()
-    img.save(buf)
-    buf.seek(0)
-    qr_b64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    
+        t.seat_label = f"{t.seat.row_label}{t.seat.seat_number}"
+
+    # QR code comes pre-rendered from the cache
+    qr_image, _ = qr_cache.get_qr(booking.id, fmt)
+    qr_b64 = base64.b64encode(qr_image).decode('utf-8')
+
     # Use the first ticket's unique code for display
     unique_code = tickets[0].unique_code if tickets else "N/A"
 
@@ -224,4 +402,22 @@ def view_ticket(booking_id):
                            venue=venue, 
                            tickets=tickets,
                            qr_code=qr_b64,
+                           qr_mime=qr_cache.FORMATS[fmt],
                            unique_code=unique_code)
+
+@bookings_bp.route('/ticket/<int:booking_id>/qr', methods=['GET'])
+def ticket_qr(booking_id):
+    # The bare QR image, for scanners and apps. A booking's QR never changes
+    # for a given code version, so it can be cached for a long time
+    fmt = request.args.get('format', 'png')
+    if fmt not in qr_cache.FORMATS:
+        return jsonify({"msg": "format must be png or svg"}), 400
+    if db.session.query(Booking.id).filter_by(id=booking_id).first() is None:
+        return jsonify({"msg": "Booking not found"}), 404
+
+    qr_image, digest = qr_cache.get_qr(booking_id, fmt)
+    response = current_app.response_class(qr_image, mimetype=qr_cache.FORMATS[fmt])
+    response.set_etag(digest)
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400 * 30
+    return response.make_conditional(request)
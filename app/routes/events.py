@@ -1,8 +1,13 @@
-from flask import Blueprint, request, jsonify
-from app.models import Event, Venue, db, Seat, Booking, Ticket
+from flask import Blueprint, request, jsonify, current_app
+from app.models import Event, Venue, db, Booking, EventSalesSummary
+from app import sales, catalog, search, cache
+from app.cache import cached
+from app.pagination import paginated
+from app.seat_layout import generate_seats, insert_seats, layout_for_capacity, validate_layout, count_seats, LAYOUT_VERSION
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes.auth import role_required
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
 
 events_bp = Blueprint('events', __name__)
 
@@ -17,42 +22,49 @@ def create_venue():
     name = data.get('name')
     address = data.get('address')
     capacity = data.get('capacity')
+    layout = data.get('layout')
+    if layout is None and data.get('sections') is not None:
+        layout = {"version": LAYOUT_VERSION, "sections": data.get('sections')}
     
-    if not name or not address or not capacity:
+    if not name or not address or not (capacity or layout):
         return jsonify({"msg": "Missing fields"}), 400
+
+    # Seats come from the layout document; a bare capacity means rows of 10
+    if layout is not None:
+        error = validate_layout(layout)
+        if error:
+            return jsonify({"msg": error}), 400
+        capacity = count_seats(layout)
+    else:
+        try:
+            capacity = int(capacity)
+        except (TypeError, ValueError):
+            return jsonify({"msg": "Invalid capacity"}), 400
+        if capacity <= 0:
+            return jsonify({"msg": "Invalid capacity"}), 400
+        layout = layout_for_capacity(capacity)
         
-    venue = Venue(name=name, address=address, capacity=capacity, owner_id=organizer_id)
+    venue = Venue(name=name, address=address, capacity=capacity, owner_id=organizer_id, layout=layout)
     try:
         db.session.add(venue)
-        db.session.commit() # Commit first to get ID safely
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"msg": "Error creating venue: " + str(e)}), 500
-    
-    # Auto-generate seats
-    try:
-        rows = int(int(capacity) / 10) + 1
-        seat_count = 0
-        for r in range(rows):
-            row_label = chr(65 + r) # A, B, C...
-            for n in range(1, 11):
-                if seat_count >= int(capacity): break
-                seat = Seat(venue_id=venue.id, row_label=row_label, seat_number=n)
-                db.session.add(seat)
-                seat_count += 1
+        db.session.flush()
+
+        # Venue and seats are written in one transaction, seats in bulk batches
+        insert_seats(venue.id, generate_seats(layout))
         db.session.commit()
+        cache.invalidate(f"venues:owner:{organizer_id}")
     except Exception as e:
-        # If seat creation fails, we might want to delete the venue or just log it
-        print("Error creating seats:", e)
         db.session.rollback()
-        return jsonify({"msg": "Venue created but seat generation failed."}), 201 # Partial success warning
+        return jsonify({"msg": "Error creating venue: " + str(e)}), 500
 
     return jsonify({"msg": "Venue created", "id": venue.id}), 201
 
 @events_bp.route('/venues', methods=['GET'])
 @role_required('organizer')
+@cached(vary_user=True)
 def get_my_venues():
     current_user_id = int(get_jwt_identity())
+    cache.add_tags(f"venues:owner:{current_user_id}")
     venues = Venue.query.filter_by(owner_id=current_user_id).all()
     return jsonify([{
         "id": v.id, "name": v.name, "address": v.address, "capacity": v.capacity
@@ -80,6 +92,13 @@ def create_event():
     except ValueError:
         return jsonify({"msg": "Invalid date format"}), 400
 
+    # Optional: minutes a seat lock lasts for this event (default HOLD_MINUTES)
+    hold_minutes = data.get('hold_minutes')
+    max_minutes = current_app.config.get('HOLD_MAX_MINUTES', 30)
+    if hold_minutes is not None and (not isinstance(hold_minutes, int) or isinstance(hold_minutes, bool)
+                                     or not 1 <= hold_minutes <= max_minutes):
+        return jsonify({"msg": f"hold_minutes must be between 1 and {max_minutes}"}), 400
+
     new_event = Event(
         title=title,
         description=description,
@@ -87,34 +106,71 @@ def create_event():
         venue_id=venue_id,
         organizer_id=organizer_id,
         base_price=base_price,
+        hold_minutes=hold_minutes,
         status='Active'
     )
     
     db.session.add(new_event)
+    db.session.flush()
+    sales.create_summary(new_event.id)
+    search.index_event(new_event.id)
     db.session.commit()
+    catalog.invalidate(new_event)
     
     return jsonify({"msg": "Event created", "id": new_event.id}), 201
 
 @events_bp.route('/', methods=['GET'])
+@cached(ttl='CATALOG_CACHE_TTL', tags=[catalog.CACHE_TAG])
 def get_public_events():
-    events = Event.query.filter_by(status='Active').all()
-    result = []
-    for e in events:
-        venue = Venue.query.get(e.venue_id)
-        result.append({
-            "id": e.id,
-            "title": e.title,
-            "description": e.description,
-            "date_time": e.date_time.isoformat(),
-            "venue": venue.name,
-            "base_price": e.base_price
-        })
-    return jsonify(result), 200
+    # ?when=upcoming|past|all, venue_id, min_price, max_price, q, limit, cursor
+    try:
+        params = catalog.parse_params(request.args)
+    except catalog.CatalogQueryError as e:
+        return jsonify({"msg": str(e)}), 400
+    rows = catalog.fetch_page(params)
+    limit = params[-1]
+    return paginated(jsonify([catalog.serialize(r) for r in rows[:limit]]), rows, limit,
+                     lambda r: (r.date_time, r.id)), 200
+
+@events_bp.route('/search', methods=['GET'])
+@cached(ttl='CATALOG_CACHE_TTL', tags=[catalog.CACHE_TAG])
+def search_events():
+    # ?q= words to match (prefixes work), limit (max 50), when=upcoming to skip past events
+    q = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"msg": "limit must be a number"}), 400
+    if not search.tokenize(q):
+        return jsonify({"msg": "Missing search terms"}), 400
+
+    scores = dict(search.search(q, limit))
+    if not scores:
+        return jsonify([]), 200
+
+    # Details for the hits in one query, then back into rank order
+    query = db.session.query(
+        Event.id, Event.title, Event.date_time, Event.base_price, Venue.name.label('venue')
+    ).join(Venue, Venue.id == Event.venue_id).filter(Event.id.in_(scores), Event.status == 'Active')
+    if request.args.get('when') == 'upcoming':
+        query = query.filter(Event.date_time >= datetime.utcnow())
+    rows = sorted(query.all(), key=lambda r: scores[r.id], reverse=True)
+
+    return jsonify([{
+        "id": r.id,
+        "title": r.title,
+        "date_time": r.date_time.isoformat(),
+        "venue": r.venue,
+        "base_price": r.base_price,
+        "score": round(scores[r.id], 4)
+    } for r in rows]), 200
 
 @events_bp.route('/organizer', methods=['GET'])
 @role_required('organizer')
+@cached(vary_user=True)
 def get_organizer_events():
     organizer_id = int(get_jwt_identity())
+    cache.add_tags(f"events:organizer:{organizer_id}")
     events = Event.query.filter_by(organizer_id=organizer_id).all()
     return jsonify([{
         "id": e.id,
@@ -124,9 +180,11 @@ def get_organizer_events():
     } for e in events]), 200
 
 @events_bp.route('/<int:event_id>', methods=['GET'])
+@cached(tags=lambda event_id: [f"event:{event_id}"])
 def get_event_details(event_id):
     event = Event.query.get_or_404(event_id)
     venue = Venue.query.get(event.venue_id)
+    cache.add_tags(f"venue:{venue.id}")
     return jsonify({
          "id": event.id,
          "title": event.title,
@@ -135,6 +193,7 @@ def get_event_details(event_id):
          "venue_name": venue.name,
          "venue_address": venue.address,
          "base_price": event.base_price,
+         "hold_minutes": event.hold_minutes or current_app.config.get('HOLD_MINUTES', 5),
          "status": event.status
     }), 200
 
@@ -150,13 +209,16 @@ def get_event_bookings(event_id):
     if event.organizer_id != organizer_id:
         return jsonify({"msg": "Unauthorized"}), 403
         
-    bookings = Booking.query.filter_by(event_id=event_id).order_by(Booking.created_at.desc()).all()
+    # Customers, tickets and holds (with seats) are loaded in batches, not per booking
+    bookings = Booking.query.filter_by(event_id=event_id).options(
+        joinedload(Booking.user),
+        selectinload(Booking.tickets),
+        selectinload(Booking.holds)
+    ).order_by(Booking.created_at.desc()).all()
     
     result = []
     for b in bookings:
         user = b.user
-        tickets = Ticket.query.filter_by(booking_id=b.id).all()
-        seats = [f"{t.seat.row_label}{t.seat.seat_number}" for t in tickets]
         
         result.append({
             "booking_id": b.id,
@@ -164,7 +226,7 @@ def get_event_bookings(event_id):
             "customer_email": user.email,
             "status": b.status,
             "total_amount": b.total_amount,
-            "seats": ", ".join(seats),
+            "seats": ", ".join(b.seat_labels()),
             "date": b.created_at.isoformat()
         })
         
@@ -183,23 +245,16 @@ def get_event_analytics(event_id):
     venue = Venue.query.get(event.venue_id)
     total_capacity = venue.capacity
     
-    # Sales
-    # Count valid tickets (not cancelled bookings)
-    sold_tickets_count = Ticket.query.join(Booking).filter(
-        Booking.event_id == event_id,
-        Booking.status != 'Cancelled',
-        Ticket.status == 'Valid'
-    ).count()
-    
-    revenue = db.session.query(db.func.sum(Booking.total_amount)).filter(
-        Booking.event_id == event_id,
-        Booking.status != 'Cancelled'
-    ).scalar() or 0.0
+    # Sales come from the materialized counters, not from the ticket table
+    summary = sales.get_summary(event_id)
+    sold_tickets_count = summary["sold_tickets"]
+    revenue = summary["revenue"]
     
     return jsonify({
         "total_capacity": total_capacity,
         "sold_tickets": sold_tickets_count,
         "remaining_tickets": total_capacity - sold_tickets_count,
+        "reserved_tickets": summary["reserved_tickets"],
         "total_revenue": revenue
     }), 200
 
@@ -220,7 +275,9 @@ def update_event_status(event_id):
          
     try:
         event.status = new_status
+        search.index_event(event.id)
         db.session.commit()
+        catalog.invalidate(event)
         return jsonify({"msg": f"Event status updated to {new_status}"}), 200
     except Exception as e:
         db.session.rollback()
@@ -234,22 +291,13 @@ def get_organizer_global_stats():
     # Total Events
     total_events = Event.query.filter_by(organizer_id=organizer_id).count()
     
-    # Total Revenue & Tickets (Valid only)
-    # Join Event -> Booking -> Ticket (if needed, but Booking has total_amount)
-    # Rev = Sum of confirmed bookings for my events
-    
-    # Query: Sum total_amount where event.organizer_id == me AND status != Cancelled
-    revenue = db.session.query(db.func.sum(Booking.total_amount)).join(Event).filter(
-        Event.organizer_id == organizer_id,
-        Booking.status != 'Cancelled'
-    ).scalar() or 0.0
-    
-    # Tickets Sold: Count tickets in valid bookings for my events
-    sold_tickets = Ticket.query.join(Booking).join(Event).filter(
-        Event.organizer_id == organizer_id,
-        Booking.status != 'Cancelled',
-        Ticket.status == 'Valid'
-    ).count()
+    # Revenue & tickets sold, summed over the per-event sales counters
+    revenue, sold_tickets = db.session.query(
+        db.func.coalesce(db.func.sum(EventSalesSummary.revenue), 0.0),
+        db.func.coalesce(db.func.sum(EventSalesSummary.sold_tickets), 0)
+    ).join(Event, Event.id == EventSalesSummary.event_id).filter(
+        Event.organizer_id == organizer_id
+    ).one()
     
     return jsonify({
         "total_events": total_events,
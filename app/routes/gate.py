@@ -0,0 +1,155 @@
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
+from flask_jwt_extended import get_jwt_identity, get_jwt
+from app.models import db, Event
+from app.routes.auth import role_required
+from app import gate, manifest
+from datetime import datetime
+
+gate_bp = Blueprint('gate', __name__)
+
+
+def _can_scan(organizer_id):
+    # Gate staff sign in as the event's organizer (or an admin)
+    return get_jwt().get('role') == 'admin' or organizer_id == int(get_jwt_identity())
+
+
+def _scan_result(index, code, scan_id=None):
+    result, entry = index.scan(code, scan_id)
+    data = {"code": code, "result": result}
+    if scan_id is not None:
+        data["scan_id"] = scan_id
+    if entry is not None:
+        data["ticket_id"] = entry[0]
+        data["seat"] = entry[1]
+        data["used_at"] = entry[2].isoformat()
+    return data
+
+
+@gate_bp.route('/events/<int:event_id>/preload', methods=['POST'])
+@role_required('organizer')
+def preload_event(event_id):
+    # Load (or reload) the event's ticket codes before doors open
+    event = Event.query.get_or_404(event_id)
+    if not _can_scan(event.organizer_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    index = gate.preload(event_id)
+    gate.writer.start(current_app._get_current_object())
+    return jsonify({"msg": "Gate index loaded", **index.stats()}), 200
+
+
+@gate_bp.route('/events/<int:event_id>/scan', methods=['POST'])
+@role_required('organizer')
+def scan_tickets(event_id):
+    # Accepts {"code": ..., "scan_id": ...} or {"scans": [{"code": ..., "scan_id": ...}, ...]}.
+    # scan_id is optional; resending a scan with the same scan_id is safe
+    index = gate._indexes.get(event_id)
+    if index is None:
+        # Check ownership before the first scan loads the event's codes into memory
+        event = Event.query.get_or_404(event_id)
+        if not _can_scan(event.organizer_id):
+            return jsonify({"msg": "Unauthorized"}), 403
+        index = gate.get_index(event_id)
+        if index is None:
+            return jsonify({"msg": "Event not found"}), 404
+    if not _can_scan(index.organizer_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+    gate.writer.start(current_app._get_current_object())
+
+    data = request.get_json() or {}
+    if 'scans' in data:
+        scans = data['scans']
+        if not isinstance(scans, list):
+            return jsonify({"msg": "scans must be a list"}), 400
+        if len(scans) > current_app.config.get('GATE_MAX_BATCH', 500):
+            return jsonify({"msg": "Too many scans in one request"}), 400
+        if not all(isinstance(s, dict) and isinstance(s.get('code'), str) for s in scans):
+            return jsonify({"msg": "Each scan needs a code"}), 400
+
+        results = [_scan_result(index, s['code'], s.get('scan_id')) for s in scans]
+        admitted = sum(1 for r in results if r['result'] == gate.ADMITTED)
+        return jsonify({"results": results, "admitted": admitted}), 200
+
+    code = data.get('code')
+    if not isinstance(code, str):
+        return jsonify({"msg": "Missing ticket code"}), 400
+    return jsonify(_scan_result(index, code, data.get('scan_id'))), 200
+
+
+@gate_bp.route('/events/<int:event_id>/status', methods=['GET'])
+@role_required('organizer')
+def gate_status(event_id):
+    event = Event.query.get_or_404(event_id)
+    if not _can_scan(event.organizer_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    index = gate._indexes.get(event_id)
+    return jsonify({
+        "loaded": index is not None,
+        "index": index.stats() if index is not None else None,
+        "writer": gate.writer.metrics()
+    }), 200
+
+
+@gate_bp.route('/events/<int:event_id>/manifest', methods=['GET'])
+@role_required('organizer')
+def download_manifest(event_id):
+    # Signed binary ticket list for offline scanners (format in app/manifest.py).
+    # ?since=<watermark from a previous manifest> returns only late sales
+    event = Event.query.get_or_404(event_id)
+    if not _can_scan(event.organizer_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    since = request.args.get('since')
+    if since is not None:
+        if not since.isdigit():
+            return jsonify({"msg": "since must be a manifest watermark"}), 400
+        since = manifest.from_millis(int(since))
+    bloom = request.args.get('bloom', '1') != '0'
+
+    watermark = datetime.utcnow()
+    key = current_app.config['MANIFEST_SIGNING_KEY'].encode('utf-8')
+    response = Response(
+        stream_with_context(manifest.generate(event_id, key, since=since, bloom=bloom, watermark=watermark)),
+        mimetype='application/octet-stream'
+    )
+    kind = 'delta' if since else 'full'
+    response.headers['Content-Disposition'] = f'attachment; filename="event-{event_id}-{kind}.evtm"'
+    response.headers['X-Manifest-Watermark'] = str(manifest.to_millis(watermark))
+    return response
+
+
+@gate_bp.route('/events/<int:event_id>/checkins', methods=['POST'])
+@role_required('organizer')
+def upload_checkins(event_id):
+    # Offline scanner logs: {"device": ..., "checkins": [{"ticket_id": ..., "scanned_at": ...}, ...]}
+    event = Event.query.get_or_404(event_id)
+    if not _can_scan(event.organizer_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    entries = data.get('checkins')
+    if not isinstance(entries, list):
+        return jsonify({"msg": "checkins must be a list"}), 400
+    if not all(isinstance(e, dict) and str(e.get('ticket_id', '')).isdigit() for e in entries):
+        return jsonify({"msg": "Each check-in needs a ticket_id"}), 400
+
+    # Pending online scans are written first, so they count as already used
+    gate.writer.flush()
+    try:
+        applied, already_used, unknown = manifest.ingest_checkins(event_id, entries)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Check-in upload failed for event %s", event_id)
+        return jsonify({"msg": "Check-in upload failed"}), 500
+
+    index = gate._indexes.get(event_id)
+    if index is not None:
+        index.mark_used(applied)
+
+    return jsonify({
+        "applied": len(applied),
+        "already_used": already_used,
+        "unknown": unknown
+    }), 200
@@ -0,0 +1,44 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app import waiting_room
+from app.waiting_room import QueueTokenError
+
+queue_bp = Blueprint('queue', __name__)
+
+# Joining and polling only touch the in-memory room, never the database,
+# so they stay cheap while the whole crowd is waiting
+
+
+def _no_store(response, code=200):
+    response.cache_control.no_store = True
+    return response, code
+
+
+def _user_id():
+    # Anyone can wait in line; admission tokens are issued to signed-in users only
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    return int(identity) if identity is not None else None
+
+
+@queue_bp.route('/<int:event_id>/join', methods=['POST'])
+def join_queue(event_id):
+    room = waiting_room.get_room(event_id)
+    if room is None:
+        # No waiting room for this event; booking is open
+        return _no_store(jsonify({"admitted": True, "position": 0}))
+
+    seq = room.join()
+    token = waiting_room.queue_token(room, seq)
+    return _no_store(jsonify({"token": token, **waiting_room.status(room, seq, _user_id())}))
+
+
+@queue_bp.route('/<int:event_id>/status', methods=['GET'])
+def queue_status(event_id):
+    if waiting_room.get_room(event_id) is None:
+        return _no_store(jsonify({"admitted": True, "position": 0}))
+    try:
+        room, seq = waiting_room.read_queue_token(event_id, request.headers.get('X-Queue-Token'))
+        return _no_store(jsonify(waiting_room.status(room, seq, _user_id())))
+    except QueueTokenError as e:
+        return _no_store(jsonify({"msg": str(e), "rejoin": True}), 409)
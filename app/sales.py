@@ -0,0 +1,81 @@
+"""Materialized per-event sales counters (EventSalesSummary).
+
+Every change to seat holds or booking status adjusts the counters with an
+atomic ``col = col + delta`` UPDATE inside the caller's transaction, so
+they commit or roll back together with the booking. The invariants, which
+reconcile_sales.py checks against the raw tables, are:
+
+    sold_tickets       = holds with no expiry (sold seats)
+    reserved_tickets   = holds with an expiry (seats of Pending bookings)
+    revenue            = SUM(total_amount) of Confirmed bookings
+    confirmed_bookings = Confirmed bookings
+    pending_bookings   = Pending bookings
+"""
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Booking, EventSalesSummary, SeatHold
+
+COUNTERS = ('sold_tickets', 'reserved_tickets', 'revenue', 'confirmed_bookings', 'pending_bookings')
+
+
+def create_summary(event_id):
+    db.session.add(EventSalesSummary(
+        event_id=event_id, sold_tickets=0, reserved_tickets=0, revenue=0.0,
+        confirmed_bookings=0, pending_bookings=0
+    ))
+
+
+def adjust(event_id, **deltas):
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    table = EventSalesSummary.__table__
+    update = table.update().where(table.c.event_id == event_id).values(
+        {table.c[k]: table.c[k] + v for k, v in deltas.items()}
+    )
+    if db.session.execute(update).rowcount:
+        return
+    # Event predates the summary table and was never backfilled. Insert the
+    # row in a savepoint: if a concurrent transaction inserted it first, the
+    # savepoint rolls back and the increment is applied to their row.
+    values = {k: 0 for k in COUNTERS}
+    values.update(deltas)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(event_id=event_id, **values))
+    except IntegrityError:
+        db.session.execute(update)
+
+
+def get_summary(event_id):
+    summary = EventSalesSummary.query.get(event_id)
+    if summary is None:
+        return {k: 0 for k in COUNTERS}
+    return {k: getattr(summary, k) for k in COUNTERS}
+
+
+def compute_actual(event_ids=None):
+    """Recompute the counters from the raw tables, keyed by event ID."""
+    actual = {}
+
+    def row(event_id):
+        return actual.setdefault(event_id, {k: 0 for k in COUNTERS})
+
+    holds = db.session.query(
+        SeatHold.event_id, SeatHold.expires_at.is_(None), db.func.count(SeatHold.id)
+    ).group_by(SeatHold.event_id, SeatHold.expires_at.is_(None))
+    bookings = db.session.query(
+        Booking.event_id, Booking.status, db.func.count(Booking.id), db.func.sum(Booking.total_amount)
+    ).filter(Booking.status.in_(['Confirmed', 'Pending'])).group_by(Booking.event_id, Booking.status)
+    if event_ids is not None:
+        holds = holds.filter(SeatHold.event_id.in_(event_ids))
+        bookings = bookings.filter(Booking.event_id.in_(event_ids))
+
+    for event_id, sold, count in holds.all():
+        row(event_id)['sold_tickets' if sold else 'reserved_tickets'] = count
+    for event_id, status, count, amount in bookings.all():
+        if status == 'Confirmed':
+            row(event_id)['confirmed_bookings'] = count
+            row(event_id)['revenue'] = amount or 0.0
+        else:
+            row(event_id)['pending_bookings'] = count
+    return actual
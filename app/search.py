@@ -0,0 +1,345 @@
+"""Full-text search over events (title, description, venue name and address).
+
+Three interchangeable backends, picked by SEARCH_BACKEND ('auto' chooses
+from the database dialect):
+
+    fts5      SQLite FTS5 virtual table event_search (rowid = event ID),
+              ranked with bm25
+    postgres  event_search_index table holding a weighted tsvector per
+              event (accents stripped with the unaccent extension) under
+              a GIN index, ranked with ts_rank
+    memory    an in-process inverted index, for other databases; rebuilt
+              from the database every SEARCH_REBUILD_INTERVAL seconds so
+              other workers' changes show up
+
+Every query term is matched as a prefix ("roc nig" finds "Rock Night") and
+all terms must match. Title hits weigh most, then venue, then description.
+Only Active events are indexed: call index_event() after creating an event
+or changing it (including its status), in the same transaction.
+
+The search tables are not part of the SQLAlchemy models; migrations create
+them and ensure_index() creates them on databases made with create_all().
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from flask import current_app
+from sqlalchemy import text
+from app.models import db, Event, Venue
+
+SEARCH_TABLE_PREFIX = 'event_search'
+MAX_LIMIT = 50
+
+# Relative weight of a hit in each field
+WEIGHTS = {"title": 10.0, "venue": 3.0, "description": 1.0}
+
+# A term that only starts with the query word counts for less than the word itself
+PREFIX_PENALTY = 0.5
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(value):
+    # Lowercase and strip accents, like FTS5's unicode61 remove_diacritics
+    value = unicodedata.normalize('NFKD', value or '').lower()
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return _TOKEN.findall(value)
+
+
+def include_name(name, type_, parent_names):
+    """Alembic filter: the search tables are managed outside the models."""
+    return not (type_ == 'table' and name.startswith(SEARCH_TABLE_PREFIX))
+
+
+class SearchBackend:
+    name = None
+
+    def ensure(self):
+        pass
+
+    def index_event(self, event_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, terms, limit):
+        """Return [(event_id, score)], best first."""
+        raise NotImplementedError
+
+
+class Fts5Backend(SearchBackend):
+    name = 'fts5'
+
+    def ensure(self):
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS event_search USING fts5("
+            "title, description, venue, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+
+    def _insert(self, where, params):
+        db.session.execute(text(
+            "INSERT INTO event_search (rowid, title, description, venue) "
+            "SELECT e.id, e.title, coalesce(e.description, ''), v.name || ' ' || v.address "
+            "FROM event_events e JOIN event_venues v ON v.id = e.venue_id "
+            "WHERE e.status = 'Active'" + where
+        ), params)
+
+    def index_event(self, event_id):
+        db.session.execute(text("DELETE FROM event_search WHERE rowid = :id"), {"id": event_id})
+        self._insert(" AND e.id = :id", {"id": event_id})
+
+    def rebuild(self):
+        db.session.execute(text("DELETE FROM event_search"))
+        self._insert("", {})
+
+    def search(self, terms, limit):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rows = db.session.execute(text(
+            "SELECT rowid, bm25(event_search, :w_title, :w_description, :w_venue) AS rank "
+            "FROM event_search WHERE event_search MATCH :match ORDER BY rank LIMIT :limit"
+        ), {"match": match, "limit": limit, "w_title": WEIGHTS["title"],
+            "w_description": WEIGHTS["description"], "w_venue": WEIGHTS["venue"]})
+        # bm25 is lower-is-better; flip it so scores read like the other backends
+        return [(row[0], -row[1]) for row in rows]
+
+
+class PostgresBackend(SearchBackend):
+    name = 'postgres'
+
+    def ensure(self):
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        db.session.execute(text(
+            "CREATE TABLE IF NOT EXISTS event_search_index ("
+            "event_id INTEGER PRIMARY KEY REFERENCES event_events (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        ))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_event_search_document ON event_search_index USING gin (document)"
+        ))
+
+    def _insert(self, where, params):
+        # 'simple' config: no stemming, so prefixes match what was typed.
+        # unaccent matches tokenize(), which strips accents from the query terms
+        db.session.execute(text(
+            "INSERT INTO event_search_index (event_id, document) "
+            "SELECT e.id, "
+            "setweight(to_tsvector('simple', unaccent(e.title)), 'A') || "
+            "setweight(to_tsvector('simple', unaccent(v.name || ' ' || v.address)), 'B') || "
+            "setweight(to_tsvector('simple', unaccent(coalesce(e.description, ''))), 'C') "
+            "FROM event_events e JOIN event_venues v ON v.id = e.venue_id "
+            "WHERE e.status = 'Active'" + where
+        ), params)
+
+    def index_event(self, event_id):
+        db.session.execute(text("DELETE FROM event_search_index WHERE event_id = :id"), {"id": event_id})
+        self._insert(" AND e.id = :id", {"id": event_id})
+
+    def rebuild(self):
+        db.session.execute(text("DELETE FROM event_search_index"))
+        self._insert("", {})
+
+    def search(self, terms, limit):
+        query = ' & '.join(f"{term}:*" for term in terms)
+        rows = db.session.execute(text(
+            "SELECT event_id, ts_rank(document, query) AS rank "
+            "FROM event_search_index, to_tsquery('simple', :query) query "
+            "WHERE document @@ query ORDER BY rank DESC LIMIT :limit"
+        ), {"query": query, "limit": limit})
+        return [(row[0], row[1]) for row in rows]
+
+
+class InvertedIndex:
+    """term -> {event_id: weight}, with a sorted term list for prefix lookups."""
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_terms = {}  # event_id -> terms, for removal
+        self.terms = []
+        self._unsorted = False
+
+    def add(self, event_id, fields):
+        self.remove(event_id)
+        weights = {}
+        for field, value in fields.items():
+            for term in tokenize(value):
+                weights[term] = weights.get(term, 0.0) + WEIGHTS[field]
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self.terms.append(term)
+                self._unsorted = True
+            postings[event_id] = weight
+        self.doc_terms[event_id] = list(weights)
+
+    def remove(self, event_id):
+        for term in self.doc_terms.pop(event_id, ()):
+            self.postings[term].pop(event_id, None)
+            # Emptied terms stay in the term list until the next rebuild
+
+    def _prefix_matches(self, prefix):
+        scores = {}
+        n_docs = max(len(self.doc_terms), 1)
+        if self._unsorted:
+            self.terms.sort()
+            self._unsorted = False
+        terms = self.terms
+        for i in range(bisect.bisect_left(terms, prefix), len(terms)):
+            term = terms[i]
+            if not term.startswith(prefix):
+                break
+            postings = self.postings[term]
+            if not postings:
+                continue
+            idf = math.log(1 + n_docs / len(postings))
+            if term != prefix:
+                idf *= PREFIX_PENALTY
+            for event_id, weight in postings.items():
+                score = weight * idf
+                if score > scores.get(event_id, 0.0):
+                    scores[event_id] = score
+        return scores
+
+    def search(self, terms, limit):
+        # Rarest-looking (longest) term first keeps the intersection small
+        result = None
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self._prefix_matches(term)
+            if result is None:
+                result = matches
+            else:
+                result = {e: s + matches[e] for e, s in result.items() if e in matches}
+            if not result:
+                return []
+        return heapq.nlargest(limit, result.items(), key=lambda item: (item[1], -item[0]))
+
+
+class MemoryBackend(SearchBackend):
+    name = 'memory'
+
+    def __init__(self):
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _rows(self, event_id=None):
+        query = db.session.query(
+            Event.id, Event.title, Event.description, Venue.name, Venue.address
+        ).join(Venue, Venue.id == Event.venue_id).filter(Event.status == 'Active')
+        if event_id is not None:
+            query = query.filter(Event.id == event_id)
+        return query.yield_per(2000)
+
+    def rebuild(self):
+        index = InvertedIndex()
+        for event_id, title, description, venue_name, venue_address in self._rows():
+            index.add(event_id, {"title": title, "description": description,
+                                 "venue": f"{venue_name} {venue_address}"})
+        with self._lock:
+            self._index = index
+            self._built_at = time.monotonic()
+
+    def _current(self):
+        interval = current_app.config.get('SEARCH_REBUILD_INTERVAL', 300)
+        if self._index is None or time.monotonic() - self._built_at > interval:
+            self.rebuild()
+        return self._index
+
+    def index_event(self, event_id):
+        if self._index is None:
+            return  # Built on first search
+        rows = list(self._rows(event_id))
+        with self._lock:
+            if rows:
+                _, title, description, venue_name, venue_address = rows[0]
+                self._index.add(event_id, {"title": title, "description": description,
+                                           "venue": f"{venue_name} {venue_address}"})
+            else:
+                self._index.remove(event_id)
+
+    def search(self, terms, limit):
+        index = self._current()
+        with self._lock:
+            return index.search(terms, limit)
+
+
+_backend_classes = {
+    'fts5': Fts5Backend,
+    'postgres': PostgresBackend,
+    'memory': MemoryBackend,
+}
+_backends = {}
+_backends_lock = threading.Lock()
+_ensured = set()
+
+
+def backend_name():
+    name = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        dialect = db.engine.dialect.name
+        name = {'sqlite': 'fts5', 'postgresql': 'postgres'}.get(dialect, 'memory')
+    return name
+
+
+def get_backend():
+    name = backend_name()
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = _backend_classes[name]()
+    return backend
+
+
+def _missing(backend):
+    if backend.name == 'fts5':
+        return not db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'event_search'")).first()
+    if backend.name == 'postgres':
+        return db.session.execute(text("SELECT to_regclass('event_search_index')")).scalar() is None
+    return False
+
+
+def ensure_index(commit=True):
+    """Create and backfill the search table if it is missing.
+
+    With commit=False the table is created in the caller's transaction
+    and checked again next time.
+    """
+    backend = get_backend()
+    key = (backend.name, str(db.engine.url))
+    if key in _ensured:
+        return backend
+    if _missing(backend):
+        backend.ensure()
+        backend.rebuild()
+    if commit:
+        db.session.commit()
+        _ensured.add(key)
+    return backend
+
+
+def index_event(event_id):
+    """Add, refresh or drop (if no longer Active) one event in the search index."""
+    ensure_index(commit=False).index_event(event_id)
+
+
+def rebuild():
+    backend = ensure_index(commit=False)
+    backend.rebuild()
+    db.session.commit()
+    return backend
+
+
+def search(q, limit=20):
+    """Return [(event_id, score)] for the query string, best first."""
+    terms = tokenize(q)[:8]
+    if not terms:
+        return []
+    return ensure_index().search(terms, max(1, min(limit, MAX_LIMIT)))
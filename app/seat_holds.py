@@ -0,0 +1,225 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Booking, Seat, SeatHold
+from app import sales
+
+RELEASE_SALT = 'hold-release'
+
+
+class SeatConflict(Exception):
+    """Raised when one or more requested seats are already held or sold."""
+
+    def __init__(self, seat_ids):
+        super().__init__("Seats already taken: %s" % seat_ids)
+        self.seat_ids = seat_ids
+
+
+class InvalidSeats(Exception):
+    """Raised when requested seats do not belong to the event's venue."""
+
+    def __init__(self, seat_ids):
+        super().__init__("Invalid seats: %s" % seat_ids)
+        self.seat_ids = seat_ids
+
+
+def hold_duration(event):
+    """How long a Pending booking for the event keeps its seats before they go back on sale."""
+    return timedelta(minutes=event.hold_minutes or current_app.config.get('HOLD_MINUTES', 5))
+
+
+def active_hold_filter(now):
+    # A hold blocks its seat while it is sold (no expiry) or not yet expired
+    return db.or_(SeatHold.expires_at.is_(None), SeatHold.expires_at > now)
+
+
+def taken_seat_ids(event_id, seat_ids=None, now=None):
+    now = now or datetime.utcnow()
+    query = db.session.query(SeatHold.seat_id).filter(
+        SeatHold.event_id == event_id,
+        active_hold_filter(now)
+    )
+    if seat_ids is not None:
+        query = query.filter(SeatHold.seat_id.in_(seat_ids))
+    return sorted(s[0] for s in query.all())
+
+
+def claim_seats(event, user_id, seat_ids):
+    """Create a Pending booking holding every seat in seat_ids, or none of them.
+
+    Pricing comes from a single seat fetch, and the claim itself is one
+    multi-row INSERT into event_seat_holds. If any seat is already held, the
+    unique constraint rejects the insert, the whole transaction is rolled
+    back and SeatConflict lists the seats that were taken.
+    """
+    # Sorted, de-duplicated IDs keep the lock order stable across concurrent
+    # transactions, which avoids deadlocks on PostgreSQL
+    seat_ids = sorted(set(seat_ids))
+    now = datetime.utcnow()
+
+    seats = Seat.query.filter(
+        Seat.venue_id == event.venue_id,
+        Seat.id.in_(seat_ids)
+    ).all()
+    if len(seats) != len(seat_ids):
+        found = {s.id for s in seats}
+        raise InvalidSeats([s_id for s_id in seat_ids if s_id not in found])
+
+    total_amount = sum(event.base_price * (seat.price_multiplier or 1.0) for seat in seats)
+    expires_at = now + hold_duration(event)
+
+    try:
+        # Expired holds would otherwise trip the unique constraint
+        purged = SeatHold.query.filter(
+            SeatHold.event_id == event.id,
+            SeatHold.seat_id.in_(seat_ids),
+            SeatHold.expires_at <= now
+        ).delete(synchronize_session=False)
+
+        booking = Booking(
+            user_id=user_id,
+            event_id=event.id,
+            status='Pending',
+            total_amount=total_amount,
+            expires_at=expires_at
+        )
+        db.session.add(booking)
+        db.session.flush()
+
+        db.session.execute(SeatHold.__table__.insert(), [
+            {"event_id": event.id, "seat_id": s_id, "booking_id": booking.id, "expires_at": expires_at}
+            for s_id in seat_ids
+        ])
+    except IntegrityError:
+        db.session.rollback()
+        raise SeatConflict(taken_seat_ids(event.id, seat_ids) or seat_ids)
+
+    # Outside the try: only the hold insert's unique violation is a seat conflict
+    sales.adjust(event.id, reserved_tickets=len(seat_ids) - purged, pending_bookings=1)
+    return booking, seats
+
+
+def sell_holds(booking, now=None):
+    """Turn a booking's holds into permanent claims.
+
+    Returns the seat IDs sold, or [] if any hold was lost. A booking's holds
+    all share its expiry and are only taken over once expired, so the holds
+    are intact exactly when none of them has expired.
+    """
+    now = now or datetime.utcnow()
+    holds = db.session.query(SeatHold.seat_id, SeatHold.expires_at).filter(
+        SeatHold.booking_id == booking.id
+    ).all()
+    if not holds or any(expires_at is None or expires_at <= now for _, expires_at in holds):
+        return []
+    updated = SeatHold.query.filter(
+        SeatHold.booking_id == booking.id,
+        SeatHold.expires_at > now
+    ).update({"expires_at": None}, synchronize_session=False)
+    if updated != len(holds):
+        return []
+    sales.adjust(
+        booking.event_id,
+        sold_tickets=updated, reserved_tickets=-updated, revenue=booking.total_amount,
+        confirmed_bookings=1, pending_bookings=-1
+    )
+    return [seat_id for seat_id, _ in holds]
+
+
+def extend_holds(booking, expires_at, max_extensions, now=None):
+    """Move a Pending booking's expiry, and its holds', to expires_at.
+
+    The limit is checked in the same conditional UPDATE that counts the
+    extension, so concurrent requests can't extend past max_extensions.
+    Returns the held seat IDs, or [] if the booking is no longer Pending,
+    has used its extensions or its holds have lapsed (the caller should
+    roll back).
+    """
+    now = now or datetime.utcnow()
+    extended = Booking.query.filter(
+        Booking.id == booking.id,
+        Booking.status == 'Pending',
+        Booking.expires_at > now,
+        Booking.hold_extensions < max_extensions
+    ).update({
+        Booking.expires_at: expires_at,
+        Booking.hold_extensions: Booking.hold_extensions + 1
+    }, synchronize_session=False)
+    if not extended:
+        return []
+    seat_ids = [row[0] for row in db.session.query(SeatHold.seat_id).filter(SeatHold.booking_id == booking.id)]
+    updated = SeatHold.query.filter(
+        SeatHold.booking_id == booking.id,
+        SeatHold.expires_at > now
+    ).update({"expires_at": expires_at}, synchronize_session=False)
+    if not seat_ids or updated != len(seat_ids):
+        return []
+    return seat_ids
+
+
+def _release_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=RELEASE_SALT)
+
+
+def release_token(booking):
+    """Signed token that lets its bearer release the booking's holds (for sendBeacon, which can't send a JWT)."""
+    return _release_serializer().dumps({"b": booking.id, "u": booking.user_id})
+
+
+def read_release_token(booking_id, token, max_age=86400):
+    """Return the user ID a release token was issued to, or None if it is not valid for this booking."""
+    try:
+        data = _release_serializer().loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+    return data.get("u") if data.get("b") == booking_id else None
+
+
+def release_holds(booking_ids):
+    """Delete the holds of the given bookings. Returns the (event_id, seat_id) pairs freed."""
+    if not booking_ids:
+        return []
+    released = db.session.query(SeatHold.event_id, SeatHold.seat_id, SeatHold.expires_at).filter(
+        SeatHold.booking_id.in_(booking_ids)
+    ).all()
+    SeatHold.query.filter(SeatHold.booking_id.in_(booking_ids)).delete(synchronize_session=False)
+
+    deltas = {}
+    for event_id, _, expires_at in released:
+        counts = deltas.setdefault(event_id, {"sold_tickets": 0, "reserved_tickets": 0})
+        counts["sold_tickets" if expires_at is None else "reserved_tickets"] -= 1
+    for event_id, counts in deltas.items():
+        sales.adjust(event_id, **counts)
+    return [(event_id, seat_id) for event_id, seat_id, _ in released]
+
+
+def cancel_bookings(booking_ids, expired_before=None):
+    """Cancel the given bookings that are still Pending and release their holds.
+
+    With expired_before, only bookings that expired by then are cancelled,
+    so a hold extended in the meantime is left alone. Returns
+    (cancelled_booking_ids, released (event_id, seat_id) pairs).
+    """
+    if not booking_ids:
+        return [], []
+    query = db.session.query(Booking.id, Booking.event_id).filter(
+        Booking.id.in_(booking_ids),
+        Booking.status == 'Pending'
+    )
+    if expired_before is not None:
+        query = query.filter(Booking.expires_at <= expired_before)
+    rows = query.with_for_update().all()
+    if not rows:
+        return [], []
+
+    ids = [booking_id for booking_id, _ in rows]
+    Booking.query.filter(Booking.id.in_(ids)).update({"status": 'Cancelled'}, synchronize_session=False)
+
+    per_event = {}
+    for _, event_id in rows:
+        per_event[event_id] = per_event.get(event_id, 0) + 1
+    for event_id, count in per_event.items():
+        sales.adjust(event_id, pending_bookings=-count)
+
+    return ids, release_holds(ids)
@@ -0,0 +1,315 @@
+"""Venue layouts: the declarative layout document, seat generation, and the
+compiled (array-backed) seat index.
+
+A layout document is stored on Venue.layout and describes the venue as
+sections stacked front to back, with optional named pricing tiers:
+
+    {
+        "version": 1,
+        "tiers": {"VIP": 2.0, "Regular": 1.0},
+        "sections": [
+            {"name": "Front", "tier": "VIP", "rows": 5, "seats_per_row": 20},
+            {"name": "Balcony", "tier": "Regular", "rows": [[1, 24], [1, 26], [3, 26]]}
+        ]
+    }
+
+A section's rows are either a count (with seats_per_row) or a list of
+[first, last] seat number ranges, one per row. An optional "preference"
+(a number, higher is better, default 0) ranks sections for best-available
+seat selection; within a section, front rows and the middle of a row win.
+Instead of a tier a section may give seat_type and price_multiplier
+directly. Rows are labelled A..Z, then AA, AB, ... continuing across
+sections.
+
+Seats are still materialized as Seat rows (written in bulk) so that
+Ticket.seat_id and the hold table keep their foreign keys, but everything
+that renders a seat map reads the compiled layout instead of the rows.
+"""
+import hashlib
+import json
+import threading
+from array import array
+from itertools import islice
+from app.models import db, Seat, Venue
+
+LAYOUT_VERSION = 1
+DEFAULT_SEATS_PER_ROW = 10
+INSERT_BATCH_SIZE = 5000
+
+
+def row_label(index):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA', 27 -> 'AB', ..."""
+    label = ''
+    index += 1
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+
+def layout_for_capacity(capacity, seats_per_row=DEFAULT_SEATS_PER_ROW):
+    """The default layout: rows of seats_per_row, with a shorter last row."""
+    full_rows, rest = divmod(int(capacity), seats_per_row)
+    sections = []
+    if full_rows:
+        sections.append({"name": "General", "rows": full_rows, "seats_per_row": seats_per_row})
+    if rest:
+        sections.append({"name": "General", "rows": [[1, rest]]})
+    return {"version": LAYOUT_VERSION, "sections": sections}
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def validate_layout(layout):
+    """Return an error message for a malformed layout document, or None."""
+    if not isinstance(layout, dict):
+        return "layout must be an object"
+    tiers = layout.get('tiers', {})
+    if not isinstance(tiers, dict):
+        return "layout tiers must be an object"
+    for name, multiplier in tiers.items():
+        if not isinstance(multiplier, (int, float)) or isinstance(multiplier, bool) or multiplier <= 0:
+            return f"tier {name} must have a positive price multiplier"
+
+    sections = layout.get('sections')
+    if not isinstance(sections, list) or not sections:
+        return "layout sections must be a non-empty list"
+    for section in sections:
+        if not isinstance(section, dict):
+            return "each section must be an object"
+        if 'tier' in section and section['tier'] not in tiers:
+            return f"unknown tier {section['tier']}"
+        multiplier = section.get('price_multiplier', 1.0)
+        if not isinstance(multiplier, (int, float)) or isinstance(multiplier, bool) or multiplier <= 0:
+            return "section price_multiplier must be a positive number"
+        preference = section.get('preference', 0)
+        if not isinstance(preference, (int, float)) or isinstance(preference, bool):
+            return "section preference must be a number"
+
+        rows = section.get('rows')
+        if isinstance(rows, list):
+            if not rows:
+                return "section rows must not be empty"
+            for seat_range in rows:
+                if (not isinstance(seat_range, list) or len(seat_range) != 2
+                        or not all(_positive_int(n) for n in seat_range)
+                        or seat_range[0] > seat_range[1]):
+                    return "each row must be a [first, last] seat number range"
+        elif not _positive_int(rows) or not _positive_int(section.get('seats_per_row')):
+            return "section rows and seats_per_row must be positive integers"
+    return None
+
+
+def _section_rows(section):
+    rows = section['rows']
+    if isinstance(rows, list):
+        return [tuple(r) for r in rows]
+    return [(1, section['seats_per_row'])] * rows
+
+
+def _section_pricing(layout, section):
+    if 'tier' in section:
+        return section['tier'], float(layout['tiers'][section['tier']])
+    return section.get('seat_type', 'Regular'), float(section.get('price_multiplier', 1.0))
+
+
+def iter_layout(layout):
+    """Yield (section_index, row_label, seat_number, seat_type, price_multiplier) for every seat."""
+    row = 0
+    for section_index, section in enumerate(layout['sections']):
+        seat_type, multiplier = _section_pricing(layout, section)
+        for first, last in _section_rows(section):
+            label = row_label(row)
+            for number in range(first, last + 1):
+                yield (section_index, label, number, seat_type, multiplier)
+            row += 1
+
+
+def generate_seats(layout):
+    """Yield (row_label, seat_number, seat_type, price_multiplier) for every seat."""
+    for _, label, number, seat_type, multiplier in iter_layout(layout):
+        yield (label, number, seat_type, multiplier)
+
+
+def count_seats(layout):
+    return sum(last - first + 1 for section in layout['sections'] for first, last in _section_rows(section))
+
+
+def insert_seats(venue_id, seats, batch_size=INSERT_BATCH_SIZE, existing=None):
+    """Bulk insert seats (tuples from generate_seats) for a venue.
+
+    Seats whose (row_label, seat_number) is in existing are skipped. Runs in
+    the caller's transaction; returns the number of seats inserted. The
+    venue's compiled layout is dropped from this process's cache.
+    """
+    table = Seat.__table__
+    rows = (
+        {"venue_id": venue_id, "row_label": label, "seat_number": number,
+         "seat_type": seat_type, "price_multiplier": multiplier}
+        for label, number, seat_type, multiplier in seats
+        if not existing or (label, number) not in existing
+    )
+    inserted = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        db.session.execute(table.insert(), batch)
+        inserted += len(batch)
+    if inserted:
+        invalidate_layout(venue_id)
+    return inserted
+
+
+# --- Compiled layouts ---
+
+class CompiledLayout:
+    """Array-backed seat index for one venue, ordered by seat ordinal.
+
+    Strings (row labels, section names, seat types) are stored once in
+    small lookup tables and referenced by index from the per-seat arrays.
+    """
+
+    def __init__(self, venue_id, digest):
+        self.venue_id = venue_id
+        self.digest = digest  # Changes whenever the layout (or its seat IDs) change
+
+        self.sections = []   # section names
+        self.section_preferences = []  # best-available ranking, parallel to sections
+        self.rows = []       # row labels
+        self.tiers = []      # (seat_type, price_multiplier)
+
+        self.seat_ids = array('l')
+        self.seat_numbers = array('l')
+        self.seat_rows = array('l')      # index into rows
+        self.seat_sections = array('l')  # index into sections
+        self.seat_tiers = array('l')     # index into tiers
+        self.ordinals = {}
+        self._serialized = None
+        self._row_seats = None
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    def _intern(self, table, lookup, value):
+        index = lookup.get(value)
+        if index is None:
+            index = lookup[value] = len(table)
+            table.append(value)
+        return index
+
+    def _build(self, seats, preferences=None):
+        """seats: iterable of (seat_id, section_name, row_label, seat_number, seat_type, multiplier).
+
+        preferences maps section names to their preference (default 0).
+        """
+        section_lookup, row_lookup, tier_lookup = {}, {}, {}
+        preferences = preferences or {}
+        for seat_id, section, label, number, seat_type, multiplier in seats:
+            self.ordinals[seat_id] = len(self.seat_ids)
+            self.seat_ids.append(seat_id)
+            self.seat_numbers.append(number)
+            self.seat_rows.append(self._intern(self.rows, row_lookup, label))
+            if section not in section_lookup:
+                self.section_preferences.append(preferences.get(section, 0))
+            self.seat_sections.append(self._intern(self.sections, section_lookup, section))
+            self.seat_tiers.append(self._intern(self.tiers, tier_lookup, (seat_type or 'Regular', multiplier or 1.0)))
+
+    def row_seats(self):
+        """Ordinals of each row's seats in seat number order, indexed like rows."""
+        if self._row_seats is None:
+            rows = [[] for _ in self.rows]
+            for i, row in enumerate(self.seat_rows):
+                rows[row].append(i)
+            numbers = self.seat_numbers
+            self._row_seats = [array('l', sorted(seats, key=numbers.__getitem__)) for seats in rows]
+        return self._row_seats
+
+    def row_label(self, i):
+        return self.rows[self.seat_rows[i]]
+
+    def seat_type(self, i):
+        return self.tiers[self.seat_tiers[i]][0]
+
+    def multiplier(self, i):
+        return self.tiers[self.seat_tiers[i]][1]
+
+    def serialized(self):
+        """The layout as compact JSON bytes, built once and reused for every request.
+
+        Seats are given column-wise in ordinal order, with rows, sections and
+        tiers as indexes into the lookup lists.
+        """
+        if self._serialized is None:
+            self._serialized = json.dumps({
+                "venue_id": self.venue_id,
+                "digest": self.digest,
+                "rows": self.rows,
+                "sections": self.sections,
+                "tiers": [list(tier) for tier in self.tiers],
+                "seats": {
+                    "id": self.seat_ids.tolist(),
+                    "number": self.seat_numbers.tolist(),
+                    "row": self.seat_rows.tolist(),
+                    "section": self.seat_sections.tolist(),
+                    "tier": self.seat_tiers.tolist()
+                }
+            }, separators=(',', ':')).encode('utf-8')
+        return self._serialized
+
+
+def compile_layout(venue):
+    """Compile a venue's layout document (or, for older venues, its Seat rows)."""
+    seat_rows = db.session.query(
+        Seat.id, Seat.row_label, Seat.seat_number, Seat.seat_type, Seat.price_multiplier
+    ).filter(Seat.venue_id == venue.id).order_by(Seat.id).all()
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(venue.layout, sort_keys=True).encode('utf-8'))
+    for row in seat_rows:
+        digest.update(b'%d,' % row[0])
+    compiled = CompiledLayout(venue.id, digest.hexdigest()[:16])
+
+    if venue.layout:
+        seat_ids = {(label, number): seat_id for seat_id, label, number, _, _ in seat_rows}
+        names = [s.get('name') or f"Section {i + 1}" for i, s in enumerate(venue.layout['sections'])]
+        preferences = {}
+        for name, section in zip(names, venue.layout['sections']):
+            preferences.setdefault(name, section.get('preference', 0))
+        compiled._build((
+            (seat_ids[(label, number)], names[section], label, number, seat_type, multiplier)
+            for section, label, number, seat_type, multiplier in iter_layout(venue.layout)
+            if (label, number) in seat_ids
+        ), preferences)
+    else:
+        compiled._build(
+            (seat_id, "General", label, number, seat_type, multiplier)
+            for seat_id, label, number, seat_type, multiplier in seat_rows
+        )
+    return compiled
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_layout(venue_id):
+    """Return the cached compiled layout for a venue, compiling it on first use."""
+    compiled = _compiled.get(venue_id)
+    if compiled is not None:
+        return compiled
+    with _compiled_lock:
+        compiled = _compiled.get(venue_id)
+        if compiled is None:
+            venue = Venue.query.get(venue_id)
+            if venue is None:
+                return None
+            compiled = _compiled[venue_id] = compile_layout(venue)
+    return compiled
+
+
+def invalidate_layout(venue_id):
+    with _compiled_lock:
+        _compiled.pop(venue_id, None)
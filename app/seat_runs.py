@@ -0,0 +1,126 @@
+"""Per-row free-run index for best-available seat selection.
+
+Rows are kept in preference order (section preference, then front to
+back). For every row we cache the length of its longest run of adjacent
+free seats, and a max segment tree over those lengths finds the first
+(best) row that can seat a party of n in O(log rows) without looking at
+the rows that can't. A seat state change only marks its row dirty; dirty
+rows are rescanned (one pass over that row) before the next selection.
+
+Within the chosen row the party gets the run position closest to the
+middle of the row. "Adjacent" means consecutive seat numbers, so gaps in
+a row's numbering (aisles) split runs.
+"""
+from array import array
+
+FREE = 0
+
+
+class FreeRunIndex:
+    def __init__(self, layout):
+        self.layout = layout
+        row_seats = layout.row_seats()
+        preferences = layout.section_preferences
+
+        def rank(row):
+            seats = row_seats[row]
+            section = layout.seat_sections[seats[0]] if seats else 0
+            # Higher preference first; rows keep their front-to-back order
+            return (-preferences[section] if preferences else 0, row)
+
+        order = sorted((row for row in range(len(row_seats)) if row_seats[row]), key=rank)
+        self.rows = [row_seats[row] for row in order]  # by preference position
+        self.row_of = array('l', [0]) * len(layout.seat_ids)
+        for position, seats in enumerate(self.rows):
+            for i in seats:
+                self.row_of[i] = position
+
+        self.size = 1
+        while self.size < max(len(self.rows), 1):
+            self.size *= 2
+        self.tree = array('l', [0]) * (2 * self.size)
+        self.dirty = set(range(len(self.rows)))
+
+    def mark(self, ordinal):
+        self.dirty.add(self.row_of[ordinal])
+
+    def _runs(self, position, state):
+        """Yield (start, end) index ranges into the row's seat list of free adjacent seats."""
+        seats = self.rows[position]
+        numbers = self.layout.seat_numbers
+        start = None
+        for k, i in enumerate(seats):
+            if state[i] == FREE and (start is not None and numbers[i] == numbers[seats[k - 1]] + 1):
+                continue
+            if start is not None:
+                yield start, k
+                start = None
+            if state[i] == FREE:
+                start = k
+        if start is not None:
+            yield start, len(seats)
+
+    def refresh(self, state):
+        tree = self.tree
+        for position in self.dirty:
+            longest = 0
+            for start, end in self._runs(position, state):
+                if end - start > longest:
+                    longest = end - start
+            i = position + self.size
+            tree[i] = longest
+            i >>= 1
+            while i:
+                value = max(tree[2 * i], tree[2 * i + 1])
+                if tree[i] == value:
+                    break
+                tree[i] = value
+                i >>= 1
+        self.dirty.clear()
+
+    def first_fit(self, n, start=0):
+        """Preference position of the first row from start with n adjacent free seats, or -1."""
+        if start >= len(self.rows):
+            return -1
+        tree, size = self.tree, self.size
+        i = start + size
+        while True:
+            if tree[i] >= n:
+                while i < size:
+                    i = 2 * i if tree[2 * i] >= n else 2 * i + 1
+                return i - size
+            # Step to the subtree just right of this one
+            while i & 1:
+                i >>= 1
+            if i == 0:
+                return -1
+            i += 1
+
+    def best_in_row(self, position, n, state):
+        """Ordinals of the n adjacent free seats closest to the middle of the row."""
+        seats = self.rows[position]
+        middle = (len(seats) - n) / 2  # Ideal start index
+        best = None
+        for start, end in self._runs(position, state):
+            if end - start < n:
+                continue
+            begin = min(max(start, round(middle)), end - n)
+            distance = abs(begin - middle)
+            if best is None or distance < best[0]:
+                best = (distance, begin)
+        if best is None:
+            return None
+        return list(seats[best[1]:best[1] + n])
+
+    def find(self, n, state, eligible=None):
+        """Best n adjacent free seats as ordinals, or None.
+
+        eligible(row_ordinals) can exclude rows (a section, a price cap).
+        """
+        self.refresh(state)
+        position = self.first_fit(n)
+        while position != -1:
+            if eligible is None or eligible(self.rows[position]):
+                return self.best_in_row(position, n, state)
+            position = self.first_fit(n, position + 1)
+        return None
@@ -306,15 +306,21 @@ async function updateEventStatus(id, newStatus) {
 }
 
 // --- Customer Handlers ---
-async function loadPublicEvents() {
+let publicEventsCursor = null;
+
+async function loadPublicEvents(append = false) {
     const list = document.getElementById('publicEventsList');
     if (!list) return;
+    const params = new URLSearchParams({ when: 'upcoming', limit: 24 });
+    if (append && publicEventsCursor) params.set('cursor', publicEventsCursor);
     try {
-        const response = await fetch(`${eventsApiUrl}/`, { method: 'GET' });
+        const response = await fetch(`${eventsApiUrl}/?${params}`, { method: 'GET' });
         if (response.ok) {
             const events = await response.json();
-            list.innerHTML = '';
-            if (events.length === 0) list.innerHTML = '<p>No upcoming events.</p>';
+            if (!append) list.innerHTML = '';
+            const oldButton = document.getElementById('loadMoreEvents');
+            if (oldButton) oldButton.remove();
+            if (!append && events.length === 0) list.innerHTML = '<p>No upcoming events.</p>';
             events.forEach(e => {
                 const div = document.createElement('div');
                 div.className = 'event-card';
@@ -326,16 +332,38 @@ async function loadPublicEvents() {
                 `;
                 list.appendChild(div);
             });
+
+            // Next page continues after the last event shown
+            publicEventsCursor = response.headers.get('X-Next-Cursor');
+            if (publicEventsCursor) {
+                const more = document.createElement('button');
+                more.id = 'loadMoreEvents';
+                more.className = 'btn-primary';
+                more.textContent = 'Load more';
+                more.onclick = () => loadPublicEvents(true);
+                list.appendChild(more);
+            }
         }
     } catch (err) { console.error(err); }
 }
 
 let selectedSeats = new Set();
 let basePrice = 0;
+// Locked but not yet confirmed booking, released if the page is left
+let pendingHold = null;
+
+function releasePendingHold() {
+    if (!pendingHold) return;
+    const body = new Blob([JSON.stringify({ token: pendingHold.token })], { type: 'application/json' });
+    navigator.sendBeacon(`${bookingsApiUrl}/${pendingHold.id}/release`, body);
+    pendingHold = null;
+}
+
+// pagehide also fires on mobile and bfcache navigations, where unload doesn't
+window.addEventListener('pagehide', releasePendingHold);
 
 async function loadEventDetails(eventId) {
     const infoDiv = document.getElementById('eventInfo');
-    const seatMap = document.getElementById('seatMap');
     const bookBtn = document.getElementById('bookBtn');
 
     try {
@@ -351,49 +379,13 @@ async function loadEventDetails(eventId) {
         `;
         basePrice = eventData.base_price;
 
-        // Fetch Seats
-        const seatRes = await fetch(`${bookingsApiUrl}/${eventId}/seats`);
-        const seats = await seatRes.json();
-
-        seatMap.innerHTML = '';
+        // Big on-sales queue visitors before they can book
+        await enterWaitingRoom(eventId);
 
-        // Group by Row
-        const seatsByRow = {};
-        seats.forEach(seat => {
-            if (!seatsByRow[seat.row]) {
-                seatsByRow[seat.row] = [];
-            }
-            seatsByRow[seat.row].push(seat);
-        });
-
-        // Render Rows
-        Object.keys(seatsByRow).sort().forEach(rowLabel => {
-            const rowDiv = document.createElement('div');
-            rowDiv.className = 'seat-row';
-
-            // Optional: Row Label
-            const labelSpan = document.createElement('span');
-            labelSpan.className = 'row-label';
-            labelSpan.innerText = rowLabel;
-            rowDiv.appendChild(labelSpan);
-
-            seatsByRow[rowLabel].sort((a, b) => a.number - b.number).forEach(seat => {
-                const div = document.createElement('div');
-                div.className = `seat ${seat.status}`;
-                div.dataset.id = seat.id;
-                div.dataset.price = seat.price;
-                div.dataset.row = seat.row;
-                div.dataset.number = seat.number;
-                div.title = `${seat.row}${seat.number} - $${seat.price}`;
-                div.innerText = seat.number; // Just number in the box
-
-                if (seat.status === 'available') {
-                    div.addEventListener('click', () => toggleSeat(div));
-                }
-                rowDiv.appendChild(div);
-            });
-            seatMap.appendChild(rowDiv);
-        });
+        // Fetch the seat layout (cached by the browser) and the current seat states
+        await loadSeatLayout(eventId);
+        startSeatPolling(eventId);
+        startSeatStream(eventId);
 
         bookBtn.addEventListener('click', () => {
             if (bookBtn.disabled) return;
@@ -428,8 +420,185 @@ async function loadEventDetails(eventId) {
     } catch (err) { console.error(err); }
 }
 
+// --- Waiting room ---
+// The queue token keeps our place across reloads (and the trip to the
+// login page); the admission token it turns into is issued to the signed-in
+// user and sent with the lock request
+let inWaitingRoom = false;
+let queueAdmission = null;
+
+function queueFetch(url, options = {}) {
+    return localStorage.getItem('access_token') ? authFetch(url, options) : fetch(url, options);
+}
+
+async function enterWaitingRoom(eventId) {
+    const tokenKey = `queueToken-${eventId}`;
+    const token = sessionStorage.getItem(tokenKey);
+    let res = token ? await queueFetch(`/api/queue/${eventId}/status`, { headers: { 'X-Queue-Token': token } }) : null;
+    if (!res || res.status === 409) {
+        res = await queueFetch(`/api/queue/${eventId}/join`, { method: 'POST' });
+    }
+    const data = await res.json();
+    if (data.token) sessionStorage.setItem(tokenKey, data.token);
+
+    let banner = document.getElementById('queueStatus');
+    if (data.admitted) {
+        inWaitingRoom = false;
+        queueAdmission = data.admission_token || null;
+        if (banner) banner.remove();
+        updateSummary();
+        return true;
+    }
+
+    inWaitingRoom = true;
+    if (!banner) {
+        banner = document.createElement('div');
+        banner.id = 'queueStatus';
+        banner.className = 'event-card';
+        document.getElementById('eventInfo').appendChild(banner);
+    }
+    const wait = data.estimated_wait != null ? `about ${Math.max(1, Math.round(data.estimated_wait / 60))} min` : 'paused';
+    banner.innerHTML = `<h3>You are in line</h3><p>${data.position} people ahead of you (${wait}). Keep this page open.</p>`;
+    document.getElementById('bookBtn').disabled = true;
+    setTimeout(() => enterWaitingRoom(eventId), (data.poll_after || 5) * 1000);
+    return false;
+}
+
+// Seat map state: the layout is fetched once, then availability is polled
+// with ?since=<version> so each poll only carries the seats that changed
+let seatLayout = null;
+let seatDivs = [];
+let seatVersion = null;
+let seatPollTimer = null;
+let seatOrdinals = {};
+let seatStream = null;
+const SEAT_POLL_INTERVAL = 5000;
+
+async function loadSeatLayout(eventId, revalidate = false) {
+    const seatMap = document.getElementById('seatMap');
+    const layoutRes = await fetch(`${bookingsApiUrl}/${eventId}/seats/layout`, revalidate ? { cache: 'no-cache' } : {});
+    seatLayout = await layoutRes.json();
+    seatVersion = null;
+    seatDivs = [];
+    seatOrdinals = {};
+    seatMap.innerHTML = '';
+
+    // Seats arrive in layout order, so rows are already front to back
+    const seats = seatLayout.seats;
+    let rowDiv = null;
+    let currentRow = null;
+    for (let i = 0; i < seats.id.length; i++) {
+        const rowLabel = seatLayout.rows[seats.row[i]];
+        if (rowLabel !== currentRow) {
+            currentRow = rowLabel;
+            rowDiv = document.createElement('div');
+            rowDiv.className = 'seat-row';
+
+            const labelSpan = document.createElement('span');
+            labelSpan.className = 'row-label';
+            labelSpan.innerText = rowLabel;
+            rowDiv.appendChild(labelSpan);
+            seatMap.appendChild(rowDiv);
+        }
+
+        const price = basePrice * seatLayout.tiers[seats.tier[i]][1];
+        const div = document.createElement('div');
+        div.className = 'seat booked';
+        div.dataset.id = seats.id[i];
+        div.dataset.price = price;
+        div.dataset.row = rowLabel;
+        div.dataset.number = seats.number[i];
+        div.title = `${rowLabel}${seats.number[i]} - $${price}`;
+        div.innerText = seats.number[i]; // Just number in the box
+        div.addEventListener('click', () => toggleSeat(div));
+        rowDiv.appendChild(div);
+        seatOrdinals[seats.id[i]] = seatDivs.length;
+        seatDivs.push(div);
+    }
+
+    await refreshSeatAvailability(eventId);
+}
+
+function setSeatState(i, state) {
+    const div = seatDivs[i];
+    if (!div) return;
+    const available = state === '0' || state === 0;
+    div.classList.toggle('available', available);
+    div.classList.toggle('booked', !available);
+    if (!available && selectedSeats.has(div.dataset.id)) {
+        // Someone else took a seat we had selected
+        selectedSeats.delete(div.dataset.id);
+        div.classList.remove('selected');
+        updateSummary();
+    }
+}
+
+async function refreshSeatAvailability(eventId) {
+    const query = seatVersion ? `?since=${encodeURIComponent(seatVersion)}` : '';
+    const res = await fetch(`${bookingsApiUrl}/${eventId}/seats/availability${query}`);
+    if (!res.ok) return;
+    const data = await res.json();
+
+    if (seatLayout && data.layout !== seatLayout.digest) {
+        // The venue layout changed underneath us, start over
+        await loadSeatLayout(eventId, true);
+        return;
+    }
+    if (data.state !== undefined) {
+        for (let i = 0; i < data.state.length; i++) setSeatState(i, data.state[i]);
+    } else {
+        data.changes.forEach(([i, state]) => setSeatState(i, state));
+    }
+    seatVersion = data.version;
+}
+
+function startSeatPolling(eventId) {
+    if (seatPollTimer) clearInterval(seatPollTimer);
+    seatPollTimer = setInterval(() => {
+        if (document.hidden) return;
+        refreshSeatAvailability(eventId).catch(err => console.error(err));
+    }, SEAT_POLL_INTERVAL);
+}
+
+function stopSeatPolling() {
+    if (seatPollTimer) clearInterval(seatPollTimer);
+    seatPollTimer = null;
+}
+
+// Live updates over Server-Sent Events; polling is only used while the
+// stream is down (and in browsers without EventSource)
+function startSeatStream(eventId) {
+    if (!window.EventSource) {
+        startSeatPolling(eventId);
+        return;
+    }
+    if (seatStream) seatStream.close();
+    seatStream = new EventSource(`${bookingsApiUrl}/${eventId}/seats/stream`);
+
+    seatStream.onopen = () => {
+        stopSeatPolling();
+        // Catch up on anything missed while connecting
+        refreshSeatAvailability(eventId).catch(err => console.error(err));
+    };
+    seatStream.onerror = () => {
+        // EventSource reconnects by itself; poll in the meantime
+        if (!seatPollTimer) startSeatPolling(eventId);
+    };
+    seatStream.addEventListener('seats', (e) => {
+        const change = JSON.parse(e.data);
+        change.seat_ids.forEach(id => {
+            if (id in seatOrdinals) setSeatState(seatOrdinals[id], change.state);
+        });
+    });
+    seatStream.addEventListener('resync', () => {
+        seatVersion = null;
+        refreshSeatAvailability(eventId).catch(err => console.error(err));
+    });
+}
+
 function toggleSeat(seatDiv) {
     const id = seatDiv.dataset.id;
+    if (!selectedSeats.has(id) && !seatDiv.classList.contains('available')) return;
     if (selectedSeats.has(id)) {
         selectedSeats.delete(id);
         seatDiv.classList.remove('selected');
@@ -456,7 +625,7 @@ function updateSummary() {
 
     // Enable/Disable button
     const btn = document.getElementById('bookBtn');
-    btn.disabled = count === 0;
+    btn.disabled = count === 0 || inWaitingRoom;
     console.log(`Button disabled? ${btn.disabled}`);
 }
 
@@ -473,9 +642,11 @@ async function bookSelectedSeats(eventId) {
 
     try {
         // Step 1: Lock Seats
+        const lockHeaders = { 'Content-Type': 'application/json' };
+        if (queueAdmission) lockHeaders['X-Queue-Token'] = queueAdmission;
         const lockResponse = await authFetch(`${bookingsApiUrl}/lock`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: lockHeaders,
             body: JSON.stringify({
                 event_id: eventId,
                 seat_ids: Array.from(selectedSeats)
@@ -485,9 +656,15 @@ async function bookSelectedSeats(eventId) {
         const lockResult = await lockResponse.json();
         if (!lockResponse.ok) {
             alert(lockResult.msg);
+            if (lockResult.queue) {
+                // Admission lapsed (or a room just opened): back into the queue
+                sessionStorage.removeItem(`queueToken-${eventId}`);
+                enterWaitingRoom(eventId);
+            }
             document.getElementById('paymentModal').style.display = 'none';
             return;
         }
+        pendingHold = { id: lockResult.booking_id, token: lockResult.release_token };
 
         // Step 2: Simulate Payment processing time
         const payBtn = document.querySelector('#paymentForm button[type="submit"]');
@@ -496,10 +673,19 @@ async function bookSelectedSeats(eventId) {
         payBtn.disabled = true;
 
         setTimeout(async () => {
-            // Step 3: Confirm Booking
+            // Step 3: Confirm Booking. The key is kept per booking so a retried
+            // click replays the first confirmation instead of running it twice
+            const keyName = `confirmKey-${lockResult.booking_id}`;
+            let idempotencyKey = sessionStorage.getItem(keyName);
+            if (!idempotencyKey) {
+                idempotencyKey = window.crypto && crypto.randomUUID
+                    ? crypto.randomUUID()
+                    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+                sessionStorage.setItem(keyName, idempotencyKey);
+            }
             const confirmResponse = await authFetch(`${bookingsApiUrl}/confirm`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
                 body: JSON.stringify({
                     booking_id: lockResult.booking_id
                 })
@@ -509,9 +695,12 @@ async function bookSelectedSeats(eventId) {
 
             if (confirmResponse.ok) {
                 // Success
+                pendingHold = null;
                 window.location.href = `/api/bookings/ticket/${confirmResult.booking_id}`;
             } else {
                 alert('Payment/Confirmation Failed: ' + confirmResult.msg);
+                // Don't keep the seats from other buyers while the user decides
+                releasePendingHold();
                 payBtn.textContent = originalText;
                 payBtn.disabled = false;
             }
@@ -520,17 +709,17 @@ async function bookSelectedSeats(eventId) {
     } catch (err) { console.error(err); }
 }
 
-async function loadMyBookings() {
+async function loadMyBookings(cursor = null) {
     const list = document.getElementById('myBookingsList');
     try {
-        const response = await authFetch(`${bookingsApiUrl}/my`, { method: 'GET' });
+        const url = cursor ? `${bookingsApiUrl}/my?cursor=${encodeURIComponent(cursor)}` : `${bookingsApiUrl}/my`;
+        const response = await authFetch(url, { method: 'GET' });
         if (response.ok) {
             const bookings = await response.json();
-            list.innerHTML = '';
+            if (!cursor) list.innerHTML = '';
             bookings.forEach(b => {
                 const div = document.createElement('div');
                 div.className = 'booking-item';
-                div.className = 'booking-item';
                 div.innerHTML = `
                     <div class="ticket-left">
                         <div>
@@ -549,6 +738,19 @@ async function loadMyBookings() {
                 `;
                 list.appendChild(div);
             });
+
+            // More history is fetched a page at a time
+            const nextCursor = response.headers.get('X-Next-Cursor');
+            if (nextCursor) {
+                const moreBtn = document.createElement('button');
+                moreBtn.className = 'btn-primary';
+                moreBtn.textContent = 'Load more';
+                moreBtn.onclick = () => {
+                    moreBtn.remove();
+                    loadMyBookings(nextCursor);
+                };
+                list.appendChild(moreBtn);
+            }
         }
     } catch (err) { console.error(err); }
 }
@@ -630,6 +832,8 @@ async function authFetch(url, options = {}) {
             if (refreshRes.ok) {
                 const data = await refreshRes.json();
                 localStorage.setItem('access_token', data.access_token);
+                // The role may have changed since login
+                if (data.role) localStorage.setItem('role', data.role);
                 token = data.access_token;
                 options.headers['Authorization'] = `Bearer ${token}`;
                 response = await fetch(url, options);
@@ -689,13 +893,14 @@ async function loadAdminUsers() {
     } catch (err) { console.error(err); }
 }
 
-async function loadAdminEvents() {
+async function loadAdminEvents(cursor = null) {
     try {
-        const response = await authFetch('/api/admin/events');
+        const url = cursor ? `/api/admin/events?cursor=${encodeURIComponent(cursor)}` : '/api/admin/events';
+        const response = await authFetch(url);
         if (response.ok) {
             const events = await response.json();
             const tbody = document.getElementById('allEventsTable');
-            tbody.innerHTML = '';
+            if (!cursor) tbody.innerHTML = '';
             events.forEach(e => {
                 const tr = document.createElement('tr');
                 // Status color
@@ -718,6 +923,18 @@ async function loadAdminEvents() {
                 `;
                 tbody.appendChild(tr);
             });
+
+            // Events are paged server-side
+            const nextCursor = response.headers.get('X-Next-Cursor');
+            if (nextCursor) {
+                const tr = document.createElement('tr');
+                tr.innerHTML = `<td colspan="6" style="text-align: center;"><button class="btn-secondary btn-sm">Load more</button></td>`;
+                tr.querySelector('button').onclick = () => {
+                    tr.remove();
+                    loadAdminEvents(nextCursor);
+                };
+                tbody.appendChild(tr);
+            }
         }
     } catch (err) { console.error(err); }
 }
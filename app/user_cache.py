@@ -0,0 +1,52 @@
+"""Short-lived cache of user profiles (role, username, email, token version).
+
+Keeps role checks and /api/auth/me off the database. Entries expire after
+USER_CACHE_TTL seconds and are dropped explicitly when a user changes
+(invalidate), so within a process a role change is seen immediately and
+other workers see it within the TTL.
+"""
+import threading
+import time
+from flask import current_app
+from app.models import db, User
+
+_profiles = {}  # user_id -> (expires_at, profile)
+_lock = threading.Lock()
+
+
+def _load(user_id):
+    row = db.session.query(
+        User.id, User.username, User.email, User.role, User.token_version
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return {
+        "id": row.id,
+        "username": row.username,
+        "email": row.email,
+        "role": row.role,
+        "token_version": row.token_version or 0
+    }
+
+
+def get_profile(user_id):
+    """Return the user's profile dict, or None if the user does not exist."""
+    now = time.monotonic()
+    cached = _profiles.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    profile = _load(user_id)
+    if profile is not None:
+        ttl = current_app.config.get('USER_CACHE_TTL', 60)
+        with _lock:
+            _profiles[user_id] = (now + ttl, profile)
+    return profile
+
+
+def invalidate(user_id=None):
+    with _lock:
+        if user_id is None:
+            _profiles.clear()
+        else:
+            _profiles.pop(user_id, None)
@@ -0,0 +1,165 @@
+"""User creation helpers: unique-constraint mapping and bulk CSV import."""
+import csv
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from flask import current_app
+from app.models import db, User
+
+# How each unique column shows up in IntegrityError messages
+# (SQLite, PostgreSQL, MySQL)
+UNIQUE_CONSTRAINTS = {
+    'username': ('event_users.username', 'event_users_username_key', "'username'"),
+    'email': ('event_users.email', 'event_users_email_key', "'email'"),
+}
+
+IMPORT_ROLES = ('customer', 'organizer')
+IMPORT_BATCH_SIZE = 500
+
+
+def duplicate_field(error):
+    """Return the column ('username'/'email') an IntegrityError complained about, or None."""
+    message = str(getattr(error, 'orig', error))
+    for field, names in UNIQUE_CONSTRAINTS.items():
+        if any(name in message for name in names):
+            return field
+    return None
+
+
+def taken_fields(username, email):
+    """One query for both unique fields; returns the set of fields already taken."""
+    rows = db.session.query(User.username, User.email).filter(
+        db.or_(User.username == username, User.email == email)
+    ).all()
+    taken = set()
+    for row in rows:
+        if row.username == username:
+            taken.add('username')
+        if row.email == email:
+            taken.add('email')
+    return taken
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # {"line", "field", "msg"}
+
+    def error(self, line, msg, field=None):
+        self.errors.append({"line": line, "field": field, "msg": msg})
+
+    def to_dict(self, max_errors=100):
+        return {
+            "created": self.created,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["line"])[:max_errors]
+        }
+
+
+def _hash_passwords(rows, executor, method):
+    # Rows with a ready-made password_hash keep it; the rest are hashed in parallel.
+    # Rows without either get a random password (to be reset before first login)
+    futures = []
+    for row in rows:
+        if row.get('password_hash'):
+            futures.append(None)
+        else:
+            password = row.get('password') or secrets.token_urlsafe(16)
+            futures.append(executor.submit(generate_password_hash, password, method))
+    for row, future in zip(rows, futures):
+        if future is not None:
+            row['password_hash'] = future.result()
+
+
+def _insert_batch(batch, report):
+    """Insert (line, row) pairs, skipping rows that clash with existing users."""
+    usernames = [row['username'] for _, row in batch]
+    emails = [row['email'] for _, row in batch]
+    existing = db.session.query(User.username, User.email).filter(
+        db.or_(User.username.in_(usernames), User.email.in_(emails))
+    ).all()
+    taken_usernames = {u for u, _ in existing}
+    taken_emails = {e for _, e in existing}
+
+    rows = []
+    for line, row in batch:
+        if row['username'] in taken_usernames:
+            report.error(line, "Username already exists", 'username')
+        elif row['email'] in taken_emails:
+            report.error(line, "Email already exists", 'email')
+        else:
+            rows.append((line, row))
+
+    values = [{"username": r['username'], "email": r['email'], "role": r['role'],
+               "password_hash": r['password_hash']} for _, r in rows]
+    if not values:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(User.__table__.insert(), values)
+        report.created += len(values)
+    except IntegrityError:
+        # Someone signed up concurrently; redo this batch row by row
+        for (line, _), value in zip(rows, values):
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(User.__table__.insert(), [value])
+                report.created += 1
+            except IntegrityError as e:
+                field = duplicate_field(e)
+                report.error(line, f"{(field or 'User').capitalize()} already exists", field)
+
+
+def import_users(lines, default_role='customer', batch_size=None, workers=None):
+    """Create users from CSV text lines with columns username, email and optionally
+    password, password_hash (werkzeug format) and role.
+
+    Rows are read and written in batches, so the file is never held in
+    memory. Passwords are hashed on a worker pool separate from the login
+    pool. Commits after every batch; returns an ImportReport.
+    """
+    config = current_app.config
+    method = config.get('PASSWORD_HASH_METHOD', 'scrypt')
+    workers = workers or config.get('IMPORT_HASH_WORKERS', 4)
+    batch_size = batch_size or config.get('IMPORT_BATCH_SIZE', IMPORT_BATCH_SIZE)
+    report = ImportReport()
+    reader = csv.DictReader(lines)
+
+    missing = {'username', 'email'} - set(reader.fieldnames or [])
+    if missing:
+        report.error(1, f"Missing columns: {', '.join(sorted(missing))}")
+        return report
+
+    seen_usernames, seen_emails = set(), set()
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import-hash') as executor:
+        def flush():
+            _hash_passwords([row for _, row in batch], executor, method)
+            _insert_batch(batch, report)
+            db.session.commit()
+            batch.clear()
+
+        for row in reader:
+            line = reader.line_num
+            row = {k: (v or '').strip() for k, v in row.items() if k}
+            row['role'] = row.get('role') or default_role
+
+            if not row['username'] or not row['email']:
+                report.error(line, "Missing username or email")
+            elif row['role'] not in IMPORT_ROLES:
+                report.error(line, f"Role must be one of {', '.join(IMPORT_ROLES)}", 'role')
+            elif row['username'] in seen_usernames:
+                report.error(line, "Duplicate username in file", 'username')
+            elif row['email'] in seen_emails:
+                report.error(line, "Duplicate email in file", 'email')
+            else:
+                seen_usernames.add(row['username'])
+                seen_emails.add(row['email'])
+                batch.append((line, row))
+
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    return report
@@ -0,0 +1,224 @@
+"""Virtual waiting room for high-demand on-sales.
+
+An admin opens a room for an event with an admission rate. Visitors join
+and get a signed queue token carrying their place in line; the room lets
+people in at `rate` per second (plus a small `burst` banked while the line
+is empty), so the booking endpoints see a steady stream instead of the
+whole crowd at once. Once a visitor's turn has come, /status hands a
+signed-in visitor a short-lived admission token, and the booking endpoints
+(/api/bookings/lock, /best-available) refuse requests for that event
+without one (X-Queue-Token).
+
+An admission token names the place in line and the user it was issued to,
+and is only accepted from that user. The first account to be admitted on a
+place in line keeps it (a shared queue token admits nobody else), and each
+admission is good for WAITING_ROOM_ADMISSION_USES lock attempts, so a
+posted token can't let the rest of the line skip the queue.
+
+Positions are arithmetic on two counters per room (tickets issued, tickets
+admitted so far), so joining and polling never touch the database. Rooms
+live in process memory, like the seat availability index: the Procfile
+runs a single threaded worker, and a restart closes every room (holders
+of old queue tokens are asked to rejoin).
+"""
+import math
+import secrets
+import threading
+import time
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+QUEUE_SALT = 'waiting-room-queue'
+ADMISSION_SALT = 'waiting-room-admission'
+
+
+class QueueTokenError(Exception):
+    """Missing, forged, expired or stale queue/admission token."""
+
+
+class WaitingRoom:
+    def __init__(self, event_id, rate, burst=0, now=None):
+        self.event_id = event_id
+        self.rate = float(rate)
+        self.burst = int(burst)
+        # Tokens from an earlier room for the same event are not honoured
+        self.room_id = secrets.token_hex(4)
+        self.issued = 0
+        self.admitted = float(self.burst)  # Everyone with seq <= admitted is in
+        self._admissions = {}  # seq -> [user ID it was admitted for, lock attempts used]
+        self._last = now if now is not None else time.monotonic()
+        self._lock = threading.Lock()
+
+    def _advance(self, now):
+        if now > self._last:
+            # Capacity banks up to `burst` ahead of the line, no further
+            self.admitted = min(self.issued + self.burst, self.admitted + (now - self._last) * self.rate)
+            self._last = now
+
+    def join(self, now=None):
+        """Take the next place in line. Returns the sequence number."""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._advance(now)
+            self.issued += 1
+            return self.issued
+
+    def position(self, seq, now=None):
+        """People ahead of seq still waiting; 0 means admitted."""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._advance(now)
+            return max(0, math.ceil(seq - self.admitted))
+
+    def claim(self, seq, user_id):
+        """Admit seq for user_id. False if another user was already admitted on it."""
+        with self._lock:
+            return self._admissions.setdefault(seq, [user_id, 0])[0] == user_id
+
+    def use(self, seq, user_id, max_uses):
+        """Count a lock attempt on seq's admission. False if it isn't user_id's or is used up."""
+        with self._lock:
+            entry = self._admissions.get(seq)
+            if entry is None or entry[0] != user_id or entry[1] >= max_uses:
+                return False
+            entry[1] += 1
+            return True
+
+    def wait_seconds(self, position):
+        return position / self.rate if self.rate > 0 else None
+
+    def set_rate(self, rate, burst=None, now=None):
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._advance(now)
+            self.rate = float(rate)
+            if burst is not None:
+                self.burst = int(burst)
+
+    def stats(self, now=None):
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._advance(now)
+            admitted = min(self.issued, int(self.admitted))
+            return {
+                "event_id": self.event_id,
+                "rate": self.rate,
+                "burst": self.burst,
+                "issued": self.issued,
+                "admitted": admitted,
+                "waiting": self.issued - admitted
+            }
+
+
+_rooms = {}  # event_id -> WaitingRoom
+_rooms_lock = threading.Lock()
+
+
+def get_room(event_id):
+    return _rooms.get(event_id)
+
+
+def open_room(event_id, rate=None, burst=None):
+    """Open a room for the event, or change the rate of the open one."""
+    config = current_app.config
+    rate = rate if rate is not None else config.get('WAITING_ROOM_RATE', 50)
+    with _rooms_lock:
+        room = _rooms.get(event_id)
+        if room is None:
+            room = _rooms[event_id] = WaitingRoom(
+                event_id, rate, burst if burst is not None else config.get('WAITING_ROOM_BURST', 20))
+        else:
+            room.set_rate(rate, burst)
+    return room
+
+
+def close_room(event_id):
+    with _rooms_lock:
+        return _rooms.pop(event_id, None)
+
+
+def rooms():
+    return list(_rooms.values())
+
+
+def _serializer(salt):
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=salt)
+
+
+def queue_token(room, seq):
+    return _serializer(QUEUE_SALT).dumps({"e": room.event_id, "r": room.room_id, "s": seq})
+
+
+def read_queue_token(event_id, token):
+    """Return (room, seq) for a queue token of this event's open room."""
+    if not token:
+        raise QueueTokenError("Missing queue token")
+    try:
+        data = _serializer(QUEUE_SALT).loads(token)
+    except BadSignature:
+        raise QueueTokenError("Invalid queue token")
+    room = get_room(event_id)
+    if room is None or data.get("e") != event_id or data.get("r") != room.room_id:
+        raise QueueTokenError("Queue was reset, please rejoin")
+    return room, data["s"]
+
+
+def admission_token(room, seq, user_id):
+    return _serializer(ADMISSION_SALT).dumps({"e": room.event_id, "r": room.room_id, "s": seq, "u": user_id})
+
+
+def check_admission(event_id, token, user_id):
+    """Raise QueueTokenError unless booking is open for this caller.
+
+    Events without an open room need no token. Each accepted check counts
+    as one of the admission's WAITING_ROOM_ADMISSION_USES lock attempts.
+    """
+    room = get_room(event_id)
+    if room is None:
+        return
+    if not token:
+        raise QueueTokenError("This event has a waiting room, please join the queue")
+    max_age = current_app.config.get('WAITING_ROOM_ADMISSION_TTL', 900)
+    try:
+        data = _serializer(ADMISSION_SALT).loads(token, max_age=max_age)
+    except SignatureExpired:
+        raise QueueTokenError("Admission expired, please rejoin the queue")
+    except BadSignature:
+        raise QueueTokenError("Invalid admission token")
+    if data.get("e") != event_id or data.get("r") != room.room_id:
+        raise QueueTokenError("Admission token is not valid for this queue, please rejoin")
+    if data.get("u") != user_id:
+        raise QueueTokenError("Admission token was issued to another account, please join the queue")
+    if not room.use(data.get("s"), user_id, current_app.config.get('WAITING_ROOM_ADMISSION_USES', 5)):
+        raise QueueTokenError("Admission used up, please rejoin the queue")
+
+
+def poll_after(wait):
+    # Check back halfway to the expected turn: rare polls from the back of
+    # the line, and admitted visitors find out (and book) within a second
+    # or so of their turn instead of in bunches
+    if wait is None:
+        return 30
+    return min(30, max(1, math.ceil(wait / 2)))
+
+
+def status(room, seq, user_id=None):
+    """Queue status for a visitor: position and, once admitted, an admission token.
+
+    The token is only issued to a signed-in visitor (user_id). Raises
+    QueueTokenError if another account was already admitted on seq.
+    """
+    position = room.position(seq)
+    result = {"position": position, "admitted": position == 0}
+    if position == 0:
+        if user_id is None:
+            result["login_required"] = True
+        elif room.claim(seq, user_id):
+            result["admission_token"] = admission_token(room, seq, user_id)
+        else:
+            raise QueueTokenError("This place in line was used by another account, please rejoin")
+    else:
+        wait = room.wait_seconds(position)
+        result["estimated_wait"] = round(wait) if wait is not None else None
+        result["poll_after"] = poll_after(wait)
+    return result
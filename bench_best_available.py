@@ -0,0 +1,175 @@
+import sys
+import os
+import random
+import statistics
+import time
+sys.path.append(os.getcwd())
+
+from app import create_app, db, availability
+from app.models import User, Venue, Event, Booking, SeatHold
+from app.seat_layout import generate_seats, insert_seats, validate_layout, count_seats, LAYOUT_VERSION
+from app.seat_runs import FreeRunIndex
+from config import Config
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+
+# Best-available seat selection on a large, nearly sold out venue.
+#   python bench_best_available.py [sold_fraction] [database_url]
+# Defaults to a 50,000 seat venue 95% sold on an in-memory SQLite database.
+#
+# Sales are laid down row by row as sold blocks of 5-90 seats separated by
+# gaps of 1-6 free seats, the way a venue fragments after a busy on-sale,
+# so most rows have no room for a larger party. The preferred sections went
+# first and only have single seats left, so every party ends up in the
+# Upper Bowl behind 100 rows that can't take it. The free-run index is
+# compared with scanning every row in preference order.
+
+SOLD = float(sys.argv[1]) if len(sys.argv) > 1 else 0.95
+PICKS = 300
+
+LAYOUT = {"version": LAYOUT_VERSION, "tiers": {"Premium": 2.5, "Regular": 1.0}, "sections": [
+    {"name": "Floor", "tier": "Premium", "preference": 5, "rows": 40, "seats_per_row": 100},
+    {"name": "Lower Bowl", "tier": "Premium", "preference": 10,
+     "rows": [[1, 150] if n % 4 else [11, 150] for n in range(60)]},
+    {"name": "Upper Bowl", "tier": "Regular", "preference": 1, "rows": 185, "seats_per_row": 200},
+]}
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = sys.argv[2] if len(sys.argv) > 2 else "sqlite:///:memory:"
+    EXPIRY_SWEEPER = 'off'
+
+app = create_app(config_class=BenchConfig)
+
+
+def fragmented_sales(layout, rng):
+    """Seat IDs to mark sold: alternating sold blocks and small free gaps along every row."""
+    # Mean free gap is 2.5 seats; size sold blocks to hit the sold fraction
+    mean_sold = 2.5 * SOLD / (1 - SOLD)
+    sold = []
+    for row in layout.row_seats():
+        preferred = layout.section_preferences[layout.seat_sections[row[0]]] > 1
+        gaps = (1,) if preferred else (1, 1, 1, 2, 2, 3, 4, 6)
+        k = rng.randrange(4)
+        while k < len(row):
+            block = max(1, int(rng.uniform(0.1, 1.9) * mean_sold))
+            sold.extend(layout.seat_ids[i] for i in row[k:k + block])
+            k += block + rng.choice(gaps)
+    return sold
+
+
+def setup():
+    db.create_all()
+    assert validate_layout(LAYOUT) is None
+    organizer = User(username="bench-org", email="org@bench", role="organizer", password_hash="x")
+    customer = User(username="bench-fan", email="fan@bench", role="customer", password_hash="x")
+    db.session.add_all([organizer, customer])
+    db.session.flush()
+    venue = Venue(name="Bench Arena", address="Bench", capacity=count_seats(LAYOUT),
+                  owner_id=organizer.id, layout=LAYOUT)
+    db.session.add(venue)
+    db.session.flush()
+    insert_seats(venue.id, generate_seats(LAYOUT))
+    event = Event(title="Bench Night", date_time=datetime.utcnow() + timedelta(days=30), venue_id=venue.id,
+                  organizer_id=organizer.id, base_price=40, status='Active')
+    db.session.add(event)
+    db.session.flush()
+    booking = Booking(user_id=organizer.id, event_id=event.id, status='Confirmed', total_amount=0)
+    db.session.add(booking)
+    db.session.commit()
+
+    layout = availability.get_index(event.id).layout
+    sold = fragmented_sales(layout, random.Random(42))
+    db.session.execute(SeatHold.__table__.insert(), [
+        {"event_id": event.id, "seat_id": seat_id, "booking_id": booking.id, "expires_at": None}
+        for seat_id in sold
+    ])
+    db.session.commit()
+    availability.invalidate(event.id)
+    return event, customer
+
+
+def naive_pick(index, n):
+    """Scan rows in preference order for the first one with n adjacent free seats."""
+    layout, state = index.layout, index.state
+    for row in naive_rows:
+        run, previous = 0, None
+        for i in row:
+            if state[i] == 0:
+                run = run + 1 if previous is not None and layout.seat_numbers[i] == previous + 1 else 1
+                if run == n:
+                    return row
+            else:
+                run = 0
+            previous = layout.seat_numbers[i] if state[i] == 0 else None
+    return None
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+with app.app_context():
+    start = time.perf_counter()
+    event, customer = setup()
+    index = availability.get_index(event.id)
+    free = index.snapshot().count(0)
+    print(f"{len(index)} seats, {len(index) - free} sold ({1 - free / len(index):.1%}), "
+          f"set up in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    runs = FreeRunIndex(index.layout)
+    runs.refresh(index.state)
+    print(f"free-run index built in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"({len(runs.rows)} rows)")
+    naive_rows = runs.rows
+
+    for n in (2, 4, 6, 8):
+        picked = []
+        hold_until = datetime.utcnow() + timedelta(minutes=5)
+
+        def pick():
+            seat_ids = index.pick_best(n, hold_until)
+            if seat_ids:
+                picked.append(seat_ids)
+
+        def pick_and_release():
+            # Released straight away so every pick sees the same venue
+            pick()
+            if picked:
+                index.release(picked.pop())
+
+        p50, p95 = timed(pick_and_release, PICKS)
+        naive50, naive95 = timed(lambda: naive_pick(index, n), 20)
+        fits = sum(1 for row in runs.rows if runs.tree[runs.size + runs.row_of[row[0]]] >= n)
+        print(f"N={n}: {fits:>4} rows fit  free-run index p50 {p50:.3f}ms p95 {p95:.3f}ms  "
+              f"| full scan p50 {naive50:.2f}ms p95 {naive95:.2f}ms")
+
+    # Pick until nothing is left for a pair: every pick changes the venue
+    start = time.perf_counter()
+    count = 0
+    while index.pick_best(2, datetime.utcnow() + timedelta(minutes=5)):
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"sold out pairs: {count} consecutive picks, {elapsed / max(count, 1) * 1000:.3f}ms avg")
+
+    # End to end: select, claim in the hold table, create tickets, commit
+    availability.invalidate(event.id)
+    client = app.test_client()
+    headers = {"Authorization": "Bearer " + create_access_token(identity=str(customer.id),
+                                                              additional_claims={"role": "customer"})}
+    timings, statuses = [], {}
+    for n in [2, 4, 3, 2, 6] * 20:
+        start = time.perf_counter()
+        response = client.post("/api/bookings/best-available", json={"event_id": event.id, "quantity": n},
+                               headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    timings.sort()
+    print(f"POST /api/bookings/best-available: p50 {statistics.median(timings):.2f}ms "
+          f"p95 {timings[int(len(timings) * 0.95)]:.2f}ms  statuses {statuses}")
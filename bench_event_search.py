@@ -0,0 +1,125 @@
+import sys
+import os
+import itertools
+import random
+import statistics
+import tempfile
+import time
+sys.path.append(os.getcwd())
+
+from app import create_app, db, search
+from app.models import User, Venue, Event
+from config import Config
+from datetime import datetime, timedelta
+
+# Event search latency per backend over a generated catalog.
+#   python bench_event_search.py [events] [database_url]
+# Defaults to 100,000 events on a throwaway SQLite file; runs the FTS5 and
+# in-process backends there (or the tsvector one on a PostgreSQL URL).
+#
+# Titles are a genre word plus two words from a 5,000 word vocabulary,
+# descriptions 20 vocabulary words drawn with Zipf-like frequencies, like
+# real text. Queries are genres, cities, typed prefixes and vocabulary
+# words outside the 100 most common (the "the/and/with" tier nobody
+# searches for).
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+QUERIES = 500
+
+GENRES = ("rock jazz blues metal opera ballet comedy magic symphony quartet festival gala "
+          "acoustic premiere classic indie electronic folk choir dance orchestra tribute "
+          "theatre circus poetry cinema").split()
+CITIES = ("Paris Berlin Madrid Lisbon Rome Vienna Prague Oslo Dublin Athens Warsaw Zurich").split()
+_SYLLABLES = ("ka lo mi ra ne to su vi da pe zo ri ba fu ge ha ji ku ma no").split()
+VOCABULARY = sorted({a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES})[:5000]
+ZIPF_CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = (sys.argv[2] if len(sys.argv) > 2 else
+                               f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='search-bench-'), 'bench.db')}")
+
+app = create_app(config_class=BenchConfig)
+
+
+def setup():
+    db.create_all()
+    organizer = User(username="bench-org", email="org@bench", role="organizer", password_hash="x")
+    db.session.add(organizer)
+    db.session.flush()
+    venues = [Venue(name=f"{city} {kind}", address=f"{n} Main Street, {city}", capacity=100, owner_id=organizer.id)
+              for n, city in enumerate(CITIES) for kind in ("Arena", "Hall", "Club")]
+    db.session.add_all(venues)
+    db.session.flush()
+
+    rng = random.Random(42)
+    start = datetime.utcnow()
+    rows = []
+    for n in range(EVENTS):
+        rows.append({
+            "title": " ".join([rng.choice(GENRES)] + rng.choices(VOCABULARY, cum_weights=ZIPF_CUM_WEIGHTS, k=2)).title(),
+            "description": " ".join(rng.choices(VOCABULARY, cum_weights=ZIPF_CUM_WEIGHTS, k=20)),
+            "date_time": start + timedelta(hours=n),
+            "venue_id": rng.choice(venues).id,
+            "organizer_id": organizer.id,
+            "base_price": rng.randint(10, 200),
+            "status": 'Active',
+        })
+        if len(rows) == 5000:
+            db.session.execute(Event.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Event.__table__.insert(), rows)
+    db.session.commit()
+
+
+def queries():
+    rng = random.Random(7)
+    searchable = VOCABULARY[100:]
+    result = []
+    for _ in range(QUERIES):
+        kind = rng.random()
+        if kind < 0.3:
+            result.append(rng.choice(GENRES))
+        elif kind < 0.5:
+            result.append(rng.choice(GENRES)[:3])  # still typing
+        elif kind < 0.7:
+            result.append(f"{rng.choice(GENRES)} {rng.choice(CITIES).lower()}")
+        elif kind < 0.9:
+            result.append(rng.choice(searchable))
+        else:
+            result.append(f"{rng.choice(GENRES)} {rng.choice(searchable)[:4]}")
+    return result
+
+
+def run(backend_name, qs):
+    app.config['SEARCH_BACKEND'] = backend_name
+    start = time.perf_counter()
+    search.rebuild()
+    print(f"{backend_name:>8}: index built in {time.perf_counter() - start:.1f}s")
+
+    timings = []
+    for q in qs:
+        start = time.perf_counter()
+        search.search(q, 20)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"{backend_name:>8}: p50 {statistics.median(timings):.2f}ms  "
+          f"p95 {timings[int(len(timings) * 0.95)]:.2f}ms  max {timings[-1]:.2f}ms")
+
+    # The endpoint adds the details query for the page of hits
+    client = app.test_client()
+    start = time.perf_counter()
+    for q in qs[:100]:
+        client.get("/api/events/search", query_string={"q": q})
+    print(f"{backend_name:>8}: GET /api/events/search {(time.perf_counter() - start) * 10:.2f}ms avg")
+
+
+with app.app_context():
+    start = time.perf_counter()
+    setup()
+    print(f"{EVENTS} events generated in {time.perf_counter() - start:.1f}s")
+    qs = queries()
+    dialect = db.engine.dialect.name
+    backends = {'sqlite': ['fts5', 'memory'], 'postgresql': ['postgres', 'memory']}.get(dialect, ['memory'])
+    for name in backends:
+        run(name, qs)
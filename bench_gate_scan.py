@@ -0,0 +1,138 @@
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+sys.path.append(os.getcwd())
+
+from app import create_app, db
+from app.models import User, Venue, Seat, Event, Booking, Ticket
+from app.seat_layout import generate_seats, insert_seats, layout_for_capacity
+from app import gate
+from config import Config
+from flask_jwt_extended import create_access_token
+from datetime import datetime, timedelta
+
+# Replays a recorded gate scan stream against the gate index, the single
+# scan endpoint and the batched scan endpoint, and reports scans/second.
+#   python bench_gate_scan.py [tickets] [scan_stream.jsonl]
+# Without a stream file one is recorded first: every ticket scanned once in
+# random order, plus 5% repeat scans and 2% unknown codes, one JSON object
+# ({"code", "gate", "ts"}) per line.
+
+TICKETS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+STREAM_PATH = sys.argv[2] if len(sys.argv) > 2 else None
+BATCH = 50
+
+workdir = tempfile.mkdtemp(prefix="gate-bench-")
+
+
+class BenchConfig(Config):
+    # A file database, so the write-behind thread sees the same data
+    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    GATE_FLUSH_INTERVAL = 0.2
+
+app = create_app(config_class=BenchConfig)
+
+
+def setup():
+    db.create_all()
+    organizer = User(username="bench-org", email="org@bench", role="organizer")
+    organizer.set_password("bench")
+    customer = User(username="bench-cust", email="cust@bench", role="customer")
+    customer.set_password("bench")
+    db.session.add_all([organizer, customer])
+    db.session.flush()
+
+    venue = Venue(name="Bench Arena", address="Bench", capacity=TICKETS, owner_id=organizer.id)
+    db.session.add(venue)
+    db.session.flush()
+    insert_seats(venue.id, generate_seats(layout_for_capacity(TICKETS)))
+
+    event = Event(title="Bench Night", date_time=datetime.utcnow() + timedelta(days=1),
+                  venue_id=venue.id, organizer_id=organizer.id, base_price=10, status='Active')
+    db.session.add(event)
+    db.session.flush()
+
+    # One confirmed booking per 4 seats
+    seat_ids = [s_id for (s_id,) in db.session.query(Seat.id).filter_by(venue_id=venue.id).order_by(Seat.id)]
+    tickets = []
+    for start in range(0, len(seat_ids), 4):
+        booking = Booking(user_id=customer.id, event_id=event.id, status='Confirmed', total_amount=40)
+        db.session.add(booking)
+        db.session.flush()
+        for s_id in seat_ids[start:start + 4]:
+            tickets.append({"booking_id": booking.id, "seat_id": s_id,
+                            "unique_code": f"EVT-{event.id}-ST-{s_id}", "status": 'Valid'})
+    db.session.execute(Ticket.__table__.insert(), tickets)
+    db.session.commit()
+    return event, organizer
+
+
+def record_stream(event, path):
+    codes = [code for (code,) in db.session.query(Ticket.unique_code)]
+    scans = codes + random.sample(codes, len(codes) // 20) + [f"FAKE-{n}" for n in range(len(codes) // 50)]
+    random.shuffle(scans)
+    ts = time.time()
+    with open(path, "w") as f:
+        for n, code in enumerate(scans):
+            f.write(json.dumps({"code": code, "gate": f"G{n % 8}", "ts": ts + n * 0.0005}) + "\n")
+
+
+def reset(event_id):
+    gate.writer.flush()
+    Ticket.query.update({"status": 'Valid'}, synchronize_session=False)
+    db.session.commit()
+    return gate.preload(event_id)
+
+
+def report(name, scans, elapsed, results):
+    counts = {}
+    for result in results:
+        counts[result] = counts.get(result, 0) + 1
+    print(f"{name:>24}: {len(scans) / elapsed:>10,.0f} scans/s  {counts}")
+
+
+with app.app_context():
+    event, organizer = setup()
+    stream_path = STREAM_PATH or os.path.join(workdir, "scans.jsonl")
+    if not STREAM_PATH:
+        record_stream(event, stream_path)
+    with open(stream_path) as f:
+        scans = [json.loads(line) for line in f]
+    print(f"{TICKETS} tickets, replaying {len(scans)} scans from {stream_path}")
+
+    headers = {"Authorization": "Bearer " + create_access_token(
+        identity=str(organizer.id), additional_claims={"role": "organizer"})}
+    client = app.test_client()
+    url = f"/api/gate/events/{event.id}/scan"
+
+    # Index only: lookup + write-behind enqueue
+    index = reset(event.id)
+    start = time.perf_counter()
+    results = [index.scan(s["code"])[0] for s in scans]
+    report("gate index", scans, time.perf_counter() - start, results)
+
+    # One HTTP request per scan
+    reset(event.id)
+    gate.writer.start(app)
+    start = time.perf_counter()
+    results = [client.post(url, json={"code": s["code"]}, headers=headers).get_json()["result"] for s in scans]
+    report("POST /scan (single)", scans, time.perf_counter() - start, results)
+
+    # Batched requests, as a gate would send after buffering scans briefly
+    reset(event.id)
+    start = time.perf_counter()
+    results = []
+    for n in range(0, len(scans), BATCH):
+        body = {"scans": [{"code": s["code"]} for s in scans[n:n + BATCH]]}
+        results.extend(r["result"] for r in client.post(url, json=body, headers=headers).get_json()["results"])
+    report(f"POST /scan (batch {BATCH})", scans, time.perf_counter() - start, results)
+
+    # Everything admitted must reach the database
+    time.sleep(0.5)
+    gate.writer.flush()
+    used = Ticket.query.filter_by(status='Used').count()
+    print(f"Tickets marked Used after write-behind: {used} (admitted {results.count(gate.ADMITTED)})")
+    print(gate.writer.metrics())
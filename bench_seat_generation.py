@@ -0,0 +1,51 @@
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
+from app import create_app, db
+from app.models import Venue, Seat
+from app.seat_layout import generate_seats, insert_seats, layout_for_capacity
+from config import Config
+
+# Seats/second for venue seat generation: one ORM object per seat (the old
+# create_venue loop) vs the batched seat_layout writer.
+#   python bench_seat_generation.py [capacity] [database_url]
+# Defaults to a 50,000 seat venue on a throwaway SQLite database.
+
+CAPACITY = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = sys.argv[2] if len(sys.argv) > 2 else "sqlite:///:memory:"
+
+app = create_app(config_class=BenchConfig)
+
+
+def orm_per_seat(venue_id, layout):
+    for label, number, seat_type, multiplier in generate_seats(layout):
+        db.session.add(Seat(venue_id=venue_id, row_label=label, seat_number=number,
+                            seat_type=seat_type, price_multiplier=multiplier))
+    db.session.commit()
+
+
+def bulk(venue_id, layout):
+    insert_seats(venue_id, generate_seats(layout))
+    db.session.commit()
+
+
+with app.app_context():
+    db.create_all()
+    layout = layout_for_capacity(CAPACITY)
+    print(f"Venue capacity: {CAPACITY} seats ({db.engine.dialect.name})")
+
+    for name, writer in [("ORM object per seat", orm_per_seat), ("seat_layout bulk insert", bulk)]:
+        venue = Venue(name=f"Bench {name}", address="Bench", capacity=CAPACITY)
+        db.session.add(venue)
+        db.session.commit()
+
+        start = time.perf_counter()
+        writer(venue.id, layout)
+        elapsed = time.perf_counter() - start
+
+        assert Seat.query.filter_by(venue_id=venue.id).count() == CAPACITY
+        print(f"{name:>26}: {elapsed:7.2f}s  {CAPACITY / elapsed:>10,.0f} seats/s")
@@ -10,3 +10,102 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Seconds a cached user profile (role, token version) is trusted; see app/user_cache.py
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    # API response cache (app/cache.py): 'local' per-process LRU or 'shared' store
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 2048))
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 60))
+    # Public event catalog pages and search results, seconds
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 30))
+    # Event search: 'auto' (FTS5 on SQLite, tsvector on PostgreSQL, else memory),
+    # 'fts5', 'postgres' or 'memory'; the memory index is rebuilt this often (seconds)
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    SEARCH_REBUILD_INTERVAL = int(os.environ.get('SEARCH_REBUILD_INTERVAL', 300))
+    # Password hashing (any werkzeug method, e.g. 'scrypt' or 'pbkdf2:sha256:600000');
+    # older hashes are upgraded on login. Hashing runs on a bounded pool, see app/hashing.py
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # Bulk user imports hash on their own pool so they don't starve logins
+    IMPORT_HASH_WORKERS = int(os.environ.get('IMPORT_HASH_WORKERS', 4))
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    # Login token buckets: sustained attempts per minute and burst size
+    LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', 30))
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 10))
+    LOGIN_USER_PER_MINUTE = float(os.environ.get('LOGIN_USER_PER_MINUTE', 5))
+    LOGIN_USER_BURST = int(os.environ.get('LOGIN_USER_BURST', 5))
+    # Number of proxies in front of the app (e.g. 1 on Render), so the login
+    # limiter sees client IPs from X-Forwarded-For instead of the proxy's
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    # Seconds before a worker rebuilds its in-memory seat availability index
+    SEAT_INDEX_MAX_AGE = int(os.environ.get('SEAT_INDEX_MAX_AGE', 30))
+    # Seat state changes remembered per event for ?since= availability polls
+    SEAT_CHANGE_LOG_SIZE = int(os.environ.get('SEAT_CHANGE_LOG_SIZE', 10000))
+    # Cache lifetime (seconds) of the seat layout response; it is also ETag'd
+    SEAT_LAYOUT_MAX_AGE = int(os.environ.get('SEAT_LAYOUT_MAX_AGE', 86400))
+    # Live seat streams (Server-Sent Events). 'memory' pub/sub only fans out
+    # within one process, see app/pubsub.py
+    PUBSUB_BACKEND = os.environ.get('PUBSUB_BACKEND', 'memory')
+    SEAT_STREAM_QUEUE_SIZE = int(os.environ.get('SEAT_STREAM_QUEUE_SIZE', 100))
+    # Request threads per web worker process (gunicorn.conf.py reads the same
+    # variable). Open seat streams may use at most half of them; the rest are
+    # kept for booking and login, and further viewers are told to poll
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 100))
+    SEAT_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('SEAT_STREAM_MAX_SUBSCRIBERS', WEB_THREADS // 2))
+    SEAT_STREAM_TIMEOUT = int(os.environ.get('SEAT_STREAM_TIMEOUT', 300))
+    SEAT_STREAM_KEEPALIVE = int(os.environ.get('SEAT_STREAM_KEEPALIVE', 15))
+    # Rendered ticket QR codes: in-memory LRU size and on-disk store (default instance/qr)
+    QR_CACHE_SIZE = int(os.environ.get('QR_CACHE_SIZE', 1024))
+    QR_CACHE_DIR = os.environ.get('QR_CACHE_DIR')
+    # Gate scanning: tickets marked Used are written behind the scans in batches
+    GATE_FLUSH_INTERVAL = float(os.environ.get('GATE_FLUSH_INTERVAL', 0.5))
+    GATE_FLUSH_BATCH = int(os.environ.get('GATE_FLUSH_BATCH', 1000))
+    GATE_MAX_BATCH = int(os.environ.get('GATE_MAX_BATCH', 500))
+    # HMAC key for offline gate manifests; scanners need the same key to verify them
+    MANIFEST_SIGNING_KEY = os.environ.get('MANIFEST_SIGNING_KEY') or SECRET_KEY
+    # Waiting rooms (opened per event by an admin): default admissions per second,
+    # places banked while the line is empty, and how long an admission lasts (seconds)
+    WAITING_ROOM_RATE = float(os.environ.get('WAITING_ROOM_RATE', 50))
+    WAITING_ROOM_BURST = int(os.environ.get('WAITING_ROOM_BURST', 20))
+    WAITING_ROOM_ADMISSION_TTL = int(os.environ.get('WAITING_ROOM_ADMISSION_TTL', 900))
+    # Lock attempts one admission allows before its holder has to rejoin the queue
+    WAITING_ROOM_ADMISSION_USES = int(os.environ.get('WAITING_ROOM_ADMISSION_USES', 5))
+    # Seat holds: default minutes a lock keeps its seats (events may set their own,
+    # up to HOLD_MAX_MINUTES), and how often / by how much a customer can extend one
+    HOLD_MINUTES = int(os.environ.get('HOLD_MINUTES', 5))
+    HOLD_MAX_MINUTES = int(os.environ.get('HOLD_MAX_MINUTES', 30))
+    HOLD_MAX_EXTENSIONS = int(os.environ.get('HOLD_MAX_EXTENSIONS', 1))
+    HOLD_EXTENSION_MINUTES = int(os.environ.get('HOLD_EXTENSION_MINUTES', 5))
+    # Best-available booking: largest party per request, and how many times to
+    # pick again when the picked seats turn out to be taken by another worker
+    BEST_AVAILABLE_MAX = int(os.environ.get('BEST_AVAILABLE_MAX', 10))
+    BEST_AVAILABLE_RETRIES = int(os.environ.get('BEST_AVAILABLE_RETRIES', 3))
+    # 'thread' runs the hold expiry sweeper inside the web process (see run.py),
+    # 'off' leaves it to a separate expiry_worker.py process
+    EXPIRY_SWEEPER = os.environ.get('EXPIRY_SWEEPER', 'thread')
+    EXPIRY_SWEEP_INTERVAL = int(os.environ.get('EXPIRY_SWEEP_INTERVAL', 5))
+    EXPIRY_SWEEP_BATCH = int(os.environ.get('EXPIRY_SWEEP_BATCH', 500))
+    # Each sweep first loads Pending bookings expiring within this many seconds
+    EXPIRY_LOOKAHEAD = int(os.environ.get('EXPIRY_LOOKAHEAD', 60))
+    # 'thread' runs the payment outbox worker inside the web process (see run.py),
+    # 'off' leaves it to a separate payment_worker.py process
+    PAYMENT_WORKER = os.environ.get('PAYMENT_WORKER', 'thread')
+    PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'stub')
+    PAYMENT_POLL_INTERVAL = float(os.environ.get('PAYMENT_POLL_INTERVAL', 2))
+    PAYMENT_BATCH_SIZE = int(os.environ.get('PAYMENT_BATCH_SIZE', 50))
+    PAYMENT_CONCURRENCY = int(os.environ.get('PAYMENT_CONCURRENCY', 8)) # Gateway calls in flight per worker
+    # Gateway retries back off from PAYMENT_RETRY_DELAY seconds; a worker's claim
+    # on a payment lapses after PAYMENT_LEASE_SECONDS
+    PAYMENT_MAX_ATTEMPTS = int(os.environ.get('PAYMENT_MAX_ATTEMPTS', 5))
+    PAYMENT_RETRY_DELAY = float(os.environ.get('PAYMENT_RETRY_DELAY', 5))
+    PAYMENT_LEASE_SECONDS = int(os.environ.get('PAYMENT_LEASE_SECONDS', 60))
+    # Stub gateway behaviour: seconds per charge, share of charges declined / failing
+    PAYMENT_STUB_LATENCY = float(os.environ.get('PAYMENT_STUB_LATENCY', 0.5))
+    PAYMENT_STUB_DECLINE_RATE = float(os.environ.get('PAYMENT_STUB_DECLINE_RATE', 0))
+    PAYMENT_STUB_ERROR_RATE = float(os.environ.get('PAYMENT_STUB_ERROR_RATE', 0))
+    # Idempotency-Key responses are kept this long (seconds); a key whose first
+    # request never finished can be retried after IDEMPOTENCY_LOCK_TIMEOUT
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
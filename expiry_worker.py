@@ -0,0 +1,20 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app
+from app.expiry import run_sweeper
+import sys
+
+# Standalone hold expiry sweeper. Run one of these next to the web app
+# (with EXPIRY_SWEEPER=off there) instead of the in-process thread.
+#   python expiry_worker.py [interval_seconds]
+
+app = create_app()
+
+if __name__ == "__main__":
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print("Expiry worker started")
+    try:
+        run_sweeper(app, interval=interval)
+    except KeyboardInterrupt:
+        print("Expiry worker stopped")
@@ -5,6 +5,7 @@ sys.path.append(os.getcwd())
 
 from app import create_app, db
 from app.models import Venue, Seat
+from app.seat_layout import generate_seats, insert_seats, layout_for_capacity, validate_layout
 from config import Config
 
 class SetupConfig(Config):
@@ -27,30 +28,24 @@ with app.app_context():
             print(f"Generating seats for Venue '{venue.name}' (ID: {venue.id}, Capacity: {venue.capacity} Type: {type(venue.capacity)})...")
             
             try:
-                capacity = int(venue.capacity) if venue.capacity else 0
-                if capacity <= 0:
-                    print("Skipping due to invalid capacity.")
-                    continue
-                    
-                rows = int(capacity / 10) + 1
-                seat_count = 0
-                created = 0
+                # Venues with a declarative layout get exactly the seats it describes
+                layout = venue.layout
+                if layout:
+                    error = validate_layout(layout)
+                    if error:
+                        print(f"Skipping due to invalid layout: {error}")
+                        continue
+                else:
+                    capacity = int(venue.capacity) if venue.capacity else 0
+                    if capacity <= 0:
+                        print("Skipping due to invalid capacity.")
+                        continue
+                    layout = layout_for_capacity(capacity)
                 
                 # Check for existing seats again to be safe
-                existing = set((s.row_label, s.seat_number) for s in Seat.query.filter_by(venue_id=venue.id).all())
+                existing = set(db.session.query(Seat.row_label, Seat.seat_number).filter_by(venue_id=venue.id).all())
 
-                for r in range(rows):
-                    row_label = chr(65 + r) # A, B, C...
-                    for n in range(1, 11):
-                        if seat_count >= capacity: break
-                        
-                        if (row_label, n) not in existing:
-                            seat = Seat(venue_id=venue.id, row_label=row_label, seat_number=n)
-                            db.session.add(seat)
-                            created += 1
-                        
-                        seat_count += 1
-                
+                created = insert_seats(venue.id, generate_seats(layout), existing=existing)
                 db.session.commit()
                 print(f"Successfully created {created} seats for venue {venue.id}.")
             except Exception as e:
@@ -0,0 +1,13 @@
+# Read by gunicorn from the working directory (see Procfile / render.yaml)
+import os
+
+# Threaded workers: open seat streams (Server-Sent Events) each hold a
+# thread, up to SEAT_STREAM_MAX_SUBSCRIBERS (half of WEB_THREADS by default)
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 100))
+
+
+def post_worker_init(worker):
+    # Each worker process runs its own expiry sweeper and payment worker threads
+    from run import app, start_background_workers
+    start_background_workers(app)
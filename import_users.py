@@ -0,0 +1,30 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app
+from app.users import import_users, IMPORT_ROLES
+import argparse
+import json
+
+# Bulk-create users (organizer staff, comp ticket recipients, ...) from a CSV
+# with columns username, email and optionally password, password_hash, role.
+#   python import_users.py staff.csv [--role organizer] [--batch-size 500] [--workers 4]
+# Rows without a password get a random one.
+
+app = create_app()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import users from a CSV file")
+    parser.add_argument("path")
+    parser.add_argument("--role", default="customer", choices=IMPORT_ROLES,
+                        help="Role for rows without a role column value")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--workers", type=int, help="Password hashing threads")
+    args = parser.parse_args()
+
+    with app.app_context(), open(args.path, encoding="utf-8-sig", newline="") as f:
+        report = import_users(f, default_role=args.role, batch_size=args.batch_size, workers=args.workers)
+
+    print(f"Created {report.created} users, {len(report.errors)} rows failed")
+    for error in report.errors:
+        print(json.dumps(error))
@@ -0,0 +1,105 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import User, Venue, Seat, Event, Booking, Ticket, SeatHold, EventSalesSummary
+from datetime import datetime
+import re
+import sys
+
+# Runs EXPLAIN over the queries behind the hot routes and flags full table
+# scans. SQLite uses EXPLAIN QUERY PLAN, PostgreSQL uses EXPLAIN with
+# sequential scans disabled (so a Seq Scan means no usable index exists,
+# not just that the table is small).
+#   python index_advisor.py          -> print plans and warnings
+#   python index_advisor.py --check  -> exit 1 if any hot query scans a table
+
+app = create_app()
+
+
+def hot_queries():
+    now = datetime.utcnow()
+    return [
+        ("bookings.get_seats: live holds for event", db.session.query(SeatHold.seat_id, SeatHold.expires_at).filter(
+            SeatHold.event_id == 1,
+            db.or_(SeatHold.expires_at.is_(None), SeatHold.expires_at > now)
+        )),
+        ("bookings.get_seats: venue seats", Seat.query.filter_by(venue_id=1).order_by(Seat.id)),
+        ("bookings.lock_tickets: seat pricing", Seat.query.filter(Seat.venue_id == 1, Seat.id.in_([1, 2, 3]))),
+        ("bookings.lock_tickets: expired holds", SeatHold.query.filter(
+            SeatHold.event_id == 1,
+            SeatHold.seat_id.in_([1, 2, 3]),
+            SeatHold.expires_at <= now
+        )),
+        ("bookings.confirm_booking: holds of booking", SeatHold.query.filter_by(booking_id=1)),
+        ("bookings.confirm_booking: tickets of booking", Ticket.query.filter_by(booking_id=1)),
+        ("bookings.my_bookings", Booking.query.filter_by(user_id=1).order_by(Booking.created_at.desc())),
+        ("events.get_public_events", Event.query.filter_by(status='Active')),
+        ("events.get_my_venues", Venue.query.filter_by(owner_id=1)),
+        ("events.get_organizer_events", Event.query.filter_by(organizer_id=1)),
+        ("events.get_event_bookings", Booking.query.filter_by(event_id=1).order_by(Booking.created_at.desc())),
+        ("events.get_organizer_global_stats: sales counters", db.session.query(
+            db.func.sum(EventSalesSummary.revenue), db.func.sum(EventSalesSummary.sold_tickets)
+        ).join(Event, Event.id == EventSalesSummary.event_id).filter(Event.organizer_id == 1)),
+        ("sales.compute_actual: holds of event", db.session.query(SeatHold.seat_id).filter(SeatHold.event_id == 1)),
+        ("sales.compute_actual: bookings of event", db.session.query(db.func.sum(Booking.total_amount)).filter(
+            Booking.event_id == 1,
+            Booking.status == 'Confirmed'
+        )),
+        ("expiry.sweep: due bookings", Booking.query.filter(
+            Booking.status == 'Pending',
+            Booking.expires_at <= now
+        )),
+        ("expiry.sweep: holds of bookings", SeatHold.query.filter(SeatHold.booking_id.in_([1, 2, 3]))),
+        ("auth.login", User.query.filter_by(username='admin')),
+    ]
+
+
+def explain(query):
+    """Return (plan_lines, scanned_tables) for a query on the current database."""
+    dialect = db.engine.dialect
+    compiled = query.statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    sql = str(compiled)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    conn = db.session.connection()
+
+    if dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()
+        lines = [row[-1] for row in rows]
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX" and "SEARCH" are not
+        scanned = [m.group(2) for m in (re.match(r'^SCAN (TABLE )?(\w+)(?: AS \w+)?$', l) for l in lines) if m]
+    elif dialect.name == 'postgresql':
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = conn.exec_driver_sql("EXPLAIN " + sql, params).all()
+        lines = [row[0] for row in rows]
+        scanned = re.findall(r'Seq Scan on (\w+)', "\n".join(lines))
+    else:
+        raise RuntimeError(f"EXPLAIN not supported for {dialect.name}")
+
+    db.session.rollback()
+    return lines, scanned
+
+
+def run(check=False):
+    failures = []
+    with app.app_context():
+        print(f"Database: {db.engine.dialect.name}")
+        for name, query in hot_queries():
+            lines, scanned = explain(query)
+            flag = "FULL SCAN" if scanned else "ok"
+            print(f"\n[{flag}] {name}")
+            for line in lines:
+                print(f"    {line}")
+            if scanned:
+                print(f"    -> consider an index on: {', '.join(sorted(set(scanned)))}")
+                failures.append(name)
+
+    print(f"\n{len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} with full table scans.")
+    if check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run(check='--check' in sys.argv)
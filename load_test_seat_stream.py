@@ -0,0 +1,113 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.getcwd())
+
+from app.pubsub import InMemoryBroker, RESYNC
+from config import Config
+
+# Load test for the seat stream fan-out: N simulated viewers subscribed to
+# one hot event while seat changes are published at a fixed rate. Viewers
+# are served by a small pool of threads, the way an async/gevent worker
+# multiplexes many open streams (one OS thread per viewer mostly measures
+# the kernel scheduler). A share of the viewers are stalled and only read
+# one message a second, to check that backpressure turns into resyncs
+# instead of blocking the publisher or growing queues.
+#   python load_test_seat_stream.py [subscribers] [events] [rate/s] [slow_fraction] [threads]
+# Defaults: 5000 subscribers, 500 events at 50/s, 5% stalled viewers, 8 threads.
+
+SUBSCRIBERS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+EVENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+RATE = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+SLOW_FRACTION = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+THREADS = int(sys.argv[5]) if len(sys.argv) > 5 else 8
+
+broker = InMemoryBroker()
+channel = "seats:1"
+stop = threading.Event()
+lock = threading.Lock()
+latencies = []
+received = [0]
+resyncs = [0]
+
+
+def serve(viewers):
+    """Drain a share of the viewers; viewers is a list of (subscription, slow)."""
+    local_latencies = []
+    local_received = local_resyncs = 0
+    next_slow_read = 0.0
+    while not stop.is_set():
+        now = time.perf_counter()
+        read_slow = now >= next_slow_read
+        if read_slow:
+            next_slow_read = now + 1.0
+        idle = True
+        for subscription, slow in viewers:
+            if slow and not read_slow:
+                continue
+            while True:
+                item = subscription.get(timeout=0)
+                if item is None:
+                    break
+                idle = False
+                if item is RESYNC:
+                    local_resyncs += 1
+                else:
+                    local_received += 1
+                    if not slow:
+                        local_latencies.append(time.perf_counter() - item[1]["sent"])
+                if slow:
+                    break
+        if idle:
+            time.sleep(0.001)
+
+    for subscription, _ in viewers:
+        subscription.close()
+    with lock:
+        latencies.extend(local_latencies)
+        received[0] += local_received
+        resyncs[0] += local_resyncs
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+slow_count = int(SUBSCRIBERS * SLOW_FRACTION)
+start = time.perf_counter()
+viewers = [(broker.subscribe(channel, maxsize=Config.SEAT_STREAM_QUEUE_SIZE), i < slow_count)
+           for i in range(SUBSCRIBERS)]
+threads = [threading.Thread(target=serve, args=(viewers[n::THREADS],), daemon=True) for n in range(THREADS)]
+for thread in threads:
+    thread.start()
+print(f"{broker.subscriber_count(channel)} subscribers ({slow_count} stalled) connected in "
+      f"{time.perf_counter() - start:.2f}s, served by {THREADS} threads")
+
+publish_times = []
+interval = 1.0 / RATE
+start = time.perf_counter()
+for n in range(EVENTS):
+    sent = time.perf_counter()
+    broker.publish(channel, {"seat_ids": [n % 1000 + 1], "state": 1, "sent": sent})
+    publish_times.append(time.perf_counter() - sent)
+    next_at = start + (n + 1) * interval
+    time.sleep(max(0.0, next_at - time.perf_counter()))
+elapsed = time.perf_counter() - start
+
+time.sleep(1.5)  # let viewers drain
+stop.set()
+for thread in threads:
+    thread.join()
+
+fast = SUBSCRIBERS - slow_count
+print(f"Published {EVENTS} events in {elapsed:.2f}s ({EVENTS / elapsed:,.0f}/s)")
+print(f"Fan-out per event: p50 {percentile(publish_times, 0.5) * 1000:.2f}ms  "
+      f"p99 {percentile(publish_times, 0.99) * 1000:.2f}ms  max {max(publish_times) * 1000:.2f}ms")
+print(f"Delivery latency (fast viewers): p50 {percentile(latencies, 0.5) * 1000:.1f}ms  "
+      f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms")
+print(f"Messages delivered: {received[0]:,} (fast viewers got {len(latencies):,} of {fast * EVENTS:,})")
+print(f"Resyncs sent to stalled viewers: {resyncs[0]:,} (queues capped at {Config.SEAT_STREAM_QUEUE_SIZE} messages)")
@@ -0,0 +1,26 @@
+"""Add token_version to users
+
+Revision ID: 0c6e3a8f5b21
+Revises: f2b7d61a9c08
+Create Date: 2026-10-18 14:40:12.530117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c6e3a8f5b21'
+down_revision = 'f2b7d61a9c08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('event_users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
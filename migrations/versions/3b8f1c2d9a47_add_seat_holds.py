@@ -0,0 +1,46 @@
+"""Add seat holds table for atomic seat locking
+
+Revision ID: 3b8f1c2d9a47
+Revises: 79e442722e69
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f1c2d9a47'
+down_revision = '79e442722e69'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_seat_holds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('seat_id', sa.Integer(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['booking_id'], ['event_bookings.id'], ),
+    sa.ForeignKeyConstraint(['event_id'], ['event_events.id'], ),
+    sa.ForeignKeyConstraint(['seat_id'], ['event_seats.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'seat_id', name='event_unique_hold_per_seat')
+    )
+
+    # Backfill sold seats from confirmed bookings so they stay protected.
+    # MIN() keeps the earliest booking if legacy data double-booked a seat.
+    op.execute("""
+        INSERT INTO event_seat_holds (event_id, seat_id, booking_id, expires_at)
+        SELECT b.event_id, t.seat_id, MIN(b.id), NULL
+        FROM event_tickets t
+        JOIN event_bookings b ON b.id = t.booking_id
+        WHERE b.status = 'Confirmed'
+        GROUP BY b.event_id, t.seat_id
+    """)
+
+
+def downgrade():
+    op.drop_table('event_seat_holds')
@@ -0,0 +1,60 @@
+"""Add payment outbox and idempotency keys
+
+Revision ID: 5e1b8d3f7a29
+Revises: 9a4f2c7e6b18
+Create Date: 2026-10-18 20:05:43.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1b8d3f7a29'
+down_revision = '9a4f2c7e6b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_payment_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payment_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['payment_id'], ['event_payments.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('payment_id')
+    )
+    with op.batch_alter_table('event_payment_outbox', schema=None) as batch_op:
+        batch_op.create_index('ix_event_payment_outbox_due', ['status', 'next_attempt_at'], unique=False)
+
+    op.create_table('event_idempotency_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('endpoint', sa.String(length=100), nullable=False),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('response_body', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['event_users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='event_unique_idempotency_key_per_user')
+    )
+    with op.batch_alter_table('event_idempotency_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_idempotency_keys_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_idempotency_keys_created_at'))
+
+    op.drop_table('event_idempotency_keys')
+    with op.batch_alter_table('event_payment_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_payment_outbox_due')
+
+    op.drop_table('event_payment_outbox')
@@ -0,0 +1,26 @@
+"""Add catalog index on events
+
+Revision ID: 7d3e9b5a1c64
+Revises: 0c6e3a8f5b21
+Create Date: 2026-10-18 15:22:47.104388
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e9b5a1c64'
+down_revision = '0c6e3a8f5b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.create_index('ix_event_events_status_date', ['status', 'date_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_events_status_date')
@@ -0,0 +1,33 @@
+"""Add indexes for the admin event list sorts
+
+Revision ID: 8c5f1e3b7a62
+Revises: d4a7f2c81e35
+Create Date: 2026-10-18 23:12:40.518207
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c5f1e3b7a62'
+down_revision = 'd4a7f2c81e35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.create_index('ix_event_events_date_id', ['date_time', 'id'], unique=False)
+        batch_op.create_index('ix_event_events_title_id', ['title', 'id'], unique=False)
+
+    with op.batch_alter_table('event_sales_summaries', schema=None) as batch_op:
+        batch_op.create_index('ix_event_sales_summaries_revenue', ['revenue', 'event_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_sales_summaries', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_sales_summaries_revenue')
+
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_events_title_id')
+        batch_op.drop_index('ix_event_events_date_id')
@@ -0,0 +1,54 @@
+"""Add full-text event search index
+
+Revision ID: 9a4f2c7e6b18
+Revises: 7d3e9b5a1c64
+Create Date: 2026-10-18 16:05:31.872940
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4f2c7e6b18'
+down_revision = '7d3e9b5a1c64'
+branch_labels = None
+depends_on = None
+
+
+# Kept in step with app/search.py; other databases use the in-process index
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE event_search USING fts5("
+            "title, description, venue, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            "INSERT INTO event_search (rowid, title, description, venue) "
+            "SELECT e.id, e.title, coalesce(e.description, ''), v.name || ' ' || v.address "
+            "FROM event_events e JOIN event_venues v ON v.id = e.venue_id WHERE e.status = 'Active'"
+        )
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute(
+            "CREATE TABLE event_search_index ("
+            "event_id INTEGER PRIMARY KEY REFERENCES event_events (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute(
+            "INSERT INTO event_search_index (event_id, document) "
+            "SELECT e.id, "
+            "setweight(to_tsvector('simple', unaccent(e.title)), 'A') || "
+            "setweight(to_tsvector('simple', unaccent(v.name || ' ' || v.address)), 'B') || "
+            "setweight(to_tsvector('simple', unaccent(coalesce(e.description, ''))), 'C') "
+            "FROM event_events e JOIN event_venues v ON v.id = e.venue_id WHERE e.status = 'Active'"
+        )
+        op.execute("CREATE INDEX ix_event_search_document ON event_search_index USING gin (document)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE event_search")
+    elif dialect == 'postgresql':
+        op.execute("DROP TABLE event_search_index")
@@ -0,0 +1,64 @@
+"""Add indexes for booking hot paths
+
+Revision ID: a5d2e7c4f810
+Revises: 3b8f1c2d9a47
+Create Date: 2026-10-18 10:41:07.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d2e7c4f810'
+down_revision = '3b8f1c2d9a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_event_bookings_event_status_expires', ['event_id', 'status', 'expires_at'], unique=False)
+        batch_op.create_index('ix_event_bookings_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_event_bookings_status_expires', ['status', 'expires_at'], unique=False)
+
+    with op.batch_alter_table('event_tickets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_tickets_booking_id'), ['booking_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_event_tickets_seat_id'), ['seat_id'], unique=False)
+
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_events_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_event_events_organizer_id'), ['organizer_id'], unique=False)
+
+    with op.batch_alter_table('event_venues', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_venues_owner_id'), ['owner_id'], unique=False)
+
+    with op.batch_alter_table('event_payments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_payments_booking_id'), ['booking_id'], unique=False)
+
+    with op.batch_alter_table('event_seat_holds', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_seat_holds_booking_id'), ['booking_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event_seat_holds', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_seat_holds_booking_id'))
+
+    with op.batch_alter_table('event_payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_payments_booking_id'))
+
+    with op.batch_alter_table('event_venues', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_venues_owner_id'))
+
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_events_organizer_id'))
+        batch_op.drop_index(batch_op.f('ix_event_events_status'))
+
+    with op.batch_alter_table('event_tickets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_tickets_seat_id'))
+        batch_op.drop_index(batch_op.f('ix_event_tickets_booking_id'))
+
+    with op.batch_alter_table('event_bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_bookings_status_expires')
+        batch_op.drop_index('ix_event_bookings_user_created')
+        batch_op.drop_index('ix_event_bookings_event_status_expires')
@@ -0,0 +1,41 @@
+"""Delete LOCK- placeholder tickets
+
+Revision ID: b6c2e9f4d170
+Revises: 5e1b8d3f7a29
+Create Date: 2026-10-18 21:10:27.904152
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6c2e9f4d170'
+down_revision = '5e1b8d3f7a29'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    # Locking used to write a Reserved ticket coded LOCK-<event>-<seat> per
+    # seat, which confirm rewrote; the ones left behind by expired or
+    # cancelled bookings blocked the seat from being locked again. Holds now
+    # live only in event_seat_holds, so every LOCK- ticket can go. Deleted
+    # in batches to keep each transaction (and lock) short on big tables.
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        while True:
+            ids = [row[0] for row in conn.execute(sa.text(
+                "SELECT id FROM event_tickets WHERE unique_code LIKE 'LOCK-%' ORDER BY id LIMIT :limit"
+            ), {"limit": BATCH_SIZE})]
+            if not ids:
+                break
+            conn.execute(sa.text("DELETE FROM event_tickets WHERE id IN :ids").bindparams(
+                sa.bindparam('ids', expanding=True)), {"ids": ids})
+
+
+def downgrade():
+    # Placeholder tickets are not recreated; older code writes them again on lock
+    pass
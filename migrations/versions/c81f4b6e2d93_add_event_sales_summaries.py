@@ -0,0 +1,46 @@
+"""Add materialized sales counters per event
+
+Revision ID: c81f4b6e2d93
+Revises: a5d2e7c4f810
+Create Date: 2026-10-18 12:03:55.871094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4b6e2d93'
+down_revision = 'a5d2e7c4f810'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_sales_summaries',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('sold_tickets', sa.Integer(), nullable=False),
+    sa.Column('reserved_tickets', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('confirmed_bookings', sa.Integer(), nullable=False),
+    sa.Column('pending_bookings', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['event_events.id'], ),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+
+    # Backfill the counters for existing events (same rules as app/sales.py)
+    op.execute("""
+        INSERT INTO event_sales_summaries
+            (event_id, sold_tickets, reserved_tickets, revenue, confirmed_bookings, pending_bookings)
+        SELECT e.id,
+            (SELECT COUNT(*) FROM event_seat_holds h WHERE h.event_id = e.id AND h.expires_at IS NULL),
+            (SELECT COUNT(*) FROM event_seat_holds h WHERE h.event_id = e.id AND h.expires_at IS NOT NULL),
+            COALESCE((SELECT SUM(b.total_amount) FROM event_bookings b WHERE b.event_id = e.id AND b.status = 'Confirmed'), 0),
+            (SELECT COUNT(*) FROM event_bookings b WHERE b.event_id = e.id AND b.status = 'Confirmed'),
+            (SELECT COUNT(*) FROM event_bookings b WHERE b.event_id = e.id AND b.status = 'Pending')
+        FROM event_events e
+    """)
+
+
+def downgrade():
+    op.drop_table('event_sales_summaries')
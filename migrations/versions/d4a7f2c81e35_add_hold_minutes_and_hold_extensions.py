@@ -0,0 +1,32 @@
+"""Add per-event hold minutes and booking hold extensions
+
+Revision ID: d4a7f2c81e35
+Revises: b6c2e9f4d170
+Create Date: 2026-10-18 21:48:02.615390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7f2c81e35'
+down_revision = 'b6c2e9f4d170'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hold_minutes', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('event_bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hold_extensions', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('event_bookings', schema=None) as batch_op:
+        batch_op.drop_column('hold_extensions')
+
+    with op.batch_alter_table('event_events', schema=None) as batch_op:
+        batch_op.drop_column('hold_minutes')
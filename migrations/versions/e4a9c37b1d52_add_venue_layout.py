@@ -0,0 +1,26 @@
+"""Add declarative layout document to venues
+
+Revision ID: e4a9c37b1d52
+Revises: c81f4b6e2d93
+Create Date: 2026-10-18 13:21:07.402518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c37b1d52'
+down_revision = 'c81f4b6e2d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_venues', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('layout', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('event_venues', schema=None) as batch_op:
+        batch_op.drop_column('layout')
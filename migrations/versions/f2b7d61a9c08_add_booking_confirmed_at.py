@@ -0,0 +1,34 @@
+"""Add confirmed_at to bookings for gate manifest deltas
+
+Revision ID: f2b7d61a9c08
+Revises: e4a9c37b1d52
+Create Date: 2026-10-18 14:02:41.118530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d61a9c08'
+down_revision = 'e4a9c37b1d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event_bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('confirmed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_event_bookings_event_confirmed', ['event_id', 'confirmed_at'], unique=False)
+
+    # Existing confirmed bookings: the best we know is when they were made
+    op.execute(
+        "UPDATE event_bookings SET confirmed_at = created_at "
+        "WHERE status = 'Confirmed' AND confirmed_at IS NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('event_bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_bookings_event_confirmed')
+        batch_op.drop_column('confirmed_at')
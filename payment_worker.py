@@ -0,0 +1,20 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app
+from app.payments import run_worker
+import sys
+
+# Standalone payment outbox worker. Run one or more next to the web app
+# (with PAYMENT_WORKER=off there) instead of the in-process thread.
+#   python payment_worker.py [interval_seconds]
+
+app = create_app()
+
+if __name__ == "__main__":
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    print("Payment worker started")
+    try:
+        run_worker(app, interval=interval)
+    except KeyboardInterrupt:
+        print("Payment worker stopped")
@@ -0,0 +1,53 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app, db
+from app.models import Event, EventSalesSummary
+from app.sales import COUNTERS, compute_actual
+import sys
+
+# Verifies the materialized sales counters against the raw booking/hold tables.
+#   python reconcile_sales.py          -> report drift
+#   python reconcile_sales.py --fix    -> also overwrite drifted counters
+
+app = create_app()
+
+
+def reconcile(fix=False):
+    with app.app_context():
+        actual = compute_actual()
+        stored = {s.event_id: s for s in EventSalesSummary.query.all()}
+        event_ids = [e[0] for e in db.session.query(Event.id).order_by(Event.id).all()]
+
+        drifted = 0
+        for event_id in event_ids:
+            expected = actual.get(event_id, {k: 0 for k in COUNTERS})
+            summary = stored.get(event_id)
+            if summary is None:
+                diffs = {k: (None, v) for k, v in expected.items()}
+            else:
+                diffs = {k: (getattr(summary, k), v) for k, v in expected.items()
+                         if abs((getattr(summary, k) or 0) - v) > 1e-6}
+            if not diffs:
+                continue
+
+            drifted += 1
+            print(f"Event {event_id}: " + ", ".join(f"{k} stored={old} actual={new}" for k, (old, new) in diffs.items()))
+            if fix:
+                if summary is None:
+                    summary = EventSalesSummary(event_id=event_id)
+                    db.session.add(summary)
+                for k, v in expected.items():
+                    setattr(summary, k, v)
+
+        if fix and drifted:
+            db.session.commit()
+        print(f"Checked {len(event_ids)} events, {drifted} with drift{' (fixed)' if fix and drifted else ''}.")
+        return drifted
+
+
+if __name__ == "__main__":
+    fix = '--fix' in sys.argv
+    drifted = reconcile(fix=fix)
+    if drifted and not fix:
+        sys.exit(1)
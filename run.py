@@ -4,8 +4,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app import create_app
+from app.expiry import start_sweeper_thread
+from app.payments import start_worker_thread
 
 app = create_app()
 
+
+def start_background_workers(app):
+    # Called once the server is running (gunicorn.conf.py, or below), not on
+    # import, so `flask db upgrade` and other CLI commands don't start them
+    if app.config['EXPIRY_SWEEPER'] == 'thread':
+        start_sweeper_thread(app)
+    if app.config['PAYMENT_WORKER'] == 'thread':
+        start_worker_thread(app)
+
+
 if __name__ == '__main__':
+    import os
+    # With the reloader, only the serving child process runs the workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers(app)
     app.run(debug=True)
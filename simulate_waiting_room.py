@@ -0,0 +1,99 @@
+import sys
+import os
+import heapq
+import random
+import statistics
+import time
+sys.path.append(os.getcwd())
+
+from app import create_app, waiting_room
+from app.waiting_room import WaitingRoom
+from config import Config
+
+# Replays an on-sale spike against the waiting room on a simulated clock.
+#   python simulate_waiting_room.py [users] [rate_per_second] [burst]
+# Arrivals: 70% in the first 10 seconds after tickets go live, the rest
+# spread over the next 5 minutes. Everyone polls /status as told by
+# poll_after until admitted. Reports admissions per second (what reaches
+# /api/bookings/lock), time spent in line and the real CPU cost of the
+# join/poll path, then times the HTTP endpoints for a sample of visitors.
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+RATE = float(sys.argv[2]) if len(sys.argv) > 2 else 200
+BURST = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+HTTP_SAMPLE = 2000
+
+
+class SimConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+app = create_app(config_class=SimConfig)
+
+
+def arrivals(rng):
+    for _ in range(USERS):
+        yield rng.uniform(0, 10) if rng.random() < 0.7 else rng.uniform(10, 310)
+
+
+def simulate():
+    rng = random.Random(1)
+    room = WaitingRoom(event_id=1, rate=RATE, burst=BURST, now=0.0)
+    events = [(t, 'join', None) for t in arrivals(rng)]
+    heapq.heapify(events)
+
+    joined_at = {}
+    waits = []
+    admitted_per_second = {}
+    polls = 0
+    cpu = 0.0
+
+    while events:
+        now, action, seq = heapq.heappop(events)
+        start = time.perf_counter()
+        if action == 'join':
+            seq = room.join(now)
+            waiting_room.queue_token(room, seq)
+            joined_at[seq] = now
+        else:
+            polls += 1
+        position = room.position(seq, now)
+        if position == 0:
+            room.claim(seq, seq)
+            waiting_room.admission_token(room, seq, seq)
+        cpu += time.perf_counter() - start
+
+        if position == 0:
+            waits.append(now - joined_at[seq])
+            second = int(now)
+            admitted_per_second[second] = admitted_per_second.get(second, 0) + 1
+        else:
+            delay = waiting_room.poll_after(room.wait_seconds(position))
+            heapq.heappush(events, (now + delay + rng.uniform(0, 0.5), 'poll', seq))
+
+    waits.sort()
+    busiest = max(admitted_per_second.values())
+    last = max(admitted_per_second)
+    print(f"{USERS} visitors, admission rate {RATE:g}/s (burst {BURST})")
+    print(f"  admitted per second: peak {busiest}, mean {USERS / (last + 1):.1f}; last admission at {last}s")
+    print(f"  time in line: p50 {statistics.median(waits):.0f}s  p95 {waits[int(len(waits) * 0.95)]:.0f}s  max {waits[-1]:.0f}s")
+    print(f"  {USERS} joins + {polls} polls: {cpu:.2f}s CPU, {(USERS + polls) / cpu:,.0f} ops/s "
+          f"(incl. token signing)")
+
+
+def http_sample():
+    client = app.test_client()
+    waiting_room.open_room(1, rate=0)  # Paused: everyone stays in line
+    start = time.perf_counter()
+    tokens = [client.post("/api/queue/1/join").get_json()["token"] for _ in range(HTTP_SAMPLE)]
+    join_ms = (time.perf_counter() - start) * 1000 / HTTP_SAMPLE
+    start = time.perf_counter()
+    for token in tokens:
+        client.get("/api/queue/1/status", headers={"X-Queue-Token": token})
+    status_ms = (time.perf_counter() - start) * 1000 / HTTP_SAMPLE
+    waiting_room.close_room(1)
+    print(f"  HTTP ({HTTP_SAMPLE} visitors, test client): join {join_ms:.3f}ms, status {status_ms:.3f}ms per request")
+
+
+with app.app_context():
+    simulate()
+    http_sample()
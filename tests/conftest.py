@@ -0,0 +1,98 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event as sa_event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db, availability, gate
+from app.models import User, Venue, Event, EventSalesSummary
+from app.seat_layout import generate_seats, insert_seats, layout_for_capacity
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    JWT_SECRET_KEY = "test-jwt-secret-key-long-enough-for-hs256"
+    EXPIRY_SWEEPER = 'off'
+    PAYMENT_WORKER = 'off'
+    PAYMENT_STUB_LATENCY = 0
+
+
+@pytest.fixture
+def app():
+    app = create_app(config_class=TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    # Process-wide caches must not leak between tests
+    availability.invalidate()
+    gate._indexes.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make(username, role='customer'):
+        user = User(username=username, email=f"{username}@example.com", role=role,
+                    password_hash="x", token_version=0)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def headers():
+    def make(user):
+        token = create_access_token(identity=str(user.id),
+                                    additional_claims={"role": user.role, "token_version": 0})
+        return {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def make_event(app):
+    def make(organizer, capacity=50):
+        venue = Venue(name="Hall", address="1 Main St", capacity=capacity, owner_id=organizer.id)
+        db.session.add(venue)
+        db.session.flush()
+        insert_seats(venue.id, generate_seats(layout_for_capacity(capacity)))
+        event = Event(title="Show", date_time=datetime.utcnow() + timedelta(days=7), venue_id=venue.id,
+                      organizer_id=organizer.id, base_price=20, status='Active')
+        db.session.add(event)
+        db.session.flush()
+        db.session.add(EventSalesSummary(event_id=event.id, sold_tickets=0, reserved_tickets=0, revenue=0.0,
+                                         confirmed_bookings=0, pending_bookings=0))
+        db.session.commit()
+        return event
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements run inside it."""
+    class Counter:
+        def __enter__(self):
+            self.statements = []
+            self.engine = db.engine
+            sa_event.listen(self.engine, 'before_cursor_execute', self._record)
+            return self
+
+        def _record(self, conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        def __exit__(self, *exc):
+            sa_event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    return Counter
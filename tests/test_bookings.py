@@ -0,0 +1,44 @@
+from app import db
+from app.models import Seat
+
+
+def _seat_ids(event, n):
+    return [s[0] for s in db.session.query(Seat.id).filter_by(venue_id=event.venue_id).order_by(Seat.id).limit(n)]
+
+
+def test_lock_does_not_reload_seats_after_commit(client, make_user, make_event, headers, count_queries):
+    organizer = make_user("org", role='organizer')
+    customer = make_user("fan")
+    event = make_event(organizer)
+    seat_ids = _seat_ids(event, 10)
+    auth = headers(customer)
+
+    with count_queries() as queries:
+        response = client.post("/api/bookings/lock", json={"event_id": event.id, "seat_ids": seat_ids},
+                               headers=auth)
+    assert response.status_code == 201, response.get_json()
+    seat_selects = [s for s in queries.statements if s.lstrip().upper().startswith("SELECT")
+                    and "event_seats" in s]
+    # One batched seat fetch for pricing, never one per seat
+    assert len(seat_selects) == 1
+    assert len(queries.statements) <= 10, queries.statements
+
+
+def test_best_available_does_not_reload_seats_after_commit(client, make_user, make_event, headers,
+                                                            count_queries):
+    organizer = make_user("org", role='organizer')
+    customer = make_user("fan")
+    event = make_event(organizer)
+    auth = headers(customer)
+    # Build the availability index outside the counted request
+    client.get(f"/api/bookings/{event.id}/seats/availability")
+
+    with count_queries() as queries:
+        response = client.post("/api/bookings/best-available", json={"event_id": event.id, "quantity": 6},
+                               headers=auth)
+    assert response.status_code == 201, response.get_json()
+    assert len(response.get_json()["seats"]) == 6
+    seat_selects = [s for s in queries.statements if s.lstrip().upper().startswith("SELECT")
+                    and "event_seats" in s]
+    assert len(seat_selects) == 1
+    assert len(queries.statements) <= 10, queries.statements
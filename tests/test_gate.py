@@ -0,0 +1,50 @@
+from app import db, gate, payments
+from app.models import Seat, Ticket
+
+
+def _buy(client, auth, event, count=2, skip=0):
+    seat_ids = [s[0] for s in db.session.query(Seat.id).filter_by(venue_id=event.venue_id)
+                .order_by(Seat.id).offset(skip).limit(count)]
+    booking_id = client.post("/api/bookings/lock", json={"event_id": event.id, "seat_ids": seat_ids},
+                             headers=auth).get_json()["booking_id"]
+    response = client.post("/api/bookings/confirm", json={"booking_id": booking_id}, headers=auth)
+    assert response.status_code < 300, response.get_json()
+    return booking_id
+
+
+def test_ticket_sold_after_preload_scans(app, client, make_user, make_event, headers):
+    organizer = make_user("org", role='organizer')
+    customer = make_user("fan")
+    event = make_event(organizer)
+    auth = headers(customer)
+
+    payments.drain(app)
+    _buy(client, auth, event)
+    payments.drain(app)
+    index = gate.preload(event.id)
+    assert index.stats()["tickets"] == 2
+
+    # Sold once the gate has its codes; the payment worker marks the tickets Valid
+    late = _buy(client, auth, event, skip=2)
+    payments.drain(app)
+    codes = [t.unique_code for t in Ticket.query.filter_by(booking_id=late)]
+    assert all(t.status == 'Valid' for t in Ticket.query.filter_by(booking_id=late))
+
+    result, entry = index.scan(codes[0])
+    assert result == gate.ADMITTED
+    assert index.scan(codes[0])[0] == gate.ALREADY_USED
+    assert index.stats()["tickets"] == 3
+    assert index.scan("no-such-code") == (gate.INVALID, None)
+    assert gate.writer.flush() == 1
+
+
+def test_unpaid_ticket_sold_after_preload_is_invalid(app, client, make_user, make_event, headers):
+    organizer = make_user("org", role='organizer')
+    customer = make_user("fan")
+    event = make_event(organizer)
+    index = gate.preload(event.id)
+
+    # Confirmed but the payment has not gone through yet
+    late = _buy(client, headers(customer), event, count=1)
+    code = Ticket.query.filter_by(booking_id=late).one().unique_code
+    assert index.scan(code) == (gate.INVALID, None)
@@ -0,0 +1,23 @@
+from app import db
+from app.models import Venue
+from app.seat_layout import generate_seats, get_compiled_layout, insert_seats, layout_for_capacity
+
+
+def test_inserting_seats_recompiles_the_layout(app, make_user):
+    owner = make_user("org", role='organizer')
+    venue = Venue(name="Hall", address="1 Main St", capacity=4, owner_id=owner.id)
+    db.session.add(venue)
+    db.session.commit()
+    first = list(generate_seats(layout_for_capacity(2)))
+    insert_seats(venue.id, first)
+    db.session.commit()
+    before = get_compiled_layout(venue.id)
+    assert len(before.seat_ids) == 2
+
+    # As the repair scripts do: add the seats that are missing
+    insert_seats(venue.id, generate_seats(layout_for_capacity(4)),
+                 existing={(label, number) for label, number, _, _ in first})
+    db.session.commit()
+    after = get_compiled_layout(venue.id)
+    assert len(after.seat_ids) == 4
+    assert after.digest != before.digest